@@ -1,34 +1,213 @@
 # -*- coding: utf-8 -*-
 
-import os
-import codecs
+import argparse
+import concurrent.futures
+import multiprocessing
 
+from docparser import CorpusPack
 from extract.ZengJianChiExtractor import ZengJianChiExtractor
+from utils.AsyncPipeline import AsyncPipeline
+from utils.CheckpointWriter import CheckpointWriter
+from utils import Profiler
 
+# 结果文件表头
+ZengJianChiResultHead = "公告id,股东全称,股东简称,变动截止日期,变动价格,变动数量,变动后持股数,变动后持股比例\n"
 
-def extract_zengjianchi(zjc_ex, html_dir_path, html_id):
+# worker 进程中的增减持抽取器，由 init_zengjianchi_worker 在进程启动时创建
+_worker_zjc_ex = None
+# 解析进程中的 HTMLParser，由 init_parse_worker 在进程启动时设置
+_worker_html_parser = None
+
+
+def extract_zengjianchi(zjc_ex, html_dir_path, html_id, document=None):
+    """
+    html_dir_path: html 目录或语料包文件
+    document: 已经解析好的 ParsedDocument，为 None 时解析 html_dir_path 中的 html_id
+    """
     record_list = []
     print(html_id + ' is processing')
-    for record in zjc_ex.extract(os.path.join(html_dir_path, html_id), html_id):
+    source = CorpusPack.get_corpus(html_dir_path).source(html_id) if document is None else document
+    for record in zjc_ex.extract(source, html_id):
         if record is not None and record.shareholderFullName is not None and \
                 len(record.shareholderFullName) > 1 and \
                 record.finishDate is not None and len(record.finishDate) >= 6:
             tmp_result = record.to_result()
             if tmp_result is not None:
                 record_list.append("%s,%s" % (html_id.split('.')[0], tmp_result))
+    if zjc_ex.skipped_table_count > 0:
+        print('%s: %d tables skipped' % (html_id, zjc_ex.skipped_table_count))
+    if zjc_ex.skipped_paragraph_count > 0:
+        print('%s: %d of %d paragraphs skipped before NER' % (html_id, zjc_ex.skipped_paragraph_count,
+                                                              zjc_ex.paragraph_count))
     for record in record_list:
         print(record)
     return record_list
 
 
-def extract_zengjianchi_from_html_dir(zjc_ex, html_dir_path, res_path):
-    with codecs.open(res_path, 'w', encoding='utf-8') as f:
-        f.write("公告id,股东全称,股东简称,变动截止日期,变动价格,变动数量,变动后持股数,变动后持股比例\n")
-        print("公告id,股东全称,股东简称,变动截止日期,变动价格,变动数量,变动后持股数,变动后持股比例\n")
-        for html_id in os.listdir(html_dir_path):
+def html_id_sort_key(html_id):
+    """
+    按公告 id 排序，数字 id 按数值大小排序，保证输出结果的顺序确定
+    """
+    name = html_id.split('.')[0]
+    if name.isdigit():
+        return 0, int(name), name
+    return 1, 0, name
+
+
+def list_html_ids(html_dir_path):
+    """
+    html 目录或语料包中的所有 html id
+    """
+    return sorted(CorpusPack.get_corpus(html_dir_path).ids(), key=html_id_sort_key)
+
+
+def begin_profile_document(html_dir_path, html_id):
+    """
+    启用性能统计时开始统计一个 html
+    """
+    profiler = Profiler.get_profiler()
+    if profiler.enabled:
+        profiler.begin_document(html_id, CorpusPack.get_corpus(html_dir_path).size(html_id))
+
+
+def extract_zengjianchi_from_html_dir(zjc_ex, html_dir_path, res_path, resume=False, sync_interval=100):
+    """
+    抽取目录下所有 html 中的记录
+    resume 为 True 时根据结果文件的 manifest 跳过已经完成的 html，在原结果文件后继续写入
+    """
+    profiler = Profiler.get_profiler()
+    with CheckpointWriter(res_path, ZengJianChiResultHead, resume, sync_interval) as writer:
+        print(ZengJianChiResultHead)
+        for html_id in list_html_ids(html_dir_path):
+            if writer.is_done(html_id):
+                continue
+            begin_profile_document(html_dir_path, html_id)
             record_list = extract_zengjianchi(zjc_ex, html_dir_path, html_id)
-            for record in record_list:
-                f.write(record + "\n")
+            with Profiler.stage('output.write', len(record_list)):
+                writer.write(html_id, record_list)
+            profiler.add_document(profiler.end_document())
+
+
+def init_zengjianchi_worker(config_file_path, ner_model_dir_path, ner_blacklist_file_path, public_time_path,
+                           ner_cache_path=None, html_parser_backend='bs4', ner_backend='ltp', sentence_window_size=None,
+                           profile=False):
+    """
+    worker 进程初始化：每个进程只创建一次抽取器 (以及 LTP 模型)
+    profile 为 True 时在 worker 中统计各阶段耗时，每个 html 的统计随结果返回主进程
+    """
+    global _worker_zjc_ex
+    if profile:
+        Profiler.get_profiler().enable()
+    _worker_zjc_ex = ZengJianChiExtractor(config_file_path, ner_model_dir_path, ner_blacklist_file_path,
+                                          public_time_path, ner_cache_path, html_parser_backend, ner_backend,
+                                          sentence_window_size)
+
+
+def extract_zengjianchi_chunk(task):
+    """
+    在 worker 进程中处理一组 html id
+    返回 [(html_id, record_list, 性能统计记录), ...]，顺序与输入一致，未启用性能统计时统计记录为 None
+    """
+    html_dir_path, html_ids = task
+    profiler = Profiler.get_profiler()
+    rs = []
+    for html_id in html_ids:
+        begin_profile_document(html_dir_path, html_id)
+        record_list = extract_zengjianchi(_worker_zjc_ex, html_dir_path, html_id)
+        rs.append((html_id, record_list, profiler.end_document()))
+    return rs
+
+
+def extract_zengjianchi_from_html_dir_parallel(extractor_args, html_dir_path, res_path, workers, chunk_size=16,
+                                               resume=False, sync_interval=100):
+    """
+    多进程抽取目录下所有 html 中的记录
+    extractor_args: (config_file_path, ner_model_dir_path, ner_blacklist_file_path, public_time_path,
+                     ner_cache_path, html_parser_backend, ner_backend, sentence_window_size)
+    html id 按顺序切分为多个 chunk 分发给 worker，结果由主进程按 id 顺序写入结果文件
+    resume 同 extract_zengjianchi_from_html_dir
+    """
+    profiler = Profiler.get_profiler()
+    with CheckpointWriter(res_path, ZengJianChiResultHead, resume, sync_interval) as writer:
+        print(ZengJianChiResultHead)
+        html_ids = [html_id for html_id in list_html_ids(html_dir_path) if not writer.is_done(html_id)]
+        tasks = [(html_dir_path, html_ids[i:i + chunk_size]) for i in range(0, len(html_ids), chunk_size)]
+        pool = multiprocessing.Pool(workers, initializer=init_zengjianchi_worker,
+                                    initargs=tuple(extractor_args) + (profiler.enabled,))
+        try:
+            # imap 按提交顺序返回结果，结果一边产生一边写入
+            for chunk_result in pool.imap(extract_zengjianchi_chunk, tasks):
+                for html_id, record_list, worker_entry in chunk_result:
+                    profiler.begin_document(html_id)
+                    with Profiler.stage('output.write', len(record_list)):
+                        writer.write(html_id, record_list)
+                    profiler.add_document(profiler.end_document(worker_entry))
+        finally:
+            pool.close()
+            pool.join()
+
+
+def init_parse_worker(html_parser):
+    global _worker_html_parser
+    _worker_html_parser = html_parser
+
+
+def parse_html_in_worker(html_id, data):
+    """
+    在解析进程中解析 html 文件内容，ParsedDocument 直接返回
+    """
+    return _worker_html_parser.ensure_document(data)
+
+
+def read_html(html_dir_path, html_id):
+    """
+    读取 html 文件内容，预解析文件中读取的是 ParsedDocument
+    """
+    corpus = CorpusPack.get_corpus(html_dir_path)
+    Profiler.record('html.read', 0.0, corpus.size(html_id))
+    return corpus.read(html_id)
+
+
+def extract_zengjianchi_from_html_dir_async(zjc_ex, html_dir_path, res_path, queue_size=8, parse_processes=0,
+                                            resume=False, sync_interval=100):
+    """
+    使用 AsyncPipeline 抽取目录下所有 html 中的记录：读取文件、解析 html、抽取、写入结果在不同线程中重叠进行
+    queue_size: 各阶段之间的队列长度，限制内存中同时存在的 html 数
+    parse_processes: 大于 0 时 html 解析在多个进程中进行，否则在一个线程中进行
+    resume 同 extract_zengjianchi_from_html_dir
+    启用性能统计时整个目录作为一条记录，各阶段的耗时重叠，其总和可能超过总耗时
+    """
+    profiler = Profiler.get_profiler()
+    parse_executor = None
+    if parse_processes > 0:
+        parse_executor = concurrent.futures.ProcessPoolExecutor(parse_processes, initializer=init_parse_worker,
+                                                                initargs=(zjc_ex.html_parser,))
+        parse = parse_html_in_worker
+    else:
+        def parse(html_id, data):
+            return zjc_ex.html_parser.ensure_document(data)
+    with CheckpointWriter(res_path, ZengJianChiResultHead, resume, sync_interval) as writer:
+        print(ZengJianChiResultHead)
+        html_ids = [html_id for html_id in list_html_ids(html_dir_path) if not writer.is_done(html_id)]
+        profiler.begin_document(html_dir_path)
+
+        def write(html_id, record_list):
+            with Profiler.stage('output.write', len(record_list)):
+                writer.write(html_id, record_list)
+
+        pipeline = AsyncPipeline(parse=parse,
+                                 extract=lambda html_id, document: extract_zengjianchi(zjc_ex, html_dir_path, html_id,
+                                                                                       document),
+                                 write=write,
+                                 read=lambda html_id: read_html(html_dir_path, html_id),
+                                 queue_size=queue_size, parse_executor=parse_executor)
+        try:
+            pipeline.run(html_ids)
+        finally:
+            if parse_executor is not None:
+                parse_executor.shutdown()
+        profiler.add_document(profiler.end_document())
+    print(pipeline.summary())
 
 
 if __name__ == "__main__":
@@ -44,14 +223,61 @@ if __name__ == "__main__":
     '''
 
     # 提取所有 html 中的记录
-    zengjianchi_config_file_path = 'config/ZengJianChiConfig.json'
-    # ner_model_dir_path = 'E:/WorkBench/Courses/Big-Data/Proj2-Finance/ltp_data_v3.4.0'
-    # ner_model_dir_path = '/home/swj/Tools/ltp_data_v3.4.0'
-    ner_model_dir_path = 'D:/pyltp/ltp_data'
-    ner_blacklist_file_path = 'config/ner_com_blacklist.txt'
-    public_time_path = '../train_public_time/增减持公告时间_train.csv'
+    arg_parser = argparse.ArgumentParser(description='增减持信息抽取')
+    arg_parser.add_argument('--config', default='config/ZengJianChiConfig.json')
+    # 'E:/WorkBench/Courses/Big-Data/Proj2-Finance/ltp_data_v3.4.0'
+    # '/home/swj/Tools/ltp_data_v3.4.0'
+    arg_parser.add_argument('--ner-model-dir', default='D:/pyltp/ltp_data')
+    arg_parser.add_argument('--ner-blacklist', default='config/ner_com_blacklist.txt')
+    arg_parser.add_argument('--public-time', default='../train_public_time/增减持公告时间_train.csv')
+    # '../train_data/增减持/html', '../data/train_data/增减持/html'
+    arg_parser.add_argument('--html-dir', default='../zengjianchi/html',
+                            help='html 目录，python -m docparser.CorpusPack 生成的语料包文件，'
+                                 '或 python -m docparser.DocumentStore 生成的预解析文件')
+    arg_parser.add_argument('--output', default='./results/ZengJianChi.csv')
+    arg_parser.add_argument('--ner-cache', default=None, help='pyltp 输出缓存文件路径，不指定时不使用缓存')
+    arg_parser.add_argument('--workers', type=int, default=1, help='抽取进程数，大于 1 时使用多进程')
+    arg_parser.add_argument('--chunk-size', type=int, default=16, help='每次分发给 worker 的 html 数量')
+    arg_parser.add_argument('--resume', action='store_true', help='跳过结果文件 manifest 中已完成的 html，继续上次的抽取')
+    arg_parser.add_argument('--sync-interval', type=int, default=100, help='每处理多少个 html 将结果落盘一次')
+    arg_parser.add_argument('--html-backend', default='bs4', choices=['bs4', 'lxml', 'iterparse'], help='html 解析后端')
+    arg_parser.add_argument('--fast', action='store_true',
+                            help='快速模式：使用基于规则和词典的 NER 后端代替 pyltp，不需要模型文件，准确率较低')
+    arg_parser.add_argument('--sentence-window', type=int, default=None,
+                            help='句子窗口 NER：只对含有关键词的句子及其前后 N 个句子打标签，不指定时对整个段落打标签')
+    arg_parser.add_argument('--async-pipeline', action='store_true',
+                            help='使用 asyncio 流水线：读取文件、解析 html 与 NER 抽取重叠进行，只能与 --workers 1 同时使用')
+    arg_parser.add_argument('--queue-size', type=int, default=None,
+                            help='--async-pipeline 中各阶段之间的队列长度，默认为 8')
+    arg_parser.add_argument('--parse-processes', type=int, default=0,
+                            help='--async-pipeline 中解析 html 的进程数，为 0 时在一个线程中解析')
+    arg_parser.add_argument('--profile', default=None,
+                            help='启用各阶段性能统计，每个 html 的统计以 JSON lines 写入该文件，结束时输出汇总')
+    args = arg_parser.parse_args()
+    if args.async_pipeline and args.workers > 1:
+        arg_parser.error('--async-pipeline cannot be used with --workers greater than 1')
+    if not args.async_pipeline and (args.queue_size is not None or args.parse_processes > 0):
+        arg_parser.error('--queue-size and --parse-processes require --async-pipeline')
+    if args.queue_size is None:
+        args.queue_size = 8
+
+    if args.profile is not None:
+        Profiler.get_profiler().enable(args.profile)
 
-    zjc_ex = ZengJianChiExtractor(zengjianchi_config_file_path, ner_model_dir_path, ner_blacklist_file_path, public_time_path)
-    # extract_zengjianchi_from_html_dir(zjc_ex, '../train_data/增减持/html', './results/HodingChange.csv')
-    # extract_zengjianchi_from_html_dir(zjc_ex, '../data/train_data/增减持/html', './results/HodingChange.csv')
-    extract_zengjianchi_from_html_dir(zjc_ex, '../zengjianchi/html', './results/ZengJianChi.csv')
+    zengjianchi_args = (args.config, args.ner_model_dir, args.ner_blacklist, args.public_time, args.ner_cache,
+                        args.html_backend, 'rule' if args.fast else 'ltp', args.sentence_window)
+    if args.workers > 1:
+        extract_zengjianchi_from_html_dir_parallel(zengjianchi_args, args.html_dir, args.output,
+                                                   args.workers, args.chunk_size, args.resume, args.sync_interval)
+    else:
+        zjc_ex = ZengJianChiExtractor(*zengjianchi_args)
+        if args.async_pipeline:
+            extract_zengjianchi_from_html_dir_async(zjc_ex, args.html_dir, args.output, args.queue_size,
+                                                    args.parse_processes, args.resume, args.sync_interval)
+        else:
+            extract_zengjianchi_from_html_dir(zjc_ex, args.html_dir, args.output, args.resume, args.sync_interval)
+        if zjc_ex.ner_tagger.cache is not None:
+            print('ner cache: %s' % zjc_ex.ner_tagger.cache.stats())
+    if args.profile is not None:
+        print(Profiler.get_profiler().summary())
+        Profiler.get_profiler().disable()
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import os
+import random
+
+# 公告类型
+CorpusKinds = ('zengjianchi', 'hetong', 'dingzeng')
+
+# 生成公司名、人名用到的词表，MockNERTagger 根据同样的词表识别实体
+CompanyCities = ('北京', '上海', '深圳', '广州', '杭州', '南京', '成都', '武汉', '西安', '天津')
+CompanyCores = ('华信', '东方', '新兴', '恒达', '金石', '远航', '中联', '博远', '瑞丰', '海润', '宏图', '安泰')
+CompanyIndustries = ('投资', '科技', '实业', '控股', '资产管理', '建设', '能源', '贸易')
+CompanySuffixes = ('股份有限公司', '有限公司', '集团有限公司')
+PersonSurnames = ('张', '王', '李', '赵', '刘', '陈', '杨', '黄', '周', '吴')
+PersonGivenNames = ('伟', '芳', '娜', '敏', '静', '强', '磊', '军', '洋', '勇', '艳', '杰')
+
+# 与抽取无关的段落
+BoilerplateSentences = (
+    '本公司及董事会全体成员保证信息披露内容的真实、准确和完整，没有虚假记载、误导性陈述或重大遗漏。',
+    '公司将持续关注相关事项的进展情况，并按照相关规定及时履行信息披露义务。',
+    '敬请广大投资者理性投资，注意投资风险。',
+    '本次权益变动不会导致公司控股股东、实际控制人发生变化，不会对公司治理结构及持续经营产生影响。',
+    '公司指定的信息披露媒体为《中国证券报》、《上海证券报》及巨潮资讯网，公司所有信息均以在上述指定媒体刊登的信息为准。',
+    '上述事项符合《公司法》、《证券法》以及《上市公司收购管理办法》等法律法规、部门规章及规范性文件的规定。',
+)
+# 与抽取无关的表格
+IrrelevantTables = (
+    (('项目', '本报告期', '上年同期', '增减变动幅度'),
+     ('营业总收入', '1,234,567.89', '1,000,000.00', '23.46%'),
+     ('营业利润', '234,567.00', '200,000.00', '17.28%'),
+     ('利润总额', '245,678.00', '210,000.00', '16.99%')),
+    (('联系人', '电话', '传真'),
+     ('董事会办公室', '010-12345678', '010-87654321')),
+)
+
+
+class CorpusGenerator(object):
+    """
+    合成公告 html 生成器，结构与训练数据相同：
+    正文由 div type="paragraph" / div type="content" 构成，段落可以嵌套，表格中含有 rowspan / colspan
+    相同的 seed 生成相同的语料
+    """
+
+    def __init__(self, seed=0):
+        self.random = random.Random(seed)
+
+    def company_name(self):
+        r = self.random
+        return r.choice(CompanyCities) + r.choice(CompanyCores) + r.choice(CompanyIndustries) + r.choice(CompanySuffixes)
+
+    def person_name(self):
+        r = self.random
+        return r.choice(PersonSurnames) + ''.join(r.choice(PersonGivenNames) for _ in range(r.randint(1, 2)))
+
+    def date(self):
+        r = self.random
+        return r.randint(2010, 2018), r.randint(1, 12), r.randint(1, 28)
+
+    def date_text(self):
+        return '%d年%d月%d日' % self.date()
+
+    def share_number(self, comma=True):
+        number = self.random.randint(10, 50000) * 100
+        if comma and self.random.random() < 0.5:
+            return '{:,}'.format(number)
+        return str(number)
+
+    def price(self):
+        return '%.2f' % self.random.uniform(3, 60)
+
+    def percent(self):
+        return '%.2f%%' % self.random.uniform(0.01, 20)
+
+    def boilerplate(self):
+        r = self.random
+        return ''.join(r.choice(BoilerplateSentences) for _ in range(r.randint(1, 4)))
+
+    # ---------- 增减持 ----------
+    def zengjianchi_paragraphs(self):
+        r = self.random
+        holder = self.company_name()
+        abbr = holder[2:4] + holder[4:6]
+        action = r.choice(('减持', '增持'))
+        year, month, day = self.date()
+        paragraphs = [
+            '公司于%d年%d月%d日收到股东%s（以下简称“%s”）的通知，%s于%d年%d月%d日至%d月%d日通过集中竞价交易方式%s公司股份%s股，'
+            '%s均价为%s元。' % (year, month, day, holder, abbr, abbr, year, month, day, month, min(day + 3, 28), action,
+                          self.share_number(), action, self.price()),
+            '本次%s后，%s持有公司股份%s股，占公司总股本的%s。' % (action, abbr, self.share_number(), self.percent()),
+        ]
+        if r.random() < 0.5:
+            person = self.person_name()
+            paragraphs.append('%s先生于%s%s公司股票%s股，成交均价为%s元。本次%s后%s先生持有公司股份%s股，占总股本的%s。' % (
+                person, self.date_text(), action, self.share_number(), self.price(), action, person,
+                self.share_number(), self.percent()))
+        return paragraphs
+
+    def zengjianchi_table(self):
+        """
+        股东减持情况表，一半的表格表头占两行
+        返回 [[(文本, rowspan, colspan), ...], ...]
+        """
+        r = self.random
+        if r.random() < 0.5:
+            rows = [[('股东名称', 1, 1), ('减持方式', 1, 1), ('减持期间', 1, 1), ('减持均价（元）', 1, 1),
+                     ('减持股数（股）', 1, 1), ('减持比例', 1, 1)]]
+        else:
+            rows = [[('股东名称', 2, 1), ('减持方式', 2, 1), ('减持期间', 2, 1), ('减持均价（元）', 2, 1),
+                     ('本次减持', 1, 2)],
+                    [('股数（股）', 1, 1), ('占总股本比例', 1, 1)]]
+        for _ in range(r.randint(1, 3)):
+            holder = self.company_name()
+            method_count = r.randint(1, 2)
+            for idx in range(method_count):
+                row = []
+                if idx == 0:
+                    row.append((holder, method_count, 1))
+                row += [(r.choice(('集中竞价', '大宗交易')), 1, 1), ('%d-%02d-%02d' % self.date(), 1, 1),
+                        (self.price(), 1, 1), (self.share_number(), 1, 1), (self.percent(), 1, 1)]
+                rows.append(row)
+        rows.append([('合计', 1, 3), ('-', 1, 1), (self.share_number(), 1, 1), (self.percent(), 1, 1)])
+        return rows
+
+    def zengjianchi_after_table(self):
+        r = self.random
+        rows = [[('股东名称', 2, 1), ('股份性质', 2, 1), ('本次变动前持有股份', 1, 2), ('本次变动后持有股份', 1, 2)],
+                [('股数（股）', 1, 1), ('占总股本比例', 1, 1), ('股数（股）', 1, 1), ('占总股本比例', 1, 1)]]
+        for _ in range(r.randint(1, 2)):
+            rows.append([(self.company_name(), 1, 1), ('无限售条件股份', 1, 1), (self.share_number(), 1, 1),
+                         (self.percent(), 1, 1), (self.share_number(), 1, 1), (self.percent(), 1, 1)])
+        return rows
+
+    # ---------- 重大合同 ----------
+    def hetong_paragraphs(self):
+        party_a, party_b = self.company_name(), self.company_name()
+        project = '%s%s项目第%d标段' % (self.random.choice(CompanyCities), self.random.choice(('道路', '桥梁', '隧道', '管网')),
+                                    self.random.randint(1, 9))
+        amount = self.share_number()
+        return [
+            '%s近日收到%s发来的《中标通知书》，确定公司为%s的中标单位。' % (party_b, party_a, project),
+            '公司于%s与%s签订了“%s施工合同”，合同金额为人民币%s元。' % (self.date_text(), party_a, project, amount),
+            '%s与公司不存在关联关系，最近三个会计年度未与公司发生类似业务。' % party_a,
+        ]
+
+    # ---------- 定增 ----------
+    def dingzeng_paragraphs(self):
+        obj = self.company_name()
+        return [
+            '本次非公开发行的发行对象为%s，发行数量为%s股，认购金额为%s元。' % (obj, self.share_number(), self.share_number()),
+            '%s以现金认购本次发行的股份，自本次发行结束之日起%d个月内不得转让。' % (obj, self.random.choice((12, 36))),
+        ]
+
+    def dingzeng_table(self):
+        r = self.random
+        rows = [[('序号', 1, 1), ('认购对象', 1, 1), ('认购数量（股）', 1, 1), ('认购金额（元）', 1, 1),
+                 ('锁定期（月）', 1, 1), ('认购方式', 1, 1)]]
+        for idx in range(r.randint(1, 5)):
+            rows.append([(str(idx + 1), 1, 1), (self.company_name(), 1, 1), (self.share_number(), 1, 1),
+                         (self.share_number(), 1, 1), (r.choice(('12', '36')), 1, 1), ('现金', 1, 1)])
+        return rows
+
+    # ---------- html ----------
+    @staticmethod
+    def plain_table(rows):
+        """
+        没有合并单元格的表格：文本行转换为 [(文本, 1, 1), ...]
+        """
+        return [[(text, 1, 1) for text in row] for row in rows]
+
+    @staticmethod
+    def render_table(rows):
+        rs = ['<table border="1">']
+        for row in rows:
+            rs.append('<tr>')
+            for text, rowspan, colspan in row:
+                attrs = ''
+                if rowspan > 1:
+                    attrs += ' rowspan="%d"' % rowspan
+                if colspan > 1:
+                    attrs += ' colspan="%d"' % colspan
+                rs.append('<td%s>%s</td>' % (attrs, text))
+            rs.append('</tr>')
+        rs.append('</table>')
+        return ''.join(rs)
+
+    def render_paragraph(self, texts):
+        """
+        一个段落 div，每段文本一个 content div，部分文本中插入换行、空格等空白字符
+        """
+        contents = []
+        for text in texts:
+            if self.random.random() < 0.3:
+                pos = self.random.randint(0, len(text))
+                text = text[:pos] + self.random.choice(('\n', ' ', '\t', '\r\n  ')) + text[pos:]
+            contents.append('<div type="content">%s</div>' % text)
+        return '<div type="paragraph">%s</div>' % ''.join(contents)
+
+    def generate(self, kind):
+        """
+        生成一篇 kind 类型的公告，返回 html 文本
+        """
+        r = self.random
+        if kind == 'zengjianchi':
+            paragraphs = self.zengjianchi_paragraphs()
+            tables = [self.zengjianchi_table()] if r.random() < 0.7 else []
+            if len(tables) > 0 and r.random() < 0.5:
+                tables.append(self.zengjianchi_after_table())
+        elif kind == 'hetong':
+            paragraphs, tables = self.hetong_paragraphs(), []
+        elif kind == 'dingzeng':
+            paragraphs = self.dingzeng_paragraphs()
+            tables = [self.dingzeng_table()] if r.random() < 0.7 else []
+        else:
+            raise ValueError('unknown corpus kind: %s' % kind)
+        tables += [self.plain_table(r.choice(IrrelevantTables)) for _ in range(r.randint(0, 2))]
+        blocks = [self.render_paragraph([self.boilerplate()])]
+        for text in paragraphs:
+            if r.random() < 0.3:
+                # 嵌套的段落：标题段落中含有子段落
+                blocks.append('<div type="paragraph" title="%s"><div type="content">%s</div>%s</div>'
+                              % (kind, self.boilerplate(), self.render_paragraph([text])))
+            else:
+                blocks.append(self.render_paragraph([text]))
+        for table in tables:
+            blocks.insert(r.randint(1, len(blocks)), '<div type="paragraph">%s</div>' % self.render_table(table))
+        blocks += [self.render_paragraph([self.boilerplate()]) for _ in range(r.randint(1, 5))]
+        return '<html><head><title>%s</title></head><body><div title="%s">%s</div></body></html>' \
+               % (kind, kind, ''.join(blocks))
+
+    def write_corpus(self, output_dir, kind, count, start_id=1):
+        """
+        在 output_dir 下生成 count 篇公告 (start_id.html, ...)，返回 html id 列表
+        增减持公告同时生成公告发布日期文件 public_time.csv
+        """
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        html_ids = []
+        public_times = []
+        for idx in range(start_id, start_id + count):
+            html_id = '%d.html' % idx
+            with open(os.path.join(output_dir, html_id), 'w', encoding='utf-8') as fp:
+                fp.write(self.generate(kind))
+            html_ids.append(html_id)
+            public_times.append('%d-%02d-%02d,%d' % (self.date() + (idx,)))
+        if kind == 'zengjianchi':
+            with open(os.path.join(output_dir, 'public_time.csv'), 'w', encoding='utf-8') as fp:
+                fp.write('time,id\n' + '\n'.join(public_times) + '\n')
+        return html_ids
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='生成合成公告语料')
+    parser.add_argument('--output-dir', default='./benchmark_corpus', help='输出目录，每种公告一个子目录')
+    parser.add_argument('--kind', default=None, choices=CorpusKinds, help='公告类型，不指定时生成全部类型')
+    parser.add_argument('--count', type=int, default=200, help='每种公告的数量')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    args = parser.parse_args()
+
+    generator = CorpusGenerator(args.seed)
+    for corpus_kind in (CorpusKinds if args.kind is None else (args.kind,)):
+        generator.write_corpus(os.path.join(args.output_dir, corpus_kind), corpus_kind, args.count)
+        print('%s: %d files' % (corpus_kind, args.count))
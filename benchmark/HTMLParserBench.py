@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import os
+import time
+
+from docparser import HTMLParser
+
+
+def bench(html_parser, html_paths):
+    """
+    解析所有 html，返回 (解析结果列表, 耗时)
+    """
+    start = time.perf_counter()
+    rs = []
+    for html_path in html_paths:
+        document = html_parser.parse(html_path)
+        rs.append((document.paragraphs, document.tables))
+    return rs, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='对比 HTMLParser 各个解析后端的结果与耗时')
+    parser.add_argument('--html-dir', default='../zengjianchi/html', help='html 目录')
+    parser.add_argument('--limit', type=int, default=200, help='使用的 html 个数')
+    args = parser.parse_args()
+
+    html_paths = [os.path.join(args.html_dir, html_id) for html_id in sorted(os.listdir(args.html_dir))[:args.limit]]
+    results = {}
+    for backend in HTMLParser.ParserBackends:
+        results[backend] = bench(HTMLParser.HTMLParser(backend), html_paths)
+    bs4_rs, bs4_time = results['bs4']
+    print('files: %d' % len(html_paths))
+    for backend in HTMLParser.ParserBackends:
+        rs, cost = results[backend]
+        diff_count = sum(1 for a, b in zip(bs4_rs, rs) if a != b)
+        print('%-5s %.2f ms / file, %.2fx, different files: %d'
+              % (backend, cost * 1000 / len(html_paths), bs4_time / cost, diff_count))
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+import re
+
+from benchmark import CorpusGenerator
+from ner import NERTagger
+
+# 合成语料中的公司名、人名
+CompanyNamePattern = '(?:%s)(?:%s)(?:%s)(?:%s)' % tuple(
+    '|'.join(sorted(words, key=len, reverse=True)) for words in
+    (CorpusGenerator.CompanyCities, CorpusGenerator.CompanyCores, CorpusGenerator.CompanyIndustries,
+     CorpusGenerator.CompanySuffixes))
+PersonNamePattern = '(?:%s)(?:%s){1,2}(?=先生|女士)' % ('|'.join(CorpusGenerator.PersonSurnames),
+                                                    '|'.join(CorpusGenerator.PersonGivenNames))
+# 分词：每个命名分组对应一种词性
+WordPattern = re.compile(
+    r'(?P<Ni>%s)|(?P<Nh>%s)|(?P<nt>\d{4}年\d{1,2}月(?:\d{1,2}日)?|\d{1,2}月\d{1,2}日)|(?P<m>\d+(?:\.\d+)?(?:%%|万|亿)?)'
+    r'|(?P<ws>[A-Za-z]+)|(?P<v>增持|减持|出售|买入|持有|认购|签订|签署|收到|发来)|(?P<n>[一-鿿]{1,2})|(?P<wp>[\s\S])'
+    % (CompanyNamePattern, PersonNamePattern))
+
+
+class MockSegmentor(object):
+    """
+    按 WordPattern 分词，同时记录每个分词的词性，供 MockPostagger / MockRecognizer 使用
+    """
+
+    def __init__(self):
+        self.word_tags = {}
+
+    def segment(self, text):
+        words = []
+        for match in WordPattern.finditer(text):
+            word = match.group()
+            self.word_tags[word] = match.lastgroup
+            words.append(word)
+        return words
+
+
+class MockPostagger(object):
+
+    def __init__(self, segmentor):
+        self.segmentor = segmentor
+
+    def postag(self, words):
+        word_tags = self.segmentor.word_tags
+        rs = []
+        for word in words:
+            tag = word_tags.get(word, 'n')
+            # 人名、机构名的词性为名词，实体类型由 MockRecognizer 给出
+            rs.append('n' if tag in ('Ni', 'Nh') else tag)
+        return rs
+
+
+class MockRecognizer(object):
+
+    def __init__(self, segmentor):
+        self.segmentor = segmentor
+
+    def recognize(self, words, post_tags):
+        word_tags = self.segmentor.word_tags
+        rs = []
+        for word in words:
+            tag = word_tags.get(word)
+            rs.append('S-' + tag if tag in ('Ni', 'Nh') else 'O')
+        return rs
+
+
+class MockNERTagger(NERTagger.NERTagger):
+    """
+    不需要 LTP 模型文件的 NERTagger，用于基准测试
+    分词、词性标注、命名实体识别由基于合成语料词表的规则完成，其余流程 (批量打标签、词典调整等) 与 NERTagger 相同
+    """
+
+    def __init__(self, blacklist_path=None):
+        # 不调用 NERTagger.__init__，不加载模型
+        self.model_dir_path = None
+        self.segmentor = MockSegmentor()
+        self.postagger = MockPostagger(self.segmentor)
+        self.recognizer = MockRecognizer(self.segmentor)
+        self.com_blacklist = frozenset() if blacklist_path is None else NERTagger.load_blacklist(blacklist_path)
+        self.cache = None
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import os
+import time
+
+from docparser import HTMLParser
+from ner import NERTagger
+
+
+def load_paragraphs(html_dir_path, limit):
+    """
+    读取 html_dir_path 下前 limit 个 html 的所有段落
+    """
+    html_parser = HTMLParser.HTMLParser()
+    paragraphs = []
+    for html_id in sorted(os.listdir(html_dir_path))[:limit]:
+        paragraphs += html_parser.parse_content(os.path.join(html_dir_path, html_id))
+    return paragraphs
+
+
+def bench_single(ner_tagger, paragraphs):
+    start = time.perf_counter()
+    rs = [ner_tagger.ner(paragraph, {}) for paragraph in paragraphs]
+    return rs, time.perf_counter() - start
+
+
+def bench_batch(ner_tagger, paragraphs):
+    start = time.perf_counter()
+    rs = ner_tagger.ner_batch(paragraphs, {}, packed=True)
+    return rs, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='对比逐段落调用 ner 与合并调用 pyltp 的 ner_batch (packed=True) 的吞吐量以及结果差异')
+    parser.add_argument('--ner-model-dir', default='D:/pyltp/ltp_data', help='pyltp 模型目录')
+    parser.add_argument('--ner-blacklist', default='./config/ner_com_blacklist.txt', help='公司名黑名单')
+    parser.add_argument('--html-dir', default='../zengjianchi/html', help='html 目录')
+    parser.add_argument('--limit', type=int, default=100, help='使用的 html 个数')
+    args = parser.parse_args()
+
+    # 不使用缓存，保证两种方式都实际调用 pyltp
+    ner_tagger = NERTagger.NERTagger(args.ner_model_dir, args.ner_blacklist)
+    paragraphs = load_paragraphs(args.html_dir, args.limit)
+    single_rs, single_time = bench_single(ner_tagger, paragraphs)
+    batch_rs, batch_time = bench_batch(ner_tagger, paragraphs)
+    diff_count = sum(1 for a, b in zip(single_rs, batch_rs) if a.get_tagged_str() != b.get_tagged_str())
+    print('paragraphs: %d' % len(paragraphs))
+    print('ner:       %.1f paragraphs/s' % (len(paragraphs) / single_time))
+    print('packed:    %.1f paragraphs/s' % (len(paragraphs) / batch_time))
+    print('different tagged paragraphs: %d' % diff_count)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from benchmark.CorpusGenerator import CorpusGenerator
+from benchmark.MockNERTagger import MockNERTagger
+from docparser import HTMLParser
+from extract.ZengJianChiExtractor import ZengJianChiExtractor
+from ner import NERTagger
+
+# 标注文件中用于匹配记录的字段：公告id, 股东全称, 变动截止日期
+LabelKeyColumns = (0, 1, 3)
+
+
+def load_labels(label_path):
+    """
+    读取增减持标注文件，每行一条记录：公告id, 股东全称, 股东简称, 变动截止日期, 变动价格, 变动数量, 变动后持股数, 变动后持股比例
+    支持制表符分隔 (训练数据) 或逗号分隔 (app.py 的结果文件) 两种格式
+    返回 [记录的字段列表, ...]
+    """
+    rs = []
+    with open(label_path, encoding='utf-8-sig') as fp:
+        for line in fp:
+            line = line.rstrip('\r\n')
+            if len(line) <= 0 or line.startswith('公告id'):
+                continue
+            fields = line.split('\t') if '\t' in line else line.split(',')
+            rs.append([field.strip() for field in fields] + [''] * (8 - len(fields)))
+    return rs
+
+
+def extract_rows(extractor, document, html_id):
+    """
+    与 app.py 相同的输出：每条记录一行 "公告id,股东全称,..."
+    """
+    rs = []
+    for record in extractor.extract(document, html_id):
+        if record is None:
+            continue
+        result = record.to_result()
+        if result is not None:
+            rs.append('%s,%s' % (html_id.split('.')[0], result))
+    return rs
+
+
+def recall(labels, rows):
+    """
+    返回 (命中的记录数, 命中的字段数, 标注的字段数)
+    记录按 公告id + 股东全称 + 变动截止日期 匹配，字段只统计标注中非空的字段
+    """
+    extracted = {}
+    for row in rows:
+        fields = row.split(',')
+        extracted.setdefault(tuple(fields[i] for i in LabelKeyColumns), []).append(fields)
+    hit_records, hit_fields, total_fields = 0, 0, 0
+    for label in labels:
+        label_fields = [i for i in range(1, 8) if len(label[i]) > 0]
+        total_fields += len(label_fields)
+        candidates = extracted.get(tuple(label[i] for i in LabelKeyColumns))
+        if candidates is None:
+            continue
+        hit_records += 1
+        hit_fields += max(sum(1 for i in label_fields if fields[i] == label[i]) for fields in candidates)
+    return hit_records, hit_fields, total_fields
+
+
+def bench(extractor, html_dir, html_parser_backend):
+    """
+    对目录下的每个公告分别关闭、开启段落预筛选进行抽取
+    返回 (两次的输出 [[行, ...], [行, ...]], 两次的耗时, 段落数, 跳过的段落数)
+    """
+    html_ids = sorted((name for name in os.listdir(html_dir) if name.endswith('.html')),
+                      key=lambda name: (len(name), name))
+    html_parser = HTMLParser.HTMLParser(html_parser_backend, extractor.html_parser.table_filter)
+    paragraph_filter = extractor.paragraph_filter
+    rows = [[], []]
+    seconds = [0.0, 0.0]
+    paragraph_count, skipped_count = 0, 0
+    for html_id in html_ids:
+        document = html_parser.parse(os.path.join(html_dir, html_id))
+        for idx, gate in enumerate((None, paragraph_filter)):
+            extractor.paragraph_filter = gate
+            start = time.perf_counter()
+            rows[idx].append(extract_rows(extractor, document, html_id))
+            seconds[idx] += time.perf_counter() - start
+        paragraph_count += extractor.paragraph_count
+        skipped_count += extractor.skipped_paragraph_count
+    extractor.paragraph_filter = paragraph_filter
+    return html_ids, rows, seconds, paragraph_count, skipped_count
+
+
+def create_tagger(args):
+    if args.tagger == 'mock':
+        return MockNERTagger(args.ner_blacklist)
+    return NERTagger.get_tagger(args.ner_model_dir, args.ner_blacklist, backend=args.tagger)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='增减持段落关键词预筛选：统计跳过 NER 的段落比例，检查抽取结果与召回率不变')
+    parser.add_argument('--html-dir', default=None, help='增减持公告 html 目录，不指定时在临时目录中生成合成语料')
+    parser.add_argument('--count', type=int, default=200, help='生成合成语料时的公告数量')
+    parser.add_argument('--seed', type=int, default=0, help='生成合成语料的随机种子')
+    parser.add_argument('--public-time', default=None, help='公告发布日期文件，默认为 html 目录下的 public_time.csv')
+    parser.add_argument('--labels', default=None, help='标注文件 (训练数据或人工核对过的结果文件)，指定时计算召回率')
+    parser.add_argument('--config', default='config/ZengJianChiConfig.json')
+    parser.add_argument('--tagger', default='mock', choices=['mock', 'rule', 'ltp'],
+                        help='NER：mock -- MockNERTagger (只适用于合成语料)，rule -- 规则后端，ltp -- pyltp')
+    parser.add_argument('--ner-model-dir', default=None, help='pyltp 模型目录，--tagger ltp 时需要')
+    parser.add_argument('--ner-blacklist', default='./config/ner_com_blacklist.txt', help='公司名黑名单')
+    parser.add_argument('--html-backend', default='bs4', choices=HTMLParser.ParserBackends, help='html 解析后端')
+    args = parser.parse_args()
+
+    temp_dir = None
+    html_dir = args.html_dir
+    if html_dir is None:
+        temp_dir = tempfile.TemporaryDirectory()
+        html_dir = temp_dir.name
+        CorpusGenerator(args.seed).write_corpus(html_dir, 'zengjianchi', args.count)
+    public_time_path = args.public_time or os.path.join(html_dir, 'public_time.csv')
+    try:
+        zjc_ex = ZengJianChiExtractor(args.config, args.ner_model_dir, args.ner_blacklist, public_time_path,
+                                      html_parser_backend=args.html_backend, ner_tagger=create_tagger(args))
+        if zjc_ex.paragraph_filter is None:
+            sys.exit('%s: paragraph_filter.keywords is empty' % args.config)
+        html_ids, (rows_off, rows_on), (seconds_off, seconds_on), paragraph_count, skipped_count = \
+            bench(zjc_ex, html_dir, args.html_backend)
+    finally:
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    skip_ratio = skipped_count * 100.0 / paragraph_count if paragraph_count > 0 else 0.0
+    print('documents: %d, paragraphs: %d, skipped: %d (%.1f%%)' % (len(html_ids), paragraph_count, skipped_count,
+                                                                   skip_ratio))
+    print('extract seconds: %.3f (filter off) / %.3f (filter on), %.2fx' % (
+        seconds_off, seconds_on, seconds_off / seconds_on if seconds_on > 0 else 0.0))
+    changed = [html_id for html_id, off, on in zip(html_ids, rows_off, rows_on) if sorted(off) != sorted(on)]
+    print('documents with different records: %d' % len(changed))
+    for html_id in changed[:10]:
+        print('  %s' % html_id)
+    recall_changed = False
+    if args.labels is not None:
+        labels = load_labels(args.labels)
+        doc_ids = set(html_id.split('.')[0] for html_id in html_ids)
+        labels = [label for label in labels if label[0] in doc_ids]
+        results = [recall(labels, [row for doc_rows in rows for row in doc_rows]) for rows in (rows_off, rows_on)]
+        for name, (hit_records, hit_fields, total_fields) in zip(('filter off', 'filter on'), results):
+            print('%-10s record recall: %d / %d, field recall: %d / %d' % (name, hit_records, len(labels),
+                                                                            hit_fields, total_fields))
+        recall_changed = results[0] != results[1]
+    if len(changed) > 0 or recall_changed:
+        sys.exit(1)
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+import re
+import sys
+import time
+
+from extract import PatternCatalogue
+from extract.ZengJianChiExtractor import ZengJianChiExtractor, ZengJianChiRecord
+from ner.NERTagger import NERTaggedText
+
+# 标签 -> NERTaggedText 中对应的词性
+EntityTags = {'person': 'Nh', 'org': 'Ni', 'date': 'nt', 'num': 'm', 'percent': 'mp'}
+EntityPattern = re.compile(r'<(person|org|date|num|percent)>(.*?)</\1>')
+
+# 打标签之后的样例段落
+SampleTaggedParagraphs = [
+    '<org>华夏幸福基业股份有限公司</org>（以下简称“<org>华夏幸福</org>”）于<date>2017年6月9日</date>收到公司股东'
+    '<org>鼎基资本管理有限公司</org>（简称:“<org>鼎基资本</org>”）的通知，<org>鼎基资本</org>于<date>2017年6月8日</date>'
+    '通过上海证券交易所集中竞价交易系统减持公司股份<num>6,200,000</num>股，成交均价<num>28.51</num>元/股。',
+    '本次减持后，<org>鼎基资本</org>持有公司股份<num>150,330,000</num>股，占公司总股本的<percent>5.12%</percent>。',
+    '<person>王晓东</person>先生于<date>2016年12月1日</date>至<date>2016年12月5日</date>期间增持公司股票'
+    '<num>1,000,000</num>股，增持均价为<num>12.30</num>元，增持计划实施后，<person>王晓东</person>先生持有公司股份'
+    '<num>3,000,000</num>股，占公司总股本的<percent>0.53%</percent>。',
+    '公司于<date>2018年3月2日</date>披露了《关于股东减持股份计划的公告》，后续不低于<num>5</num>个交易日内减持股份'
+    '<num>2,000,000</num>股。',
+    '截至本公告披露日，本次减持计划尚未实施完毕，公司将持续关注股东减持计划的实施进展情况。',
+]
+
+
+class LegacyZengJianChiExtractor(ZengJianChiExtractor):
+    """
+    修改前的段落抽取实现：每次调用时在函数内部编译正则表达式，
+    并从段落开头重新查找股东名称；仅用于对比，代码与修改前保持一致
+    """
+
+    def extract_company_name(self, paragraph):
+        """
+        抽取股东名称以及简称，保存在 com_abbr_ner_dict 中
+        返回增加 com_abbr_ner_dict 中增加的条目数量
+        extract_from_paragraph 子例程
+        """
+        targets = re.finditer(
+            r'(股东|<org>){1,2}(?P<com>.{1,28}?)(</org>)?[(（].{0,5}?简称:?("|“|<org>)?(?P<com_abbr>.{2,20}?)("|”|</org>)?[)）]',
+            paragraph)
+        size_before = len(self.com_abbr_ner_dict)
+        for target in targets:
+            # 股东简称
+            com_abbr = target.group("com_abbr")
+            # 股东名称
+            com_name = target.group("com")
+            if '<' in com_abbr or '>' in com_abbr:
+                com_abbr = self.delete_and_modify(com_abbr)
+            if '<' in com_name or '>' in com_name:
+                com_name = self.delete_and_modify(com_name)
+            if com_abbr is not None and com_name is not None:
+                self.com_abbr_dict[com_abbr] = com_name
+                self.com_full_dict[com_name] = com_abbr
+                self.com_abbr_ner_dict[com_abbr] = "Ni"
+                self.com_abbr_ner_dict[com_name] = "Ni"
+        return len(self.com_abbr_ner_dict) - size_before
+
+
+    def extract_change(self, paragraph):
+        """
+        用于抽取一个段落中的变动数量
+        extract_from_paragraph 子例程
+        """
+        records = []
+        targets = re.finditer(
+            r'(出售|减持|增持|买入)了?[^，。.,:：;!?？（）()“”"<>]*?(股票|股份|(<org>([^.。,，<>]*?)</org>))[^.。,，《》]{0,30}?<num>(?P<share_num>.{1,20}?)</num>股?',
+            paragraph)
+        pat_dates = [k for k in re.finditer(r'<date>(.*?)</date>', paragraph)]
+        for target in targets:
+            # 变动数量
+            share_num = target.group("share_num")
+            start_pos = target.start()
+            end_pos = target.end()
+            # 查找公司
+            pat_com = re.compile(r'<org>(.*?)</org>')
+            m_com = pat_com.findall(paragraph, 0, start_pos)
+            shareholder = ""
+            if m_com is not None and len(m_com) > 0:
+                shareholder = m_com[-1]
+            else:
+                pat_person = re.compile(r'<person>(.*?)</person>')
+                m_person = pat_person.findall(paragraph, 0, start_pos)
+                if m_person is not None and len(m_person) > 0:
+                    shareholder = m_person[-1]
+            # 没有查找到股东名称
+            if shareholder is None or len(shareholder) == 0:
+                continue
+            # 归一化公司全称简称
+            full_name, short_name = self.get_shareholder(shareholder)
+            # 查找日期
+            period_find = re.compile(r'。|(后续)|(不[低高]于)')
+            last_date = None
+            change_date = ""
+            for pat_date in pat_dates:
+                # 循环至变动数量之前的最后一个时间段名词
+                if pat_date.end() < start_pos:
+                    last_date = pat_date
+                else:
+                    break
+            if last_date is not None:
+                tmp_end = last_date.end()
+                # 日期与变动数量之间
+                # 存在句号：说明日期与变动数量很可能没有联系
+                if len(period_find.findall(paragraph, tmp_end, end_pos)) <= 0:
+                    change_date = last_date.group().split('>')[1].split('<')[0]
+            # 查找变动价格
+            pat_price = re.compile(r'(均价|(平均)?(增持|减持|成交)?(价格|股价))([:：为])?<num>(?P<share_price>.*?)</num>')
+            m_price = pat_price.search(paragraph, start_pos)
+            period_find = re.compile(r'。')
+            share_price = ""
+            if m_price is not None and len(period_find.findall(paragraph, start_pos, m_price.end())) <= 0:
+                share_price = m_price.group("share_price")
+            # 成功抽取变动记录
+            records.append(ZengJianChiRecord(full_name, short_name, change_date, share_price, share_num, "", ""))
+        return records
+
+    def extract_change_after(self, paragraph):
+        """
+        用于抽取变动后持股数和变动后持股比例
+        extract_from_paragraph 子例程
+        """
+        records = []
+        targets = re.finditer(
+            r'(增持(计划实施)?后|减持(计划实施)?后|变动后)[^。;；]*?持有.{0,30}?<num>(?P<share_num_after>.*?)</num>(股|万股|百万股|亿股)?',
+            paragraph)
+        for target in targets:
+            share_num_after = target.group("share_num_after")
+            start_pos = target.start()
+            end_pos = target.end()
+            # 查找公司
+            pat_com = re.compile(r'<org>(.*?)</org>')
+            m_com = pat_com.findall(paragraph, 0, end_pos)
+            shareholder = ""
+            if m_com is not None and len(m_com) > 0:
+                shareholder = m_com[-1]
+            else:
+                pat_person = re.compile(r'<person>(.*?)</person>')
+                m_person = pat_person.findall(paragraph, 0, end_pos)
+                if m_person is not None and len(m_person) > 0:
+                    shareholder = m_person[-1]
+            # 没有查找到股东名称
+            if shareholder is None or len(shareholder) == 0:
+                continue
+            # 归一化公司全称简称
+            full_name, short_name = self.get_shareholder(shareholder)
+            # 查找变动后持股比例
+            pat_percent_after = re.compile(r'<percent>(?P<share_percent>.*?)</percent>')
+            m_percent_after = pat_percent_after.search(paragraph, start_pos)
+            period_find = re.compile(r'。')
+            share_percent_after = ""
+            if m_percent_after is not None and len(period_find.findall(paragraph, start_pos, m_percent_after.end())) <= 0:
+                share_percent_after = m_percent_after.group("share_percent")
+            # 成功抽取变动后记录
+            records.append(ZengJianChiRecord(full_name, short_name, "", "", "", share_num_after, share_percent_after))
+        return records
+
+
+def new_extractor(cls):
+    extractor = cls.__new__(cls)
+    # 不调用 __init__ (不需要配置文件和 NER 模型)，只设置段落抽取用到的属性
+    extractor.patterns = PatternCatalogue.PatternCatalogue(PatternCatalogue.ZengJianChiPatternNames)
+    extractor.clear_com_abbr_dict()
+    return extractor
+
+
+def to_tagged_seg_list(tagged_str):
+    """
+    将打标签之后的文本还原为 (word, tag) 列表
+    """
+    rs, start = [], 0
+    for target in EntityPattern.finditer(tagged_str):
+        if target.start() > start:
+            rs.append((tagged_str[start:target.start()], 'n'))
+        rs.append((target.group(2), EntityTags[target.group(1)]))
+        start = target.end()
+    if start < len(tagged_str):
+        rs.append((tagged_str[start:], 'n'))
+    return rs
+
+
+def run_paragraphs(extractor, tagged_seg_lists):
+    """
+    依次对每个段落抽取股东简称、变动记录、变动后记录，返回结果文本用于比较
+    """
+    extractor.clear_com_abbr_dict()
+    legacy = isinstance(extractor, LegacyZengJianChiExtractor)
+    rs = []
+    for tagged_seg_list in tagged_seg_lists:
+        tagged_text = NERTaggedText('', tagged_seg_list)
+        paragraph = tagged_text.get_tagged_str()
+        extractor.extract_company_name(paragraph)
+        change_records = extractor.extract_change(paragraph if legacy else tagged_text)
+        change_after_records = extractor.extract_change_after(paragraph if legacy else tagged_text)
+        rs.append(([str(record) for record in change_records], [str(record) for record in change_after_records]))
+    return rs
+
+
+def bench(extractor, paragraphs, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        run_paragraphs(extractor, paragraphs)
+    return (time.perf_counter() - start) / (repeat * len(paragraphs))
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    legacy_extractor = new_extractor(LegacyZengJianChiExtractor)
+    extractor = new_extractor(ZengJianChiExtractor)
+    samples = [to_tagged_seg_list(paragraph) for paragraph in SampleTaggedParagraphs]
+    assert run_paragraphs(legacy_extractor, samples) == run_paragraphs(extractor, samples)
+    legacy_cost = bench(legacy_extractor, samples, repeat)
+    cost = bench(extractor, samples, repeat)
+    print('before: %.2f us / paragraph' % (legacy_cost * 1e6))
+    print('after:  %.2f us / paragraph' % (cost * 1e6))
+    print('speedup: %.2fx' % (legacy_cost / cost))
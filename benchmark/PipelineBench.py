@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+
+from benchmark.CorpusGenerator import CorpusGenerator, CorpusKinds
+from benchmark.MockNERTagger import MockNERTagger
+from docparser import DocumentStore
+from docparser import HTMLParser
+from extract.Contract_Extractor import Contract_Extractor
+from extract.DZExtractor import ZengJianChiExtractor as DZExtractor
+from extract.ZengJianChiExtractor import ZengJianChiExtractor
+from ner import NERTagger
+from ner.EntityIndex import EntityIndex
+from utils import TextUtils
+from utils.AsyncPipeline import AsyncPipeline
+
+
+def timed(func, repeat):
+    """
+    执行 func repeat 次，返回 (最后一次的结果, 最短耗时)
+    """
+    best, rs = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rs = func()
+        cost = time.perf_counter() - start
+        if best is None or cost < best:
+            best = cost
+    return rs, best
+
+
+def stage_result(seconds, items, unit):
+    return {'seconds': seconds, 'items': items, 'unit': unit,
+            'items_per_second': items / seconds if seconds > 0 else None}
+
+
+def load_raw_contents(html_paths):
+    """
+    读取所有 content div 中未清洗的文本
+    """
+    rs = []
+    for html_path in html_paths:
+        root = HTMLParser.HTMLParser.load_lxml_tree(html_path)
+        if root is not None:
+            rs += [HTMLParser.HTMLParser.lxml_plain_text(div) for div in HTMLParser.ContentDivXPath(root)]
+    return rs
+
+
+def bench_corpus(kind, html_dir, extractor, backend, repeat):
+    """
+    对一种公告的语料分阶段计时，返回 {阶段名: 结果}
+    """
+    html_ids = sorted((name for name in os.listdir(html_dir) if name.endswith('.html')),
+                      key=lambda name: int(name.split('.')[0]))
+    html_paths = [os.path.join(html_dir, html_id) for html_id in html_ids]
+    total_bytes = sum(os.path.getsize(html_path) for html_path in html_paths)
+    html_parser = HTMLParser.HTMLParser(backend)
+    rs = {}
+
+    # 1. html 解析 (不做表格预筛选)
+    documents, cost = timed(lambda: [html_parser.parse(html_path) for html_path in html_paths], repeat)
+    rs['parse'] = stage_result(cost, total_bytes, 'bytes')
+
+    # 1'. 从预解析文件中读取解析结果
+    with tempfile.TemporaryDirectory() as store_dir:
+        store_path = os.path.join(store_dir, 'documents.store')
+        DocumentStore.write_store(store_path, html_dir, html_parser)
+        with DocumentStore.DocumentStore(store_path) as store:
+            _, cost = timed(lambda: [store.source(html_id) for html_id in html_ids], repeat)
+    rs['store_load'] = stage_result(cost, total_bytes, 'bytes')
+
+    # 2. 文本清洗
+    raw_contents = load_raw_contents(html_paths)
+    _, cost = timed(lambda: [TextUtils.clean_text(text) for text in raw_contents], repeat)
+    rs['clean'] = stage_result(cost, sum(len(text) for text in raw_contents), 'chars')
+
+    # 3. NER (MockNERTagger 或规则后端，不反映 pyltp 的开销)
+    paragraph_lists = [document.paragraphs for document in documents]
+    tagged_lists, cost = timed(lambda: [extractor.ner_tagger.ner_batch(paragraphs, {})
+                                        for paragraphs in paragraph_lists], repeat)
+    rs['ner'] = stage_result(cost, sum(len(paragraphs) for paragraphs in paragraph_lists), 'paragraphs')
+
+    # 4. 段落正则抽取与表格抽取
+    if kind == 'zengjianchi':
+        def extract_paragraphs():
+            for tagged_paragraphs in tagged_lists:
+                extractor.clear_com_abbr_dict()
+                for tag_res in tagged_paragraphs:
+                    extractor.extract_from_paragraph(tag_res)
+    elif kind == 'dingzeng':
+        def extract_paragraphs():
+            for tagged_paragraphs in tagged_lists:
+                extractor.ner_dict = EntityIndex()
+                for tag_res in tagged_paragraphs:
+                    extractor.extract_from_paragraph(tag_res)
+    else:
+        tagged_strs = [[tag_res.get_tagged_str() for tag_res in tagged_paragraphs] for tagged_paragraphs in tagged_lists]
+
+        def extract_paragraphs():
+            for tagged_paragraphs in tagged_strs:
+                extractor.extract_contract_name(tagged_paragraphs)
+    _, cost = timed(extract_paragraphs, repeat)
+    rs['paragraph_rules'] = stage_result(cost, sum(len(tagged) for tagged in tagged_lists), 'paragraphs')
+    if hasattr(extractor, 'extract_from_table_dict'):
+        grids = [grid for document in documents for grid in document.grids]
+        _, cost = timed(lambda: [extractor.extract_from_table_dict(grid) for grid in grids], repeat)
+        rs['table_rules'] = stage_result(cost, len(grids), 'tables')
+
+    # 5. 端到端抽取 (含表格预筛选)
+    if kind == 'zengjianchi':
+        _, cost = timed(lambda: [extractor.extract(html_path, html_id)
+                                 for html_path, html_id in zip(html_paths, html_ids)], repeat)
+    else:
+        _, cost = timed(lambda: [extractor.extract(html_path) for html_path in html_paths], repeat)
+    rs['end_to_end'] = stage_result(cost, len(html_paths), 'files')
+
+    # 6. asyncio 流水线端到端抽取：读取、解析与抽取重叠进行
+    if kind == 'zengjianchi':
+        def extract(html_path, document):
+            return extractor.extract(document, os.path.basename(html_path))
+    else:
+        def extract(html_path, document):
+            return extractor.extract(document)
+    _, cost = timed(lambda: AsyncPipeline(parse=lambda html_path, data: extractor.html_parser.parse(data),
+                                          extract=extract, write=lambda html_path, records: None).run(html_paths),
+                    repeat)
+    rs['async_end_to_end'] = stage_result(cost, len(html_paths), 'files')
+    return rs
+
+
+def create_extractor(kind, corpus_dir, backend, ner_tagger):
+    if kind == 'zengjianchi':
+        return ZengJianChiExtractor('config/ZengJianChiConfig.json', None, None,
+                                    os.path.join(corpus_dir, 'public_time.csv'),
+                                    html_parser_backend=backend, ner_tagger=ner_tagger)
+    if kind == 'dingzeng':
+        return DZExtractor('config/DZExtractor.json', None, None, html_parser_backend=backend, ner_tagger=ner_tagger)
+    return Contract_Extractor(None, None, html_parser_backend=backend, ner_tagger=ner_tagger)
+
+
+def compare(results, baseline):
+    """
+    与之前保存的结果对比，打印各阶段的吞吐量变化
+    """
+    for kind, stages in sorted(results['corpora'].items()):
+        for stage_name, stage in sorted(stages.items()):
+            old = baseline.get('corpora', {}).get(kind, {}).get(stage_name)
+            if old is None or not old.get('items_per_second') or not stage['items_per_second']:
+                continue
+            print('%-12s %-16s %8.2fx' % (kind, stage_name, stage['items_per_second'] / old['items_per_second']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='合成语料上的分阶段吞吐量基准测试，不需要 LTP 模型文件')
+    parser.add_argument('--corpus-dir', default=None,
+                        help='CorpusGenerator 生成的语料目录，不指定时在临时目录中生成')
+    parser.add_argument('--count', type=int, default=200, help='在临时目录中生成语料时每种公告的数量')
+    parser.add_argument('--seed', type=int, default=0, help='生成语料的随机种子')
+    parser.add_argument('--kind', default=None, choices=CorpusKinds, help='只测试一种公告')
+    parser.add_argument('--html-backend', default='bs4', choices=HTMLParser.ParserBackends, help='html 解析后端')
+    parser.add_argument('--repeat', type=int, default=3, help='每个阶段重复次数，取最短耗时')
+    parser.add_argument('--ner-blacklist', default='./config/ner_com_blacklist.txt', help='公司名黑名单')
+    parser.add_argument('--tagger', default='mock', choices=['mock', 'rule'],
+                        help='NER：mock -- 基于合成语料词表的 MockNERTagger，rule -- NERTagger 的规则后端')
+    parser.add_argument('--output', default=None, help='结果 JSON 文件路径')
+    parser.add_argument('--compare', default=None, help='与之前保存的结果 JSON 对比')
+    args = parser.parse_args()
+
+    kinds = CorpusKinds if args.kind is None else (args.kind,)
+    temp_dir = None
+    corpus_dir = args.corpus_dir
+    if corpus_dir is None:
+        temp_dir = tempfile.TemporaryDirectory()
+        corpus_dir = temp_dir.name
+        generator = CorpusGenerator(args.seed)
+        for corpus_kind in CorpusKinds:
+            generator.write_corpus(os.path.join(corpus_dir, corpus_kind), corpus_kind, args.count)
+
+    if args.tagger == 'rule':
+        ner_tagger = NERTagger.get_tagger(None, args.ner_blacklist, backend='rule')
+    else:
+        ner_tagger = MockNERTagger(args.ner_blacklist)
+    results = {
+        'meta': {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'html_backend': args.html_backend,
+            'tagger': args.tagger,
+            'repeat': args.repeat,
+            'corpus_dir': args.corpus_dir,
+            'count': None if args.corpus_dir is not None else args.count,
+            'seed': None if args.corpus_dir is not None else args.seed,
+        },
+        'corpora': {},
+    }
+    try:
+        for corpus_kind in kinds:
+            kind_dir = os.path.join(corpus_dir, corpus_kind)
+            extractor = create_extractor(corpus_kind, kind_dir, args.html_backend, ner_tagger)
+            results['corpora'][corpus_kind] = bench_corpus(corpus_kind, kind_dir, extractor, args.html_backend,
+                                                           args.repeat)
+    finally:
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    for corpus_kind, stages in sorted(results['corpora'].items()):
+        for stage_name, stage in sorted(stages.items()):
+            print('%-12s %-16s %10.4f s %14.1f %s/s' % (corpus_kind, stage_name, stage['seconds'],
+                                                         stage['items_per_second'] or 0.0, stage['unit']))
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8') as fp:
+            json.dump(results, fp, ensure_ascii=False, indent=2, sort_keys=True)
+    if args.compare is not None:
+        with open(args.compare, encoding='utf-8') as fp:
+            compare(results, json.load(fp))
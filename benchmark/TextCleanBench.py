@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import os
+import time
+
+from docparser import HTMLParser
+from utils import TextUtils
+
+# 修改前的实现，仅用于对比
+BlankCharSet = TextUtils.BlankCharSet
+CommaNumberPattern = TextUtils.CommaNumberPattern
+CommaCharInNumberSet = TextUtils.CommaCharInNumberSet
+PartDataPattern = TextUtils.PartDataPattern
+
+
+def legacy_clean_text(text):
+    """
+    1. 去除没有用处的空格符
+    2. 去除带逗号的数字中的逗号
+    3. 规范化时间段文本
+    """
+    return legacy_add_date(legacy_clean_number_in_text(legacy_remove_blank_chars(text)))
+
+
+def legacy_add_date(text):
+    """
+    规范化时间段文本，使 "至" 前后都有年份
+    例如 "2014年5月4日至6月3日" 将转化为 "2014年5月4日至2014年6月3日"
+    clean_text 子例程
+    """
+    part_dates = PartDataPattern.finditer(text)
+    new_text, start = [], 0
+    for part_data in part_dates:
+        new_text.append(text[start:part_data.start()])
+        start = part_data.end()
+        year = part_data.group('year')
+        str_list = part_data.group().split('至')
+        new_text.append(str_list[0] + '至' + year + str_list[1])
+    new_text.append(text[start:])
+    return ''.join(new_text)
+
+
+def legacy_clean_number_in_text(text):
+    """
+    对给定文本，去除文本中带逗号数字中的逗号
+    clean_text 子例程
+    """
+    # 匹配到的带逗号数字在文本中的位置
+    comma_numbers = CommaNumberPattern.finditer(text)
+    new_text, start = [], 0
+    for comma_number in comma_numbers:
+        # 非数字文本
+        new_text.append(text[start:comma_number.start()])
+        start = comma_number.end()
+        # 去除逗号的数字文本
+        new_text.append(legacy_remove_comma_in_number(comma_number.group()))
+    new_text.append(text[start:])
+    return ''.join(new_text)
+
+
+def legacy_remove_blank_chars(text):
+    """
+    去除文本中的空格符，并将中文百分号符改为英文百分号符
+    clean_text 子例程
+    """
+    new_text = []
+    if text is not None:
+        for ch in text:
+            if ch not in BlankCharSet:
+                if ch == '％':
+                    new_text.append('%')
+                else:
+                    new_text.append(ch)
+    return ''.join(new_text)
+
+
+def legacy_remove_comma_in_number(text):
+    """
+    去除文本中的逗号
+    主要用于去除数字中的逗号，clean_number_in_text 子例程
+    """
+    new_text = []
+    if text is not None:
+        for ch in text:
+            if ch not in CommaCharInNumberSet:
+                new_text.append(ch)
+    return ''.join(new_text)
+
+
+def load_div_texts(html_dir_path, limit):
+    """
+    读取 html_dir_path 下前 limit 个 html 中所有 div 的原始文本
+    """
+    texts = []
+    for html_id in sorted(os.listdir(html_dir_path))[:limit]:
+        soup = HTMLParser.HTMLParser.load_soup(os.path.join(html_dir_path, html_id))
+        texts += [div.text for div in soup.find_all('div')]
+    return texts
+
+
+def bench(clean, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            clean(text)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='对比 TextUtils.clean_text 修改前后的结果与耗时')
+    parser.add_argument('--html-dir', default='../zengjianchi/html', help='html 目录')
+    parser.add_argument('--limit', type=int, default=200, help='使用的 html 个数')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数')
+    args = parser.parse_args()
+
+    texts = load_div_texts(args.html_dir, args.limit)
+    diff_count = 0
+    for text in texts:
+        if legacy_clean_text(text).encode('utf-8') != TextUtils.clean_text(text).encode('utf-8'):
+            diff_count += 1
+    legacy_time = bench(legacy_clean_text, texts, args.repeat)
+    new_time = bench(TextUtils.clean_text, texts, args.repeat)
+    print('texts: %d, chars: %d' % (len(texts), sum(len(text) for text in texts)))
+    print('different outputs: %d' % diff_count)
+    print('before: %.3f s' % legacy_time)
+    print('after:  %.3f s' % new_time)
+    print('speedup: %.2fx' % (legacy_time / new_time))
@@ -0,0 +1 @@
+#-*- coding: utf-8 -*-
\ No newline at end of file
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import mmap
+import os
+import struct
+
+# 语料包格式：
+#   文件头 PackHeader：魔数、版本、文档数、索引的起始位置
+#   数据区：各 html 文件的原始内容依次拼接
+#   索引区：每个文档一项 PackIndexEntry (id 字节数, 数据区中的起始位置, 长度)，后接 utf-8 编码的 id
+PackMagic = b'HTMLPACK'
+PackVersion = 1
+# 使用相同布局的预解析文件 (见 DocumentStore) 的魔数
+StoreMagic = b'DOCSTORE'
+PackHeader = struct.Struct('<8sIIQ')
+PackIndexEntry = struct.Struct('<HQQ')
+
+
+def pack_magic(path):
+    """
+    返回 path 开头的魔数，path 不是文件时返回 None
+    """
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'rb') as fp:
+        return fp.read(len(PackMagic))
+
+
+def is_pack(path):
+    """
+    path 是否为语料包文件
+    """
+    return pack_magic(path) == PackMagic
+
+
+def write_entries(pack_path, entries, magic=PackMagic, version=PackVersion):
+    """
+    按语料包的格式写入 entries 中的 (id, bytes)，返回写入的条目数
+    magic / version: 文件头中的魔数与版本，供 DocumentStore 等使用相同布局的格式使用
+    """
+    index = []
+    with open(pack_path, 'wb') as fp:
+        fp.write(PackHeader.pack(magic, version, 0, 0))
+        offset = PackHeader.size
+        for entry_id, data in entries:
+            fp.write(data)
+            index.append((entry_id.encode('utf-8'), offset, len(data)))
+            offset += len(data)
+        for encoded_id, entry_offset, length in index:
+            fp.write(PackIndexEntry.pack(len(encoded_id), entry_offset, length))
+            fp.write(encoded_id)
+        fp.seek(0)
+        fp.write(PackHeader.pack(magic, version, len(index), offset))
+    return len(index)
+
+
+def write_pack(pack_path, html_dir_path, html_ids=None):
+    """
+    将 html_dir_path 下的文件打包为一个语料包，返回打包的文档数
+    html_ids: 需要打包的文件名列表，为 None 时打包目录下的所有文件 (按文件名排序)
+    """
+    if html_ids is None:
+        html_ids = sorted(name for name in os.listdir(html_dir_path)
+                          if os.path.isfile(os.path.join(html_dir_path, name)))
+
+    def read_entries():
+        for html_id in html_ids:
+            with open(os.path.join(html_dir_path, html_id), 'rb') as html_fp:
+                yield html_id, html_fp.read()
+    return write_entries(pack_path, read_entries())
+
+
+class CorpusPack(object):
+    """
+    语料包的读取：整个文件通过 mmap 映射到内存，文档内容为 mmap 上的 memoryview 切片，不复制数据
+    打开时只读取文件头和索引，之后按 id 读取文档不再有文件系统的元数据操作
+    """
+
+    # 文件头中的魔数与版本，子类 (例如 DocumentStore) 使用相同的布局时修改
+    magic = PackMagic
+    version = PackVersion
+
+    def __init__(self, pack_path):
+        self.pack_path = pack_path
+        self.fp = open(pack_path, 'rb')
+        self.mmap = None
+        self.buffer = None
+        # id -> (起始位置, 长度)，保持打包时的顺序
+        self.index = {}
+        try:
+            size = os.fstat(self.fp.fileno()).st_size
+            if size < PackHeader.size:
+                raise ValueError('not a corpus pack: %s' % pack_path)
+            self.mmap = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+            self.buffer = memoryview(self.mmap)
+            magic, version, count, index_offset = PackHeader.unpack_from(self.buffer, 0)
+            if magic != self.magic:
+                raise ValueError('not a corpus pack: %s' % pack_path)
+            if version != self.version:
+                raise ValueError('unsupported corpus pack version %d: %s' % (version, pack_path))
+            pos = index_offset
+            for _ in range(count):
+                id_length, offset, length = PackIndexEntry.unpack_from(self.buffer, pos)
+                pos += PackIndexEntry.size
+                self.index[str(self.buffer[pos:pos + id_length], 'utf-8')] = (offset, length)
+                pos += id_length
+        except BaseException:
+            self.close()
+            raise
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.index
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def ids(self):
+        return list(self.index)
+
+    def size(self, doc_id):
+        return self.index[doc_id][1]
+
+    def source(self, doc_id):
+        """
+        返回文档内容的 memoryview 切片，可以直接传给 HTMLParser.parse
+        """
+        offset, length = self.index[doc_id]
+        return self.buffer[offset:offset + length]
+
+    def read(self, doc_id):
+        """
+        返回文档内容的副本 (bytes)，用于需要 pickle 或在关闭语料包之后使用的场合
+        """
+        return bytes(self.source(doc_id))
+
+    def close(self):
+        """
+        关闭语料包，之前通过 source 得到的 memoryview 必须已经释放
+        """
+        if self.buffer is not None:
+            self.buffer.release()
+            self.buffer = None
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+        if self.fp is not None:
+            self.fp.close()
+            self.fp = None
+
+
+class CorpusDirectory(object):
+    """
+    html 目录，接口与 CorpusPack 相同，文档内容为文件路径
+    """
+
+    def __init__(self, html_dir_path):
+        self.html_dir_path = html_dir_path
+
+    def __len__(self):
+        return len(self.ids())
+
+    def __contains__(self, doc_id):
+        return os.path.isfile(os.path.join(self.html_dir_path, doc_id))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def ids(self):
+        return os.listdir(self.html_dir_path)
+
+    def size(self, doc_id):
+        return os.path.getsize(os.path.join(self.html_dir_path, doc_id))
+
+    def source(self, doc_id):
+        return os.path.join(self.html_dir_path, doc_id)
+
+    def read(self, doc_id):
+        with open(self.source(doc_id), 'rb') as fp:
+            return fp.read()
+
+    def close(self):
+        pass
+
+
+def open_corpus(corpus_path):
+    """
+    打开语料：corpus_path 为语料包文件时返回 CorpusPack，为预解析文件时返回 DocumentStore，
+    否则作为 html 目录返回 CorpusDirectory
+    """
+    magic = pack_magic(corpus_path)
+    if magic == PackMagic:
+        return CorpusPack(corpus_path)
+    if magic == StoreMagic:
+        # DocumentStore 依赖 HTMLParser，而 HTMLParser 依赖本模块，在这里导入以避免循环导入
+        from docparser.DocumentStore import DocumentStore
+        return DocumentStore(corpus_path)
+    return CorpusDirectory(corpus_path)
+
+
+# 进程内共享的语料，键为 (进程号, 规范化之后的路径)，fork 得到的子进程重新打开
+_corpora = {}
+
+
+def get_corpus(corpus_path):
+    """
+    获取共享的语料，同一路径在每个进程中只打开一次
+    """
+    key = (os.getpid(), os.path.abspath(corpus_path))
+    if key not in _corpora:
+        _corpora[key] = open_corpus(corpus_path)
+    return _corpora[key]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='将 html 目录打包为一个语料包文件 (mmap 读取)')
+    parser.add_argument('--html-dir', required=True, help='html 目录')
+    parser.add_argument('--output', required=True, help='语料包文件路径')
+    args = parser.parse_args()
+
+    print('%d documents packed' % write_pack(args.output, args.html_dir))
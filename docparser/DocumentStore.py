@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import array
+import struct
+import sys
+
+from docparser import CorpusPack
+from docparser.HTMLParser import HTMLParser, ParsedDocument, ParserBackends
+from docparser.TableGrid import TableGrid
+
+# 解析结果格式的版本，ParsedDocument / TableGrid 或 HTMLParser 的输出变化时修改，使旧文件失效
+StoreVersion = 1
+# 每个文档的记录：
+#   DocumentHeader：被跳过的表格数、段落数、表格数、结构数组的长度
+#   结构数组 (int32，小端)：各段落的字符数；每个表格依次为行数，每行的单元格数 (不存在的行为 -1)，
+#       每个单元格的字符数 (不存在的单元格为 -1)
+#   文本：所有段落、单元格的文本依次拼接后的 utf-8 编码，读取时只解码一次，再按字符数切分
+DocumentHeader = struct.Struct('<IIII')
+# 行或单元格不存在
+MissingLength = -1
+
+
+def append_text(structure, texts, text):
+    if text is None:
+        structure.append(MissingLength)
+    else:
+        structure.append(len(text))
+        texts.append(text)
+
+
+def encode_document(document):
+    """
+    将 ParsedDocument 编码为 bytes
+    """
+    structure = array.array('i')
+    texts = []
+    for paragraph in document.paragraphs:
+        append_text(structure, texts, paragraph)
+    for grid in document.grids:
+        structure.append(len(grid.rows))
+        for row in grid.rows:
+            if row is None:
+                structure.append(MissingLength)
+                continue
+            structure.append(len(row))
+            for text in row:
+                append_text(structure, texts, text)
+    if sys.byteorder != 'little':
+        structure.byteswap()
+    return b''.join((DocumentHeader.pack(document.skipped_table_count, len(document.paragraphs),
+                                         len(document.grids), len(structure)),
+                     structure.tobytes(), ''.join(texts).encode('utf-8')))
+
+
+def decode_document(data):
+    """
+    将 encode_document 的结果 (bytes 或 memoryview) 解码为 ParsedDocument
+    """
+    skipped_table_count, paragraph_count, grid_count, structure_length = DocumentHeader.unpack_from(data, 0)
+    pos = DocumentHeader.size
+    structure = array.array('i')
+    structure.frombytes(data[pos:pos + structure_length * structure.itemsize])
+    if sys.byteorder != 'little':
+        structure.byteswap()
+    text = str(data[pos + structure_length * structure.itemsize:], 'utf-8')
+    # 文本中的当前位置
+    text_pos = 0
+    paragraphs = []
+    for length in structure[:paragraph_count]:
+        paragraphs.append(text[text_pos:text_pos + length])
+        text_pos += length
+    # 结构数组中的当前位置
+    idx = paragraph_count
+    grids = []
+    for _ in range(grid_count):
+        grid = TableGrid()
+        row_count = structure[idx]
+        idx += 1
+        for _ in range(row_count):
+            cell_count = structure[idx]
+            idx += 1
+            if cell_count == MissingLength:
+                grid.rows.append(None)
+                grid.occupancy.append(0)
+                continue
+            row = []
+            occupancy = 0
+            for col_index in range(cell_count):
+                length = structure[idx]
+                idx += 1
+                if length == MissingLength:
+                    row.append(None)
+                    continue
+                row.append(text[text_pos:text_pos + length])
+                text_pos += length
+                occupancy |= 1 << col_index
+            grid.rows.append(row)
+            grid.occupancy.append(occupancy)
+            grid.size += 1
+        grids.append(grid)
+    return ParsedDocument(paragraphs, grids, skipped_table_count)
+
+
+def write_store(store_path, corpus_path, html_parser):
+    """
+    解析语料 (html 目录或语料包) 中的所有文档，将结果写入 store_path，返回文档数
+    """
+    def encode_entries():
+        for doc_id, document in html_parser.parse_corpus(corpus_path):
+            yield doc_id, encode_document(document)
+    return CorpusPack.write_entries(store_path, encode_entries(), CorpusPack.StoreMagic, StoreVersion)
+
+
+class DocumentStore(CorpusPack.CorpusPack):
+    """
+    预先解析的文档：布局与语料包相同，每个条目为 encode_document 编码的 HTMLParser 解析结果
+    source / read 返回 ParsedDocument，可以直接传给各个抽取器的 extract，不再解析 html、清洗文本
+    """
+
+    magic = CorpusPack.StoreMagic
+    version = StoreVersion
+
+    def source(self, doc_id):
+        return decode_document(super(DocumentStore, self).source(doc_id))
+
+    def read(self, doc_id):
+        return self.source(doc_id)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='解析 html 目录或语料包中的所有文档，将段落与表格保存为预解析文件')
+    parser.add_argument('--html-dir', required=True, help='html 目录，或 python -m docparser.CorpusPack 生成的语料包文件')
+    parser.add_argument('--output', required=True, help='预解析文件路径')
+    parser.add_argument('--html-backend', default='bs4', choices=ParserBackends, help='html 解析后端')
+    args = parser.parse_args()
+
+    # 不进行表格预筛选，保存的表格可以供所有抽取器使用
+    print('%d documents stored' % write_store(args.output, args.html_dir, HTMLParser(args.html_backend)))
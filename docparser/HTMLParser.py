@@ -1,19 +1,327 @@
 # -*- coding: utf-8 -*-
 
-import codecs
+import collections
+import io
 
 from bs4 import BeautifulSoup
+from lxml import etree
 
+from docparser import CorpusPack
+from docparser.TableGrid import TableGrid
+from utils import Profiler
 from utils import TextUtils
 
+# 可选的解析后端
+ParserBackends = ('bs4', 'lxml', 'iterparse')
+# BeautifulSoup 的 get_text 不包含这些标签 (及其子孙) 中的文本，lxml 后端与其保持一致
+IgnoredTextTags = ('script', 'style', 'template', 'rt', 'rp')
+# 文档中是否含有 IgnoredTextTags
+IgnoredTextTagXPath = etree.XPath('boolean(%s)' % ' | '.join('descendant-or-self::%s' % tag for tag in IgnoredTextTags))
+# 元素中可见文本的 XPath
+VisibleTextXPath = etree.XPath('descendant::text()[not(%s)]' % ' or '.join('ancestor::%s' % tag for tag in IgnoredTextTags))
+# 段落 div、表格的 XPath
+# 使用 descendant 轴，"//" 展开后的 descendant-or-self::node()/child:: 在大文档上慢得多
+ParagraphDivXPath = etree.XPath("descendant-or-self::div[@type='paragraph']")
+ContentDivXPath = etree.XPath("descendant::div[@type='content']")
+TableXPath = etree.XPath('descendant-or-self::table')
+
+
+class ParsedDocument(object):
+    """
+    HTML 文档的解析结果，一次解析同时保存段落文本和表格
+    paragraphs: 段落文本列表，同 parse_content 的返回值
+    grids: TableGrid 列表，同 parse_table(as_grid=True) 的返回值
+    tables: 二维 dict 列表，同 parse_table 的返回值，第一次访问时由 grids 转换得到
+    skipped_table_count: 被 HTMLParser 的 table_filter 跳过的表格数
+    """
+
+    def __init__(self, paragraphs, grids, skipped_table_count=0):
+        self.paragraphs = paragraphs
+        self.grids = grids
+        self.skipped_table_count = skipped_table_count
+        self.table_dicts = None
+
+    @property
+    def tables(self):
+        if self.table_dicts is None:
+            self.table_dicts = [grid.to_dict() for grid in self.grids]
+        return self.table_dicts
+
 
 class HTMLParser(object):
 
-    def __init__(self):
-        pass
+    def __init__(self, backend='bs4', table_filter=None):
+        """
+        backend: 解析后端
+            'bs4' -- BeautifulSoup (默认)
+            'lxml' -- 直接使用 lxml.etree 与 XPath，结果与 'bs4' 相同，速度更快
+            'iterparse' -- 流式解析 (见 iter_parse)，结果与 'bs4' 相同，内存占用不随文件大小增长
+        table_filter: 表格预筛选函数，参数为表格第一行各单元格去除空白后的文本列表，返回 False 时跳过该表格，
+            不再展开合并单元格、清洗文本；第一行含有合并单元格时 (表头可能占两行) 不进行筛选
+            为 None 时不筛选
+        """
+        if backend not in ParserBackends:
+            raise ValueError('unknown html parser backend: %s' % backend)
+        self.backend = backend
+        self.table_filter = table_filter
+
+    def parse(self, html_file_path):
+        """
+        解析 HTML 文件，文件只读取和解析一次
+        返回 ParsedDocument，同时包含段落文本和表格
+        :param html_file_path: HTML 文件路径，或已经读入内存的文件内容 (bytes)
+        :return:
+        """
+        with Profiler.stage('html.parse'):
+            if self.backend == 'lxml':
+                root = self.load_lxml_tree(html_file_path)
+                with Profiler.stage('html.content'):
+                    paragraphs = self.parse_content_from_lxml(root)
+                with Profiler.stage('html.table'):
+                    grids = self.parse_table_from_lxml(root)
+                return self.make_document(paragraphs, grids)
+            if self.backend == 'iterparse':
+                paragraphs, grids = [], []
+                for kind, item in self.iter_parse(html_file_path):
+                    if kind == 'paragraph':
+                        paragraphs.append(item)
+                    else:
+                        grids.append(item)
+                return self.make_document(paragraphs, grids)
+            soup = self.load_soup(html_file_path)
+            with Profiler.stage('html.content'):
+                paragraphs = self.parse_content_from_soup(soup)
+            with Profiler.stage('html.table'):
+                grids = self.parse_table_from_soup(soup)
+            return self.make_document(paragraphs, grids)
+
+    def parse_corpus(self, corpus_path):
+        """
+        依次解析语料中的所有文档，返回 (文档 id, ParsedDocument)
+        corpus_path: html 目录、CorpusPack 生成的语料包文件，或 DocumentStore 生成的预解析文件 (直接返回其中的文档)
+        """
+        corpus = CorpusPack.get_corpus(corpus_path)
+        for doc_id in corpus.ids():
+            yield doc_id, self.ensure_document(corpus.source(doc_id))
+
+    @staticmethod
+    def make_document(paragraphs, grids):
+        """
+        grids 中被 table_filter 跳过的表格为 None，统计个数后去除
+        parse 子例程
+        """
+        tables = [grid for grid in grids if grid is not None]
+        return ParsedDocument(paragraphs, tables, len(grids) - len(tables))
+
+    def is_candidate_table(self, head_cells):
+        """
+        根据表格第一行判断是否需要解析该表格
+        head_cells: 第一行的单元格 [(rowspan, colspan, 单元格文本), ...]，同 cells_to_grid
+        """
+        if self.table_filter is None or len(head_cells) == 0:
+            return True
+        head_texts = []
+        for rowspan, colspan, text in head_cells:
+            if (rowspan is not None and int(rowspan) > 1) or (colspan is not None and int(colspan) > 1):
+                return True
+            head_texts.append(TextUtils.remove_blank_chars(text))
+        return self.table_filter(head_texts)
+
+    def ensure_document(self, source):
+        """
+        source 为 ParsedDocument 时直接返回，否则作为 HTML 文件路径或文件内容 (bytes) 进行解析
+        供各个抽取器的 extract 使用
+        """
+        if isinstance(source, ParsedDocument):
+            return source
+        return self.parse(source)
+
+    @staticmethod
+    def is_buffer(html_file_path):
+        """
+        html_file_path 是否为文件内容 (bytes、CorpusPack 中的 memoryview 等) 而不是文件路径
+        """
+        return isinstance(html_file_path, (bytes, bytearray, memoryview))
+
+    @staticmethod
+    def open_source(html_file_path):
+        """
+        以二进制方式打开 HTML 文件，html_file_path 为文件内容时将其包装为文件对象
+        """
+        if HTMLParser.is_buffer(html_file_path):
+            return io.BytesIO(html_file_path)
+        return open(html_file_path, 'rb')
+
+    @staticmethod
+    def read_source(html_file_path):
+        """
+        返回 HTML 文件的全部内容，html_file_path 为文件内容时直接返回，不复制
+        lxml 不能解析空的 memoryview，空文件统一返回 b''
+        """
+        if HTMLParser.is_buffer(html_file_path):
+            return html_file_path if len(html_file_path) > 0 else b''
+        with open(html_file_path, 'rb') as fp:
+            return fp.read()
+
+    @staticmethod
+    def load_soup(html_file_path):
+        """
+        读取 HTML 文件 (路径或文件内容) 并构建 BeautifulSoup 树
+        """
+        with Profiler.stage('html.load') as load_stage:
+            data = HTMLParser.read_source(html_file_path)
+            load_stage.add_size(len(data))
+            return BeautifulSoup(str(data, 'utf-8'), "lxml")
+
+    @staticmethod
+    def load_lxml_tree(html_file_path):
+        """
+        读取 HTML 文件 (路径或文件内容) 并使用 lxml 构建元素树，返回根元素，文件为空时返回 None
+        与 load_soup 一样按 utf-8 解码，解码失败时抛出 UnicodeDecodeError
+        """
+        with Profiler.stage('html.load') as load_stage:
+            data = HTMLParser.read_source(html_file_path)
+            load_stage.add_size(len(data))
+            parser = etree.HTMLParser(encoding='utf-8')
+            root = etree.fromstring(data, parser)
+            # lxml 遇到非法的 utf-8 字节时以替换字符代替并记录错误，不抛出异常；
+            # 只有这时才由 Python 再解码一次，抛出与 load_soup 相同的 UnicodeDecodeError
+            if len(parser.error_log.filter_types([etree.ErrorTypes.ERR_INVALID_ENCODING])) > 0:
+                str(data, 'utf-8')
+            return root
+
+    @staticmethod
+    def lxml_text_getter(root):
+        """
+        返回获取 lxml 元素中文本的函数，结果与 BeautifulSoup 的 Tag.text 相同
+        文档中没有 IgnoredTextTags 时直接序列化为纯文本，否则逐个文本节点判断其祖先
+        """
+        if IgnoredTextTagXPath(root):
+            return HTMLParser.lxml_visible_text
+        return HTMLParser.lxml_plain_text
+
+    @staticmethod
+    def lxml_plain_text(element):
+        return etree.tostring(element, method='text', encoding=str, with_tail=False)
+
+    @staticmethod
+    def lxml_visible_text(element):
+        return ''.join(VisibleTextXPath(element))
+
+    def iter_parse(self, html_file_path):
+        """
+        流式解析 HTML 文件，按段落 div / 表格开始标签的顺序逐个返回 ('paragraph', 段落文本) 或 ('table', TableGrid)
+        被 table_filter 跳过的表格返回 ('table', None)
+        依次返回的段落、表格分别与 parse_content、parse_table(as_grid=True) 的结果相同
+        使用 lxml.etree.iterparse 边读边解析：content div 结束时即取出其文本，表格结束时即解析为 TableGrid，
+        段落 div 的结果由这些文本拼接得到，不再访问元素树；因此不在任何 content div、表格中的元素结束后立即释放
+        (包括位于段落 div 内部的 content div、表格)，内存占用取决于最大的 content div / 表格，而不是整个文件
+        外层段落 div、表格需要在结束标签处才能得到结果，因此在开始标签处按顺序预留输出位置，
+        位置填好之后再依次返回
+        """
+        # 预留的输出位置 (kind, [结果列表])，结果列表为 None 表示尚未得到结果
+        slots = collections.deque()
+        # 尚未结束的段落 div：[element, slot, 是否含有子段落, 子孙 content div 的文本, 直接子 div]
+        #   子孙 content div 的文本按开始标签的顺序预留 ([None])，用于不含子段落的情况，含有子段落之后置为 None
+        #   直接子 div 为 content div 时预留其文本 ([None])，否则为 None，用于含有子段落时的分组，见 paragraph_div_contents
+        open_paragraphs = []
+        # 尚未结束的 content div：(element, 预留的文本)，以及尚未结束的表格：[element, slot]
+        open_contents, open_tables = [], []
+        # 是否已经出现过 IgnoredTextTags：出现之前所有元素的文本都可以直接序列化
+        has_ignored_tag = False
+        has_element = False
+        with self.open_source(html_file_path) as fp:
+            events = etree.iterparse(fp, events=('start', 'end'), html=True, encoding='utf-8')
+            while True:
+                try:
+                    event, element = next(events)
+                except StopIteration:
+                    break
+                except etree.XMLSyntaxError:
+                    # 空文件
+                    if has_element:
+                        raise
+                    break
+                has_element = True
+                if event == 'start':
+                    if element.tag in IgnoredTextTags:
+                        has_ignored_tag = True
+                    elif element.tag == 'div':
+                        self.start_div(element, slots, open_paragraphs, open_contents)
+                    elif element.tag == 'table':
+                        slots.append(('table', [None]))
+                        open_tables.append([element, slots[-1][1]])
+                    continue
+                get_text = HTMLParser.lxml_visible_text if has_ignored_tag else HTMLParser.lxml_plain_text
+                if len(open_contents) > 0 and open_contents[-1][0] is element:
+                    open_contents.pop()[1][0] = TextUtils.clean_text(get_text(element))
+                if len(open_paragraphs) > 0 and open_paragraphs[-1][0] is element:
+                    _, slot, has_sub_paragraph, contents, child_divs = open_paragraphs.pop()
+                    if has_sub_paragraph:
+                        rs = [[]]
+                        for content in child_divs:
+                            if content is None:
+                                rs.append([])
+                            else:
+                                rs[-1].append(content[0])
+                    else:
+                        rs = [[content[0] for content in contents]]
+                    slot[0] = HTMLParser.join_paragraphs(rs)
+                if len(open_tables) > 0 and open_tables[-1][0] is element:
+                    _, slot = open_tables.pop()
+                    slot[0] = self.merge_table_heads([self.parse_lxml_table(element, get_text)])
+                if len(open_contents) == 0 and len(open_tables) == 0:
+                    # 释放已经处理完的元素以及之前的兄弟元素，外层 content div、表格的文本不再需要它们
+                    element.clear()
+                    parent = element.getparent()
+                    while parent is not None and element.getprevious() is not None:
+                        del parent[0]
+                while len(slots) > 0 and slots[0][1][0] is not None:
+                    kind, slot = slots.popleft()
+                    for item in slot[0]:
+                        yield kind, item
 
     @staticmethod
-    def parse_content(html_file_path):
+    def start_div(element, slots, open_paragraphs, open_contents):
+        """
+        处理 div 的开始标签：记录段落 div、content div，以及段落 div 的直接子 div
+        iter_parse 子例程
+        """
+        div_type = element.get('type')
+        content = [None] if div_type == 'content' else None
+        if len(open_paragraphs) > 0 and element.getparent() is open_paragraphs[-1][0]:
+            open_paragraphs[-1][4].append(content)
+        if div_type == 'paragraph':
+            for open_paragraph in reversed(open_paragraphs):
+                if open_paragraph[2]:
+                    break
+                open_paragraph[2] = True
+                open_paragraph[3] = None
+            slots.append(('paragraph', [None]))
+            open_paragraphs.append([element, slots[-1][1], False, [], []])
+        elif content is not None:
+            for open_paragraph in open_paragraphs:
+                if not open_paragraph[2]:
+                    open_paragraph[3].append(content)
+            open_contents.append((element, content))
+
+    def iter_content(self, html_file_path):
+        """
+        流式解析 HTML 中的段落文本，逐个返回段落，结果与 parse_content 相同
+        """
+        for kind, item in self.iter_parse(html_file_path):
+            if kind == 'paragraph':
+                yield item
+
+    def iter_table(self, html_file_path, as_grid=False):
+        """
+        流式解析 HTML 中的表格，逐个返回二维表，结果与 parse_table 相同
+        """
+        for kind, item in self.iter_parse(html_file_path):
+            if kind == 'table' and item is not None:
+                yield item if as_grid else item.to_dict()
+
+    def parse_content(self, html_file_path):
         """
         解析 HTML 中的段落文本
         按顺序返回多个 paragraph 构成一个数组，
@@ -21,82 +329,208 @@ class HTMLParser(object):
         :param html_file_path:
         :return:
         """
+        if self.backend == 'lxml':
+            return self.parse_content_from_lxml(self.load_lxml_tree(html_file_path))
+        if self.backend == 'iterparse':
+            return list(self.iter_content(html_file_path))
+        return self.parse_content_from_soup(self.load_soup(html_file_path))
+
+    @staticmethod
+    def parse_content_from_soup(soup):
+        """
+        从已经构建好的 BeautifulSoup 树中解析段落文本
+        parse_content, parse 子例程
+        """
         rs = []
-        with codecs.open(html_file_path, encoding='utf-8', mode='r') as fp:
-            soup = BeautifulSoup(fp.read(), "lxml")
-            paragraphs = []
-            for div in soup.find_all('div'):
+        paragraphs = []
+        for div in soup.find_all('div'):
+            div_type = div.get('type')
+            if div_type is not None and div_type == 'paragraph':
+                paragraphs.append(div)
+        for paragraph_div in paragraphs:
+            has_sub_paragraph = False
+            for div in paragraph_div.find_all('div'):
                 div_type = div.get('type')
                 if div_type is not None and div_type == 'paragraph':
-                    paragraphs.append(div)
-            for paragraph_div in paragraphs:
-                has_sub_paragraph = False
-                for div in paragraph_div.find_all('div'):
-                    div_type = div.get('type')
-                    if div_type is not None and div_type == 'paragraph':
-                        has_sub_paragraph = True
-                if has_sub_paragraph:
-                    rs.append([])
-                    for div in paragraph_div.find_all('div', recursive=False):
-                        div_type = div.get('type')
-                        if div_type is not None and div_type == 'content':
-                            rs[-1].append(TextUtils.clean_text(div.text))
-                        else:
-                            rs.append([])
-                    continue
+                    has_sub_paragraph = True
+            if has_sub_paragraph:
                 rs.append([])
-                for content_div in paragraph_div.find_all('div'):
-                    div_type = content_div.get('type')
+                for div in paragraph_div.find_all('div', recursive=False):
+                    div_type = div.get('type')
                     if div_type is not None and div_type == 'content':
-                        rs[-1].append(TextUtils.clean_text(content_div.text))
+                        rs[-1].append(TextUtils.clean_text(div.text))
+                    else:
+                        rs.append([])
+                continue
+            rs.append([])
+            for content_div in paragraph_div.find_all('div'):
+                div_type = content_div.get('type')
+                if div_type is not None and div_type == 'content':
+                    rs[-1].append(TextUtils.clean_text(content_div.text))
+        return HTMLParser.join_paragraphs(rs)
+
+    @staticmethod
+    def parse_content_from_lxml(root):
+        """
+        从 lxml 元素树中解析段落文本，结果与 parse_content_from_soup 相同
+        含有子段落的段落 div 通过向上标记祖先得到，不再对每个段落 div 遍历全部子孙
+        parse_content, parse 子例程
+        """
+        if root is None:
+            return []
+        get_text = HTMLParser.lxml_text_getter(root)
+        paragraph_divs = ParagraphDivXPath(root)
+        # 含有子段落的段落 div
+        parent_paragraph_divs = set()
+        for paragraph_div in paragraph_divs:
+            for ancestor in paragraph_div.iterancestors('div'):
+                if ancestor.get('type') == 'paragraph':
+                    if ancestor in parent_paragraph_divs:
+                        break
+                    parent_paragraph_divs.add(ancestor)
+        rs = []
+        for paragraph_div in paragraph_divs:
+            rs += HTMLParser.paragraph_div_contents(paragraph_div, paragraph_div in parent_paragraph_divs, get_text)
+        return HTMLParser.join_paragraphs(rs)
+
+    @staticmethod
+    def paragraph_div_contents(paragraph_div, has_sub_paragraph, get_text):
+        """
+        返回一个段落 div 对应的 content 行列表 [[content, ...], ...]
+        含有子段落时按直接子 div 划分为多组，否则为所有 content div 构成的一组
+        parse_content_from_lxml, iter_parse 子例程
+        """
+        if has_sub_paragraph:
+            rs = [[]]
+            for div in paragraph_div.iterchildren('div'):
+                if div.get('type') == 'content':
+                    rs[-1].append(TextUtils.clean_text(get_text(div)))
+                else:
+                    rs.append([])
+            return rs
+        return [[TextUtils.clean_text(get_text(content_div)) for content_div in ContentDivXPath(paragraph_div)]]
+
+    @staticmethod
+    def join_paragraphs(rs):
+        """
+        拼接每个段落的 content 行，去除空段落
+        parse_content_from_soup, parse_content_from_lxml 子例程
+        """
         paragraphs = []
         for content_list in rs:
             if len(content_list) > 0:
                 paragraphs.append(''.join(content_list))
         return paragraphs
 
-    def parse_table(self, html_file_path):
+    def parse_table(self, html_file_path, as_grid=False):
         """
         解析 HTML 中的 table
-        返回一个二维表
+        返回二维表列表，as_grid 为 True 时返回 TableGrid 列表，否则返回二维 dict 列表
         :param html_file_path:
         :return:
         """
+        if self.backend == 'lxml':
+            grids = self.parse_table_from_lxml(self.load_lxml_tree(html_file_path))
+        elif self.backend == 'iterparse':
+            return list(self.iter_table(html_file_path, as_grid))
+        else:
+            grids = self.parse_table_from_soup(self.load_soup(html_file_path))
+        if as_grid:
+            return [grid for grid in grids if grid is not None]
+        return [grid.to_dict() for grid in grids if grid is not None]
+
+    def parse_table_from_soup(self, soup):
+        """
+        从已经构建好的 BeautifulSoup 树中解析表格，返回 TableGrid 列表，被 table_filter 跳过的表格为 None
+        parse_table, parse 子例程
+        """
+        parsed_tables = []
+        for table in soup.find_all('table'):
+            head_tr = table.find('tr')
+            if head_tr is not None and \
+                    not self.is_candidate_table([(td.get('rowspan'), td.get('colspan'), td.text)
+                                                 for td in head_tr.find_all('td')]):
+                parsed_tables.append(None)
+            else:
+                parsed_tables.append(self.parse_table_to_grid(table))
+        return self.merge_table_heads(parsed_tables)
+
+    def parse_table_from_lxml(self, root):
+        """
+        从 lxml 元素树中解析表格，结果与 parse_table_from_soup 相同
+        parse_table, parse 子例程
+        """
+        if root is None:
+            return []
+        get_text = self.lxml_text_getter(root)
+        return self.merge_table_heads([self.parse_lxml_table(table, get_text) for table in TableXPath(root)])
+
+    def parse_lxml_table(self, table, get_text):
+        """
+        根据第一行进行预筛选，需要解析时返回 parse_lxml_table_to_grid 的结果，否则返回 None
+        parse_table_from_lxml, iter_parse 子例程
+        """
+        head_tr = next(table.iterdescendants('tr'), None)
+        if head_tr is not None and \
+                not self.is_candidate_table([(td.get('rowspan'), td.get('colspan'), get_text(td))
+                                             for td in head_tr.iterdescendants('td')]):
+            return None
+        return self.parse_lxml_table_to_grid(table, get_text)
+
+    @staticmethod
+    def merge_table_heads(parsed_tables):
+        """
+        表头占两行时将前两行合并为一行
+        parsed_tables: parse_table_to_grid 返回值的列表，被跳过的表格为 None
+        parse_table_from_soup, parse_table_from_lxml, iter_parse 子例程
+        """
         rs_list = []
-        with codecs.open(html_file_path, encoding='utf-8', mode='r') as fp:
-            soup = BeautifulSoup(fp.read(), "lxml")
-            for table in soup.find_all('table'):
-                table_dict, is_head_two_rowspan = self.parse_table_to_2d_dict(table)
-                row_length = len(table_dict)
-                if table_dict is not None:
-                    if is_head_two_rowspan and row_length > 2:
-                        try:
-                            new_table_dict = {}
-                            head_row = {}
-                            col_length = len(table_dict[0])
-                            for col_idx in range(col_length):
-                                head_row[col_idx] = table_dict[0][col_idx] + table_dict[1][col_idx]
-                            new_table_dict[0] = head_row
-                            for row_idx in range(2, row_length):
-                                new_table_dict[row_idx - 1] = table_dict[row_idx]
-                            rs_list.append(new_table_dict)
-                        except KeyError:
-                            rs_list.append(table_dict)
-                    else:
-                        rs_list.append(table_dict)
+        for parsed_table in parsed_tables:
+            if parsed_table is None:
+                rs_list.append(None)
+                continue
+            grid, is_head_two_rowspan = parsed_table
+            if is_head_two_rowspan and len(grid) > 2:
+                merged_grid = grid.merge_head_rows()
+                rs_list.append(merged_grid if merged_grid is not None else grid)
+            else:
+                rs_list.append(grid)
         return rs_list
 
     @staticmethod
     def parse_table_to_2d_dict(table):
-        rs_dict = {}
+        grid, is_head_two_rowspan = HTMLParser.parse_table_to_grid(table)
+        return grid.to_dict(), is_head_two_rowspan
+
+    @staticmethod
+    def parse_table_to_grid(table):
+        return HTMLParser.cells_to_grid(
+            [[(td.get('rowspan'), td.get('colspan'), td.text) for td in tr.find_all('td')] for tr in table.find_all('tr')])
+
+    @staticmethod
+    def parse_lxml_table_to_grid(table, get_text):
+        """
+        get_text: lxml_text_getter 返回的函数
+        """
+        return HTMLParser.cells_to_grid(
+            [[(td.get('rowspan'), td.get('colspan'), get_text(td)) for td in tr.iterdescendants('td')]
+             for tr in table.iterdescendants('tr')])
+
+    @staticmethod
+    def cells_to_grid(rows):
+        """
+        根据单元格的 rowspan, colspan 展开为二维表
+        rows: 每行为 [(rowspan, colspan, 单元格文本), ...]，rowspan / colspan 为属性原始值，没有时为 None
+        返回 (TableGrid, 表头是否占两行)
+        parse_table_to_grid, parse_lxml_table_to_grid 子例程
+        """
+        grid = TableGrid()
         row_index = 0
         is_head_two_rowspan, is_head = False, True
-        for tr in table.find_all('tr'):
+        for row in rows:
             col_index, cur_col_index = 0, 0
-            for td in tr.find_all('td'):
-                rowspan = td.get('rowspan')
+            for rowspan, colspan, text in row:
                 rowspan = int(rowspan) if (rowspan is not None and int(rowspan) > 1) else 1
-                colspan = td.get('colspan')
                 colspan = int(colspan) if (colspan is not None and int(colspan) > 1) else 1
                 if is_head:
                     if row_index > 0:
@@ -104,16 +538,14 @@ class HTMLParser(object):
                     elif rowspan > 1 or colspan > 1:
                         is_head_two_rowspan = True
                         is_head = False
-                content = TextUtils.remove_blank_chars(td.text)
+                content = TextUtils.remove_blank_chars(text)
                 for r in range(rowspan):
-                    if (row_index + r) not in rs_dict:
-                        rs_dict[row_index + r] = {}
                     cur_col_index = col_index
                     for c in range(colspan):
-                        while cur_col_index in rs_dict[row_index + r]:
-                            cur_col_index += 1
-                        rs_dict[row_index + r][cur_col_index] = content
+                        # 通过位图找到下一个空列
+                        cur_col_index = grid.next_free_col(row_index + r, cur_col_index)
+                        grid.set_cell(row_index + r, cur_col_index, content)
                         cur_col_index += 1
                 col_index = cur_col_index
             row_index += 1
-        return rs_dict, is_head_two_rowspan
+        return grid, is_head_two_rowspan
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+
+class TableGrid(object):
+    """
+    HTML 表格展开 rowspan / colspan 之后的二维表
+    以行列表 + 单元格列表保存，每行另有一个已填充列的位图，用于展开合并单元格时查找空位
+    与原有的二维 dict ({行号: {列号: 文本}}) 语义相同：
+        可能缺少某些行 (没有 td 的 tr) 或某行中的某些列，len 为实际存在的行数，
+        cell 访问不存在的行或单元格时抛出 KeyError
+    """
+
+    __slots__ = ('rows', 'occupancy', 'size')
+
+    def __init__(self):
+        # 行号 -> 单元格文本列表，不存在的行为 None，行中不存在的单元格为 None
+        self.rows = []
+        # 行号 -> 已填充列的位图，第 c 位为 1 表示第 c 列存在
+        self.occupancy = []
+        # 存在的行数
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __eq__(self, other):
+        if isinstance(other, TableGrid):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        rs = self.__eq__(other)
+        return rs if rs is NotImplemented else not rs
+
+    def __repr__(self):
+        return 'TableGrid(%r)' % self.to_dict()
+
+    def has_row(self, row_index):
+        return row_index < len(self.rows) and self.rows[row_index] is not None
+
+    def add_row(self, row_index):
+        """
+        确保第 row_index 行存在
+        """
+        if row_index >= len(self.rows):
+            extend_length = row_index + 1 - len(self.rows)
+            self.rows.extend([None] * extend_length)
+            self.occupancy.extend([0] * extend_length)
+        if self.rows[row_index] is None:
+            self.rows[row_index] = []
+            self.size += 1
+
+    def set_cell(self, row_index, col_index, text):
+        """
+        写入单元格，所在行不存在时自动创建
+        """
+        self.add_row(row_index)
+        row = self.rows[row_index]
+        if col_index >= len(row):
+            row.extend([None] * (col_index + 1 - len(row)))
+        row[col_index] = text
+        self.occupancy[row_index] |= 1 << col_index
+
+    def next_free_col(self, row_index, col_index):
+        """
+        返回第 row_index 行中从 col_index 开始的第一个空列，所在行不存在时自动创建
+        """
+        self.add_row(row_index)
+        mask = self.occupancy[row_index] >> col_index
+        # mask 最低的 0 位
+        return col_index + ((~mask & (mask + 1)).bit_length() - 1)
+
+    def row_size(self, row_index):
+        """
+        第 row_index 行中存在的单元格个数，行不存在时抛出 KeyError
+        """
+        if not self.has_row(row_index):
+            raise KeyError(row_index)
+        return bin(self.occupancy[row_index]).count('1')
+
+    def cell(self, row_index, col_index):
+        """
+        返回单元格文本，行或单元格不存在时抛出 KeyError
+        """
+        if row_index < len(self.rows):
+            row = self.rows[row_index]
+            if row is not None and col_index < len(row) and row[col_index] is not None:
+                return row[col_index]
+        raise KeyError((row_index, col_index))
+
+    def get(self, row_index, col_index, default=None):
+        """
+        返回单元格文本，行或单元格不存在时返回 default
+        """
+        if row_index < len(self.rows):
+            row = self.rows[row_index]
+            if row is not None and col_index < len(row) and row[col_index] is not None:
+                return row[col_index]
+        return default
+
+    def column(self, col_index):
+        """
+        返回第 col_index 列的视图，不复制数据
+        """
+        return TableColumn(self, col_index)
+
+    def merge_head_rows(self):
+        """
+        将前两行合并为表头，返回新的 TableGrid，之后的行直接共用
+        与原有实现一致：第一行中的某一列在第二行中不存在，或第三行到第 len 行中缺少某行时返回 None
+        """
+        if not self.has_row(0) or not self.has_row(1):
+            return None
+        head_row = []
+        for col_index in range(self.row_size(0)):
+            head_text = self.get(0, col_index)
+            second_text = self.get(1, col_index)
+            if head_text is None or second_text is None:
+                return None
+            head_row.append(head_text + second_text)
+        row_length = self.size
+        body_rows = self.rows[2:row_length]
+        if any(row is None for row in body_rows):
+            return None
+        grid = TableGrid()
+        grid.rows = [head_row] + body_rows
+        grid.occupancy = [(1 << len(head_row)) - 1] + self.occupancy[2:row_length]
+        grid.size = len(grid.rows)
+        return grid
+
+    def to_dict(self):
+        """
+        转换为原有的二维 dict：{行号: {列号: 文本}}
+        """
+        rs = {}
+        for row_index, row in enumerate(self.rows):
+            if row is not None:
+                rs[row_index] = dict((col_index, text) for col_index, text in enumerate(row) if text is not None)
+        return rs
+
+    @staticmethod
+    def from_dict(table_dict):
+        """
+        由二维 dict 构造 TableGrid
+        """
+        grid = TableGrid()
+        for row_index in sorted(table_dict):
+            grid.add_row(row_index)
+            for col_index in sorted(table_dict[row_index]):
+                grid.set_cell(row_index, col_index, table_dict[row_index][col_index])
+        return grid
+
+    @staticmethod
+    def ensure_grid(table):
+        """
+        table 为 TableGrid 时直接返回，二维 dict 则进行转换，None 返回 None
+        供各个抽取器的 extract_from_table_dict 使用
+        """
+        if table is None or isinstance(table, TableGrid):
+            return table
+        return TableGrid.from_dict(table)
+
+
+class TableColumn(object):
+    """
+    TableGrid 中一列的视图
+    """
+
+    __slots__ = ('grid', 'col_index')
+
+    def __init__(self, grid, col_index):
+        self.grid = grid
+        self.col_index = col_index
+
+    def __getitem__(self, row_index):
+        return self.grid.cell(row_index, self.col_index)
+
+    def cells(self, start=0, stop=None):
+        """
+        返回 [start, stop) 行中这一列存在的单元格 [(行号, 文本), ...]
+        """
+        rows = self.grid.rows
+        col_index = self.col_index
+        stop = len(rows) if stop is None else min(stop, len(rows))
+        rs = []
+        for row_index in range(start, stop):
+            row = rows[row_index]
+            if row is not None and col_index < len(row) and row[col_index] is not None:
+                rs.append((row_index, row[col_index]))
+        return rs
@@ -2,12 +2,13 @@
 
 import codecs
 import json
-import re
 import os
 
 from docparser import HTMLParser
+from utils import Profiler
 from utils import TextUtils
 from ner import NERTagger
+from extract import PatternCatalogue
 
 
 # 重大合同记录
@@ -73,33 +74,42 @@ class Contract_Record(object):
 # 增减持记录提取
 class Contract_Extractor(object):
 
-    def __init__(self, ner_model_dir, ner_blacklist_file_path):
+    def __init__(self, ner_model_dir, ner_blacklist_file_path, ner_cache_path=None, html_parser_backend='bs4',
+                 ner_backend='ltp', ner_tagger=None):
         '''
         初始化
+        ner_cache_path: pyltp 输出缓存文件路径，为 None 时不使用缓存
+        html_parser_backend: html 解析后端，'bs4', 'lxml' 或 'iterparse'
+        ner_backend: NERTagger 的后端，'ltp' 或 'rule' (不需要 pyltp 模型的快速模式)
+        ner_tagger: 使用的 NERTagger，为 None 时根据后端、模型目录、黑名单、缓存文件获取共享的 NERTagger
         '''
-        self.html_parser = HTMLParser.HTMLParser()
-        self.ner_tagger = NERTagger.NERTagger(ner_model_dir, ner_blacklist_file_path)
+        self.html_parser = HTMLParser.HTMLParser(html_parser_backend)
+        if ner_tagger is None:
+            ner_tagger = NERTagger.get_tagger(ner_model_dir, ner_blacklist_file_path, ner_cache_path, ner_backend)
+        self.ner_tagger = ner_tagger
     
     # 主例程
     def extract(self, html_path):
         '''
         提取记录
+        html_path: html 文件路径，或 HTMLParser.parse 得到的 ParsedDocument
         '''
         # 解析 html
-        paragraphs = self.html_parser.parse_content(html_path)
+        document = self.html_parser.ensure_document(html_path)
         tagged_paragraphs = []
-        for paragraph in paragraphs:
-            # ner 打标签
-            ner_obj = self.ner_tagger.ner(paragraph, {})
-            # print(ner_obj.get_tagged_str())
-            # print("*************")
-            tagged_paragraphs.append(ner_obj.get_tagged_str())
+        # ner 批量打标签
+        with Profiler.stage('contract.ner', len(document.paragraphs)):
+            for ner_obj in self.ner_tagger.ner_batch(document.paragraphs, {}):
+                # print(ner_obj.get_tagged_str())
+                # print("*************")
+                tagged_paragraphs.append(ner_obj.get_tagged_str())
 
         # 抽取各项内容
         # partyA = self.extract_partyA(tagged_paragraphs)
         # partyB = self.extract_partyB(tagged_paragraphs)
         # project_name = self.extract_project_name(tagged_paragraphs)
-        contract_name = self.extract_contract_name(tagged_paragraphs)
+        with Profiler.stage('contract.paragraph_rules', len(tagged_paragraphs)):
+            contract_name = self.extract_contract_name(tagged_paragraphs)
         # amount = self.extract_amount(tagged_paragraphs)
 
         # 组合得到的抽取内容
@@ -114,7 +124,7 @@ class Contract_Extractor(object):
         '''
         partyA_candidates = []
         
-        partyA_pattern = re.compile(r'(与|和)(.*)(<org>)?(?P<partyA>.{1,50}?)(</org>)?(.*)(签订|签署)')
+        partyA_pattern = PatternCatalogue.ContractPartyAPattern
         for text in tagged_paragraphs:
             match_objs = partyA_pattern.finditer(text)
             for match_obj in match_objs:
@@ -123,7 +133,7 @@ class Contract_Extractor(object):
         if len(partyA_candidates) > 0:
             return self.select_partyA(partyA_candidates)
 
-        partyA_pattern = re.compile(r'(收到|接到)(<org>)?(?P<partyA>.{1,28}?)(</org>)?(发出|发来)')
+        partyA_pattern = PatternCatalogue.ContractPartyANoticePattern
         for text in tagged_paragraphs:
             match_objs = partyA_pattern.finditer(text)
             for match_obj in match_objs:
@@ -148,7 +158,7 @@ class Contract_Extractor(object):
         不过组织名可能跟前面的公告编号黏在一起，需要去除这些编号
         没有找到组织名时，返回 ''
         '''
-        partyB_pattern = re.compile(r'(<org>)(?P<partyB>.{1,28}?)(</org>)')
+        partyB_pattern = PatternCatalogue.ContractPartyBPattern
         for text in tagged_paragraphs:
             search_obj = partyB_pattern.search(text)
             if search_obj:
@@ -186,7 +196,7 @@ class Contract_Extractor(object):
                 if len(proj_name) > 10:
                     return proj_name
         '''
-        proj_name_pattern = re.compile(r'(中标)(?P<proj_name>[^，。）》]{1,100}?标段[）]?)')
+        proj_name_pattern = PatternCatalogue.ContractProjectNamePattern
         for text in tagged_paragraphs:
             search_obj = proj_name_pattern.search(text)
             if search_obj:
@@ -227,7 +237,7 @@ class Contract_Extractor(object):
         if len(contract_name) > 0:
             return contract_name
         '''
-        contract_pattern = re.compile(r'“(?P<contract_name>.{1,60}?合同)”')
+        contract_pattern = PatternCatalogue.ContractNamePattern
         contract_name = self.extract_contract_name_pattern(tagged_paragraphs, contract_pattern)
         if len(contract_name) > 0:
             return contract_name
@@ -251,7 +261,7 @@ class Contract_Extractor(object):
         return ''
 
     def extract_amount(self, tagged_paragraphs):
-        amount_pattern = re.compile(r'<num>(?P<contract_amount>.*?)</num>元')
+        amount_pattern = PatternCatalogue.ContractAmountPattern
         for text in tagged_paragraphs:
             match_obj = amount_pattern.search(text)
             if match_obj:
@@ -295,8 +305,7 @@ class Contract_Extractor(object):
         '''
         主要用于去除乙方名称中出现的公告编号
         '''
-        num_pattern = re.compile(r'\d*([-]\d*)+')
-        search_obj = num_pattern.search(party_name)
+        search_obj = PatternCatalogue.ContractNumberPattern.search(party_name)
         if search_obj:
             return(party_name[search_obj.end():])
         else:
@@ -5,8 +5,13 @@ import json
 import re
 
 from docparser import HTMLParser
+from docparser.TableGrid import TableGrid
+from utils import Profiler
 from utils import TextUtils
 from ner import NERTagger
+from ner.EntityIndex import EntityIndex
+from extract.TableHeaderMatcher import TableHeaderMatcher
+from extract import PatternCatalogue
 
 # 增减持记录
 class ZengJianChiRecord(object):
@@ -84,12 +89,19 @@ class ZengJianChiRecord(object):
 # 增减持记录提取
 class ZengJianChiExtractor(object):
 
-    def __init__(self, config_file_path, ner_model_dir_path, ner_blacklist_file_path):
-        self.html_parser = HTMLParser.HTMLParser()
+    def __init__(self, config_file_path, ner_model_dir_path, ner_blacklist_file_path, ner_cache_path=None,
+                 html_parser_backend='bs4', ner_backend='ltp', ner_tagger=None):
+        '''
+        ner_backend: NERTagger 的后端，'ltp' 或 'rule' (不需要 pyltp 模型的快速模式)
+        ner_tagger: 使用的 NERTagger，为 None 时根据后端、模型目录、黑名单、缓存文件获取共享的 NERTagger
+        '''
+        self.html_parser = HTMLParser.HTMLParser(html_parser_backend)
         self.config = None
-        self.ner_tagger = NERTagger.NERTagger(ner_model_dir_path, ner_blacklist_file_path)
-        #
-        self.ner_dict = {}
+        if ner_tagger is None:
+            ner_tagger = NERTagger.get_tagger(ner_model_dir_path, ner_blacklist_file_path, ner_cache_path, ner_backend)
+        self.ner_tagger = ner_tagger
+        # 增发对象对应的实体标签，供 NER 根据词典调整标注
+        self.ner_dict = EntityIndex()
 
         # 读取保存在 json 中的配置文件
         # 将读取结果保存在 self.table_dict_field_pattern_dict 中
@@ -97,6 +109,9 @@ class ZengJianChiExtractor(object):
         # 值：TableDictFieldPattern 对象
         with codecs.open(config_file_path, encoding='utf-8', mode='r') as fp:
             self.config = json.loads(fp.read())
+        # 配置文件中可以替换该实例使用的正则表达式
+        self.patterns = PatternCatalogue.PatternCatalogue(PatternCatalogue.DZPatternNames,
+                                                          self.config.get('patterns'))
         self.table_dict_field_pattern_dict = {}
         for table_dict_field in self.config['table_dict']['fields']:
             field_name = table_dict_field['fieldName']
@@ -118,19 +133,27 @@ class ZengJianChiExtractor(object):
                 TableDictFieldPattern(field_name=field_name, convert_method=convert_method,
                                       pattern=pattern, col_skip_pattern=col_skip_pattern,
                                       row_skip_pattern=row_skip_pattern)
+        self.table_header_matcher = TableHeaderMatcher(self.table_dict_field_pattern_dict)
+        # 第一行不能匹配任何字段的表格不会得到记录，解析 html 时直接跳过
+        self.html_parser.table_filter = self.table_header_matcher.is_candidate_header
+        # 最近一次 extract 中被跳过的表格数
+        self.skipped_table_count = 0
 
     def extract(self, html_file_path):
         '''
         对 html 文件进行解析
+        html_file_path: html 文件路径，或 HTMLParser.parse 得到的 ParsedDocument
         '''
+        document = self.html_parser.ensure_document(html_file_path)
+        self.skipped_table_count = document.skipped_table_count
         # 1. 解析 Table Dict
         rs = []
-        paragraphs = self.html_parser.parse_content(html_file_path)
-        rs_paragraphs = self.extract_from_paragraphs(paragraphs)
-        for table_dict in self.html_parser.parse_table(html_file_path):
-            rs_table = self.extract_from_table_dict(table_dict)
-            if len(rs_table) > 0:
-                rs.extend(rs_table)
+        rs_paragraphs = self.extract_from_paragraphs(document.paragraphs)
+        with Profiler.stage('dz.table_rules', len(document.grids)):
+            for table_dict in document.grids:
+                rs_table = self.extract_from_table_dict(table_dict)
+                if len(rs_table) > 0:
+                    rs.extend(rs_table)
         # 2. 如果没有 Table Dict 则解析文本部分
         if len(rs) <= 0:
             return rs_paragraphs
@@ -140,12 +163,13 @@ class ZengJianChiExtractor(object):
     def extract_from_table_dict(self, table_dict):
         '''
         尝试从表格中获取有效字段
-        table_dict: HTML 解析得到的表格
+        table_dict: HTML 解析得到的表格，TableGrid 或二维 dict
         '''
         rs = []
-        if table_dict is None or len(table_dict) <= 0:
+        grid = TableGrid.ensure_grid(table_dict)
+        if grid is None or len(grid) <= 0:
             return rs
-        row_length = len(table_dict)
+        row_length = len(grid)
         # field_col_dict：字典
         #   键：在表头中匹配到的 field
         #   值：对应的列数以及可能出现的单位信息
@@ -155,30 +179,34 @@ class ZengJianChiExtractor(object):
 
         # 假定第一行是表头部分则尝试进行规则匹配这一列是哪个类型的字段
         # 必须满足 is_match_pattern is True and is_match_col_skip_pattern is False
-        head_row = table_dict[0]
-        col_length = len(head_row)
+        # 所有字段的模式由 table_header_matcher 合并匹配，相同的表头只匹配一次
+        col_length = grid.row_size(0)
+        head_row = [grid.cell(0, i) for i in range(col_length)]
+        head_match = self.table_header_matcher.match_header(head_row)
         # 遍历表格第一行 (表头) 的元素
         for i in range(col_length):
-            text = head_row[i]
-            # 尝试匹配 table_dict_field_pattern 中的各个模式
-            for (field_name, table_dict_field_pattern) in self.table_dict_field_pattern_dict.items():
-                # 匹配成功
-                if table_dict_field_pattern.is_match_pattern(text) and \
-                        not table_dict_field_pattern.is_match_col_skip_pattern(text):
-                    if field_name not in field_col_dict:
-                        field_col_dict[field_name] = (i, "")
-                        if '%' in text:
-                            field_col_dict[field_name] = (i, '%')
-                        if '万' in text:
-                            field_col_dict[field_name] = (i, '万')
-                    # 逐行扫描这个字段的取值，如果满足 row_skip_pattern 则丢弃整行 row
-                    for j in range(1, row_length):
-                        try:
-                            text = table_dict[j][i]
-                            if table_dict_field_pattern.is_match_row_skip_pattern(text):
-                                skip_row_set.add(j)
-                        except KeyError:
-                            pass
+            if len(head_match[i]) == 0:
+                continue
+            # 这一列除表头以外的单元格 (行号, 文本)
+            col_cells = grid.column(i).cells(1, row_length)
+            last_text = col_cells[-1][1] if len(col_cells) > 0 else head_row[i]
+            column_fields = self.table_header_matcher.match_column(head_match[i], head_row[i], last_text)
+            # 匹配成功
+            for field_name, text in column_fields:
+                if field_name not in field_col_dict:
+                    field_col_dict[field_name] = (i, "")
+                    if '%' in text:
+                        field_col_dict[field_name] = (i, '%')
+                    if '万' in text:
+                        field_col_dict[field_name] = (i, '万')
+            # 逐行扫描这一列的取值，如果满足任意一个匹配字段的 row_skip_pattern 则丢弃整行 row
+            row_skip_patterns = self.table_header_matcher.row_skip_patterns([x[0] for x in column_fields])
+            if len(row_skip_patterns) > 0:
+                for j, text in col_cells:
+                    for row_skip_pattern in row_skip_patterns:
+                        if row_skip_pattern.search(text):
+                            skip_row_set.add(j)
+                            break
         # 没有扫描到有效的列
         if len(field_col_dict) <= 0:
             return rs
@@ -188,10 +216,10 @@ class ZengJianChiExtractor(object):
         for row_index in range(1, row_length):
             if row_index in skip_row_set:
                 continue
-            record = ZengJianChiRecord(None, None, None, None, None, None, None)
+            record = ZengJianChiRecord(None, None, None, None, None)
             for (field_name, col_index) in field_col_dict.items():
                 try:
-                    text = table_dict[row_index][col_index[0]] + col_index[1]
+                    text = grid.cell(row_index, col_index[0]) + col_index[1]
                     if field_name == 'addObject':
                         record.addObject = self.table_dict_field_pattern_dict.get(field_name).convert(text)
                     elif field_name == 'addNumber':
@@ -217,30 +245,36 @@ class ZengJianChiExtractor(object):
         '''
         从多个段落中进行抽取
         '''
-        self.ner_dict = {}  # clear dict
+        self.ner_dict = EntityIndex()  # clear dict
         addition_records = []
         record_list = []
-        # 对各个段落进行抽取
-        for para in paragraphs:
-            addtion_records_para = self.extract_from_paragraph(para)
-            addition_records += addtion_records_para
+        # 批量打标签之后对各个段落进行抽取
+        with Profiler.stage('dz.ner', len(paragraphs)):
+            tagged_paragraphs = self.ner_tagger.ner_batch(paragraphs, self.ner_dict)
+        with Profiler.stage('dz.paragraph_rules', len(paragraphs)):
+            for tag_res in tagged_paragraphs:
+                addtion_records_para = self.extract_from_paragraph(tag_res)
+                addition_records += addtion_records_para
         for record in addition_records:
             record_list.append(record)
         return record_list
 
-    def extract_from_paragraph(self, paragraph):
+    def extract_from_paragraph(self, tag_res):
         '''
         从一个段落中进行抽取
+        tag_res: ner_batch 得到的段落 NERTaggedText，打标签时词典为空
         '''
-        tag_res = self.ner_tagger.ner(paragraph, self.ner_dict)
+        if len(self.ner_dict) > 0:
+            # 之前的段落中抽取到了增发对象，根据词典重新调整
+            tag_res = self.ner_tagger.retag(tag_res, self.ner_dict)
         tagged_str = tag_res.get_tagged_str()
         # 抽取公司简称以及简称
         new_size = self.extract_object(tagged_str)
         if new_size > 0:
-            tag_res = self.ner_tagger.ner(paragraph, self.ner_dict)
-            tagged_str = tag_res.get_tagged_str()
+            # 词典有更新时只重新进行词典调整，不再重复调用 pyltp
+            tag_res = self.ner_tagger.retag(tag_res, self.ner_dict)
         # 抽取变动记录，变动后记录
-        addition_records = self.extract_record(tagged_str)
+        addition_records = self.extract_record(tag_res)
         return addition_records
 
     def extract_object(self, paragraph):
@@ -249,9 +283,7 @@ class ZengJianChiExtractor(object):
         返回增加 ner_dict 中增加的条目数量
         extract_from_paragraph 子例程
         '''
-        targets = re.finditer(
-            r'(发行对象|投资对象|<org>){1,2}(?P<obj>.{1,28}?)(</org>)?',
-            paragraph)
+        targets = self.patterns.DZObjectPattern.finditer(paragraph)
         size_before = len(self.ner_dict)
         for target in targets:
             # 增发对象
@@ -262,48 +294,45 @@ class ZengJianChiExtractor(object):
                 self.ner_dict[obj_name] = "Ni"
         return len(self.ner_dict) - size_before
 
-    def extract_record(self, paragraph):
+    def extract_record(self, tagged_text):
         '''
         用于抽取一个段落中的变动数量
+        tagged_text: 段落的 NERTaggedText
         extract_from_paragraph 子例程
         '''
         records = []
-        targets = re.finditer(r'(申购|认购|发行)?.{0,10}?(数目|数量|股数|股份|股份数)[^.。,，《》]{0,30}?<num>(?P<num>.*?)</num>股?',
-                              paragraph)
+        paragraph = tagged_text.get_tagged_str()
+        targets = self.patterns.DZRecordPattern.finditer(paragraph)
         for target in targets:
             start_pos = target.start()
 
             # 增发数量
             add_num = target.group("num")
 
-            # 查找对象
-            pat_obj = re.compile(r'<org>(.*?)</org>')
-            m_obj = pat_obj.findall(paragraph, 0, start_pos)
+            # 查找对象：之前最后一个公司，没有则查找最后一个人名
+            m_obj = tagged_text.last_before('org', start_pos)
+            if m_obj is None:
+                m_obj = tagged_text.last_before('person', start_pos)
             add_obj = ""
-            if m_obj is not None and len(m_obj) > 0:
-                add_obj = m_obj[-1]
-            else:
-                pat_person = re.compile(r'<person>(.*?)</person>')
-                m_person = pat_person.findall(paragraph, 0, start_pos)
-                if m_person is not None and len(m_person) > 0:
-                    add_obj = m_person[-1]
+            if m_obj is not None:
+                add_obj = m_obj[2]
             # 没有查找到对象名称
             if add_obj is None or len(add_obj) == 0:
                 continue
 
             # 查找金额
-            pat_price = re.compile(r'(认缴|申购|认购|发行|资)?.{0,10}?(金额|资本|额)([:：为])?<num>(?P<price>.*?)</num>元?')
+            pat_price = self.patterns.DZAmountPattern
             m_price = pat_price.search(paragraph, start_pos)
             add_price = ""
             if m_price is not None:
-                add_price = m_price.group("share_price")
+                add_price = m_price.group("price")
             else:
                 m_price = pat_price.findall(paragraph)
                 if m_price is not None and len(m_price) > 0:
                     add_price = m_price[-1]
 
             # 查找锁定期
-            pat_period = re.compile(r'自本次发行结束之日起(\s*)<num>(?P<period>.*?)</num>(\s*)个月内不得转让')
+            pat_period = self.patterns.DZLockPeriodPattern
             m_period = pat_period.search(paragraph, start_pos)
             add_period = ""
             if m_period is not None:
@@ -314,7 +343,7 @@ class ZengJianChiExtractor(object):
                     add_period = m_period[-1]
 
             # 查找方法
-            pat_method = re.compile(r'以(?P<method>.*?)认购')
+            pat_method = self.patterns.DZSubscriptMethodPattern
             m_method = pat_method.search(paragraph, start_pos)
             add_method = ""
             if m_method is not None:
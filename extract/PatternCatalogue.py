@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+import re
+
+# 各个抽取器使用的正则表达式，在 import 时统一编译
+# 抽取器的实例方法通过 PatternCatalogue 对象访问，可以按配置替换；静态方法直接使用本模块中的模式
+
+# ---------- 打标签文本 ----------
+# 实体通过 NERTaggedText.last_before / first_after 查找，不使用正则表达式
+# 句号
+PeriodPattern = re.compile(r'。')
+
+# ---------- 增减持 ----------
+# 标准格式的结束日期
+FinishDatePattern = re.compile(r'(\d\d\d\d)[-./年](\d{1,2})[-./月](\d{1,2})日?')
+# 股东名称中的简称说明
+ShortNamePattern = re.compile(r'简称')
+# 股东名称及简称
+CompanyAbbrPattern = re.compile(
+    r'(股东|<org>){1,2}(?P<com>.{1,28}?)(</org>)?[(（].{0,5}?简称:?("|“|<org>)?(?P<com_abbr>.{2,20}?)("|”|</org>)?[)）]')
+# 变动数量
+ChangePattern = re.compile(
+    r'(出售|减持|增持|买入)了?[^，。.,:：;!?？（）()“”"<>]*?(股票|股份|(<org>([^.。,，<>]*?)</org>))[^.。,，《》]{0,30}?<num>(?P<share_num>.{1,20}?)</num>股?')
+# 日期与变动数量之间出现时，说明两者很可能没有联系
+ChangeDatePeriodPattern = re.compile(r'。|(后续)|(不[低高]于)')
+# 变动价格
+ChangePricePattern = re.compile(r'(均价|(平均)?(增持|减持|成交)?(价格|股价))([:：为])?<num>(?P<share_price>.*?)</num>')
+# 变动后持股数
+ChangeAfterPattern = re.compile(
+    r'(增持(计划实施)?后|减持(计划实施)?后|变动后)[^。;；]*?持有.{0,30}?<num>(?P<share_num_after>.*?)</num>(股|万股|百万股|亿股)?')
+# 完整的年月日
+FullDatePattern = re.compile(r'(\d\d\d\d)[-.年](\d{1,2})[-.月](\d{1,2})日?')
+# 只有年月
+YearMonthPattern = re.compile(r'(\d\d\d\d)[-.年](\d{1,2})[-.月]')
+# 表格中的价格数字
+TablePricePattern = re.compile(r'[\d\\.]+')
+# 表格中日期区间的分隔符
+DateRangeSplitPattern = re.compile('[-—~]')
+
+# ---------- 定增 ----------
+# 增发对象
+DZObjectPattern = re.compile(r'(发行对象|投资对象|<org>){1,2}(?P<obj>.{1,28}?)(</org>)?')
+# 增发数量
+DZRecordPattern = re.compile(r'(申购|认购|发行)?.{0,10}?(数目|数量|股数|股份|股份数)[^.。,，《》]{0,30}?<num>(?P<num>.*?)</num>股?')
+# 增发金额
+DZAmountPattern = re.compile(r'(认缴|申购|认购|发行|资)?.{0,10}?(金额|资本|额)([:：为])?<num>(?P<price>.*?)</num>元?')
+# 锁定期
+DZLockPeriodPattern = re.compile(r'自本次发行结束之日起(\s*)<num>(?P<period>.*?)</num>(\s*)个月内不得转让')
+# 认购方式
+DZSubscriptMethodPattern = re.compile(r'以(?P<method>.*?)认购')
+
+# ---------- 重大合同 ----------
+# 甲方："与|和 ... 签署|签订"
+ContractPartyAPattern = re.compile(r'(与|和)(.*)(<org>)?(?P<partyA>.{1,50}?)(</org>)?(.*)(签订|签署)')
+# 甲方："接到|收到 ... 发来|发出"
+ContractPartyANoticePattern = re.compile(r'(收到|接到)(<org>)?(?P<partyA>.{1,28}?)(</org>)?(发出|发来)')
+# 乙方
+ContractPartyBPattern = re.compile(r'(<org>)(?P<partyB>.{1,28}?)(</org>)')
+# 项目名称
+ContractProjectNamePattern = re.compile(r'(中标)(?P<proj_name>[^，。）》]{1,100}?标段[）]?)')
+# 合同名称
+ContractNamePattern = re.compile(r'“(?P<contract_name>.{1,60}?合同)”')
+# 合同金额
+ContractAmountPattern = re.compile(r'<num>(?P<contract_amount>.*?)</num>元')
+# 名称中的公告编号
+ContractNumberPattern = re.compile(r'\d*([-]\d*)+')
+
+
+# 增减持抽取器可以在配置中替换的正则表达式
+ZengJianChiPatternNames = ('PeriodPattern', 'CompanyAbbrPattern', 'ChangePattern', 'ChangeDatePeriodPattern',
+                           'ChangePricePattern', 'ChangeAfterPattern', 'FullDatePattern', 'YearMonthPattern',
+                           'TablePricePattern')
+# 定增抽取器可以在配置中替换的正则表达式
+DZPatternNames = ('DZObjectPattern', 'DZRecordPattern', 'DZAmountPattern', 'DZLockPeriodPattern',
+                  'DZSubscriptMethodPattern')
+
+
+class PatternCatalogue(object):
+    """
+    一个抽取器实例使用的正则表达式，属性名为本模块中的模式名
+    默认为本模块中编译好的模式，配置中的替换只作用于该实例，不影响其他抽取器
+    """
+
+    def __init__(self, names, overrides=None):
+        """
+        names: 该抽取器使用的模式名
+        overrides: 字典，键为模式名 (例如 "ChangePattern")，值为新的正则表达式文本；键不在 names 中时抛出 KeyError
+        """
+        module_dict = globals()
+        for name in names:
+            setattr(self, name, module_dict[name])
+        if overrides is None:
+            return
+        for name, pattern in overrides.items():
+            if name not in names:
+                raise KeyError('unknown pattern name: %s' % name)
+            setattr(self, name, re.compile(pattern))
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+import re
+
+# 不能安全合并的正则：包含编号反向引用或命名反向引用
+UnsafeBackrefPattern = re.compile(r'\\[1-9]|\(\?P=')
+
+
+class TableHeaderMatcher(object):
+    """
+    表头匹配器
+    将配置文件中所有字段的 pattern / colSkipPattern 合并为一个正则表达式，
+    每个单元格只需要扫描一次即可得到所有匹配的字段；
+    同时缓存单元格文本、表头行对应的匹配结果，以及各字段组合对应的 rowSkipPattern
+    """
+
+    def __init__(self, table_dict_field_pattern_dict, cache_size=10000):
+        """
+        table_dict_field_pattern_dict: 键为 field_name，值为 TableDictFieldPattern 对象
+        cache_size: 缓存条目数上限，超过时清空缓存
+        """
+        self.field_patterns = list(table_dict_field_pattern_dict.items())
+        # field_name -> 在配置中的顺序
+        self.field_order = dict((field_name, idx) for idx, (field_name, _) in enumerate(self.field_patterns))
+        self.cache_size = cache_size
+        self.combined_pattern = self.combine_patterns(self.field_patterns)
+        # 单元格文本 -> 匹配的字段
+        self.match_cache = {}
+        # 表头行 -> 各列匹配的字段
+        self.header_cache = {}
+        # 字段组合 -> 合并后的 rowSkipPattern
+        self.row_skip_cache = {}
+
+    @staticmethod
+    def combine_patterns(field_patterns):
+        """
+        每个字段的 pattern 和 colSkipPattern 分别放入一个可选的前向断言中，
+        断言内的命名分组 p<i> / c<i> 是否匹配到内容即表示对应模式能否在文本中找到
+        无法安全合并时返回 None，退化为逐个模式匹配
+        """
+        parts = []
+        for idx, (_, field_pattern) in enumerate(field_patterns):
+            for group_prefix, pattern in (('p', field_pattern.pattern), ('c', field_pattern.col_skip_pattern)):
+                if pattern is None:
+                    continue
+                if UnsafeBackrefPattern.search(pattern.pattern) or pattern.flags & ~re.UNICODE:
+                    return None
+                parts.append(r'(?:(?=[\s\S]*?(?P<%s%d>%s)))?' % (group_prefix, idx, pattern.pattern))
+        try:
+            return re.compile(''.join(parts))
+        except re.error:
+            return None
+
+    def match_fields(self, text):
+        """
+        返回 text 能匹配的字段 (满足 pattern 且不满足 colSkipPattern)，按配置顺序排列
+        """
+        rs = self.match_cache.get(text)
+        if rs is not None:
+            return rs
+        if self.combined_pattern is not None:
+            groups = self.combined_pattern.match(text).groupdict()
+            rs = tuple(field_name for idx, (field_name, _) in enumerate(self.field_patterns)
+                       if groups.get('p%d' % idx) is not None and groups.get('c%d' % idx) is None)
+        else:
+            rs = tuple(field_name for field_name, field_pattern in self.field_patterns
+                       if field_pattern.is_match_pattern(text) and not field_pattern.is_match_col_skip_pattern(text))
+        if len(self.match_cache) >= self.cache_size:
+            self.match_cache.clear()
+        self.match_cache[text] = rs
+        return rs
+
+    def match_header(self, head_texts):
+        """
+        返回表头各列匹配的字段，相同的表头只计算一次
+        """
+        signature = tuple(head_texts)
+        rs = self.header_cache.get(signature)
+        if rs is None:
+            rs = tuple(self.match_fields(text) for text in signature)
+            if len(self.header_cache) >= self.cache_size:
+                self.header_cache.clear()
+            self.header_cache[signature] = rs
+        return rs
+
+    def is_candidate_header(self, head_texts):
+        """
+        表头中是否至少有一列能匹配某个字段，不能匹配时该表格不会得到任何记录
+        作为 HTMLParser 的 table_filter 使用
+        """
+        return any(len(fields) > 0 for fields in self.match_header(head_texts))
+
+    def match_column(self, head_fields, head_text, last_text):
+        """
+        返回一列匹配的字段以及用于判断单位的文本 [(field_name, text), ...]
+        head_fields: match_header 得到的该列表头匹配的字段
+        第一个字段由表头确定；与原有逐字段扫描表格的实现保持一致，
+        之后的字段使用该列最后一个单元格的文本 last_text 进行匹配
+        """
+        if len(head_fields) == 0:
+            return []
+        first_order = self.field_order[head_fields[0]]
+        rs = [(head_fields[0], head_text)]
+        for field_name in self.match_fields(last_text):
+            if self.field_order[field_name] > first_order:
+                rs.append((field_name, last_text))
+        return rs
+
+    def row_skip_patterns(self, field_names):
+        """
+        将多个字段的 rowSkipPattern 合并为一个正则表达式，返回正则表达式列表
+        无法安全合并时返回各字段各自的 rowSkipPattern，都没有 rowSkipPattern 时返回空列表
+        """
+        field_names = tuple(field_names)
+        rs = self.row_skip_cache.get(field_names)
+        if rs is not None:
+            return rs
+        field_pattern_dict = dict(self.field_patterns)
+        rs = []
+        for field_name in field_names:
+            pattern = field_pattern_dict[field_name].row_skip_pattern
+            if pattern is not None and pattern not in rs:
+                rs.append(pattern)
+        if len(rs) > 1 and not any(UnsafeBackrefPattern.search(pattern.pattern) for pattern in rs):
+            try:
+                rs = [re.compile('|'.join('(?:%s)' % pattern.pattern for pattern in rs))]
+            except re.error:
+                pass
+        self.row_skip_cache[field_names] = rs
+        return rs
@@ -6,8 +6,15 @@ import re
 import csv
 
 from docparser import HTMLParser
+from docparser.TableGrid import TableGrid
+from utils import Profiler
 from utils import TextUtils
 from ner import NERTagger
+from ner.EntityIndex import EntityIndex
+from ner.SentenceWindow import SentenceWindow
+from utils.KeywordAutomaton import KeywordAutomaton
+from extract.TableHeaderMatcher import TableHeaderMatcher
+from extract import PatternCatalogue
 
 
 # 增减持记录
@@ -38,8 +45,7 @@ class ZengJianChiRecord(object):
         将结束日期转换为标准格式
         normalize 子例程
         """
-        pattern = re.compile(r'(\d\d\d\d)[-./年](\d{1,2})[-./月](\d{1,2})日?')
-        match = pattern.search(text)
+        match = PatternCatalogue.FinishDatePattern.search(text)
         if match:
             if len(match.groups()) == 3:
                 year = int(match.groups()[0])
@@ -82,10 +88,9 @@ class ZengJianChiRecord(object):
 
     @staticmethod
     def normalize_name(text):
-        short_pattern = re.compile(r'简称')
         name_illegal = {'"', '“', '”', '：'}
         new_name = []
-        short_flag = 1 if len(short_pattern.findall(text)) > 0 else 0
+        short_flag = 1 if len(PatternCatalogue.ShortNamePattern.findall(text)) > 0 else 0
         range_flag = 0
         for ch in text:
             if short_flag == 1 and (ch == '(' or ch == '（'):
@@ -135,16 +140,26 @@ class ZengJianChiRecord(object):
 # 增减持记录提取
 class ZengJianChiExtractor(object):
 
-    def __init__(self, config_file_path, ner_model_dir_path, ner_blacklist_file_path, public_time_path):
-        self.html_parser = HTMLParser.HTMLParser()
+    def __init__(self, config_file_path, ner_model_dir_path, ner_blacklist_file_path, public_time_path,
+                 ner_cache_path=None, html_parser_backend='bs4', ner_backend='ltp', sentence_window_size=None,
+                 ner_tagger=None):
+        """
+        ner_backend: NERTagger 的后端，'ltp' 或 'rule' (不需要 pyltp 模型的快速模式)
+        sentence_window_size: 不为 None 时使用句子窗口 NER，只对含有段落预筛选关键词的句子及其前后
+                              sentence_window_size 个句子打标签；为 None 时对整个段落打标签
+        ner_tagger: 使用的 NERTagger，为 None 时根据后端、模型目录、黑名单、缓存文件获取共享的 NERTagger
+        """
+        self.html_parser = HTMLParser.HTMLParser(html_parser_backend)
         self.config = None
-        self.ner_tagger = NERTagger.NERTagger(ner_model_dir_path, ner_blacklist_file_path)
+        if ner_tagger is None:
+            ner_tagger = NERTagger.get_tagger(ner_model_dir_path, ner_blacklist_file_path, ner_cache_path, ner_backend)
+        self.ner_tagger = ner_tagger
         # 公司简称对应公司全称
         self.com_abbr_dict = {}
         # 公司全称对应公司简称
         self.com_full_dict = {}
-        # 
-        self.com_abbr_ner_dict = {}
+        # 公司全称及简称对应的实体标签，供 NER 根据词典调整标注
+        self.com_abbr_ner_dict = EntityIndex()
 
         # 公告发布日期文件
         self.public_time = {}
@@ -159,6 +174,9 @@ class ZengJianChiExtractor(object):
         # 值：TableDictFieldPattern 对象
         with codecs.open(config_file_path, encoding='utf-8', mode='r') as fp:
             self.config = json.loads(fp.read())
+        # 配置文件中可以替换该实例使用的正则表达式
+        self.patterns = PatternCatalogue.PatternCatalogue(PatternCatalogue.ZengJianChiPatternNames,
+                                                          self.config.get('patterns'))
         self.table_dict_field_pattern_dict = {}
         for table_dict_field in self.config['table_dict']['fields']:
             field_name = table_dict_field['fieldName']
@@ -180,16 +198,39 @@ class ZengJianChiExtractor(object):
                 TableDictFieldPattern(field_name=field_name, convert_method=convert_method,
                                       pattern=pattern, col_skip_pattern=col_skip_pattern,
                                       row_skip_pattern=row_skip_pattern)
+        self.table_header_matcher = TableHeaderMatcher(self.table_dict_field_pattern_dict)
+        # 第一行不能匹配任何字段的表格不会得到记录，解析 html 时直接跳过
+        self.html_parser.table_filter = self.table_header_matcher.is_candidate_header
+        # 最近一次 extract 中被跳过的表格数
+        self.skipped_table_count = 0
+        # 段落预筛选：变动记录、变动后记录、股东简称的正则都以关键词开头 (例如 "增持"、"变动后"、"简称")，
+        # 不含任何关键词的段落不会得到结果，不进行 NER
+        # 关键词由配置文件 paragraph_filter.keywords 给出，在配置中替换了 patterns 中的正则时需要同时修改
+        self.paragraph_filter = None
+        paragraph_keywords = self.config.get('paragraph_filter', {}).get('keywords')
+        if paragraph_keywords is not None and len(paragraph_keywords) > 0:
+            self.paragraph_filter = KeywordAutomaton(paragraph_keywords)
+        # 最近一次 extract 中的段落数以及跳过 NER 的段落数
+        self.paragraph_count = 0
+        self.skipped_paragraph_count = 0
+        # 句子窗口：变动数量、日期、价格、变动后持股比例都在关键词所在的句子中查找，
+        # 只有股东名称可能出现在之前的句子中，窗口之外的股东名称不会被识别
+        self.sentence_window = None
+        if sentence_window_size is not None:
+            if self.paragraph_filter is None:
+                raise ValueError('sentence window requires paragraph_filter.keywords in %s' % config_file_path)
+            self.sentence_window = SentenceWindow(self.paragraph_filter, sentence_window_size)
 
     def extract_from_table_dict(self, table_dict):
         """
         尝试从表格中获取有效字段
-        table_dict: HTML 解析得到的表格
+        table_dict: HTML 解析得到的表格，TableGrid 或二维 dict
         """
         rs = []
-        if table_dict is None or len(table_dict) <= 0:
+        grid = TableGrid.ensure_grid(table_dict)
+        if grid is None or len(grid) <= 0:
             return rs
-        row_length = len(table_dict)
+        row_length = len(grid)
         # field_col_dict：字典
         #   键：在表头中匹配到的 field
         #   值：对应的列数以及可能出现的单位信息
@@ -199,30 +240,34 @@ class ZengJianChiExtractor(object):
 
         # 假定第一行是表头部分则尝试进行规则匹配这一列是哪个类型的字段
         # 必须满足 is_match_pattern is True and is_match_col_skip_pattern is False
-        head_row = table_dict[0]
-        col_length = len(head_row)
+        # 所有字段的模式由 table_header_matcher 合并匹配，相同的表头只匹配一次
+        col_length = grid.row_size(0)
+        head_row = [grid.cell(0, i) for i in range(col_length)]
+        head_match = self.table_header_matcher.match_header(head_row)
         # 遍历表格第一行 (表头) 的元素
         for i in range(col_length):
-            text = head_row[i]
-            # 尝试匹配 table_dict_field_pattern 中的各个模式
-            for (field_name, table_dict_field_pattern) in self.table_dict_field_pattern_dict.items():
-                # 匹配成功
-                if table_dict_field_pattern.is_match_pattern(text) and \
-                        not table_dict_field_pattern.is_match_col_skip_pattern(text):
-                    if field_name not in field_col_dict:
-                        field_col_dict[field_name] = (i, "")
-                        if '%' in text or field_name == 'sharePcntAfterChg':
-                            field_col_dict[field_name] = (i, '%')
-                        if '万' in text:
-                            field_col_dict[field_name] = (i, '万')
-                    # 逐行扫描这个字段的取值，如果满足 row_skip_pattern 则丢弃整行 row
-                    for j in range(1, row_length):
-                        try:
-                            text = table_dict[j][i]
-                            if table_dict_field_pattern.is_match_row_skip_pattern(text):
-                                skip_row_set.add(j)
-                        except KeyError:
-                            pass
+            if len(head_match[i]) == 0:
+                continue
+            # 这一列除表头以外的单元格 (行号, 文本)
+            col_cells = grid.column(i).cells(1, row_length)
+            last_text = col_cells[-1][1] if len(col_cells) > 0 else head_row[i]
+            column_fields = self.table_header_matcher.match_column(head_match[i], head_row[i], last_text)
+            # 匹配成功
+            for field_name, text in column_fields:
+                if field_name not in field_col_dict:
+                    field_col_dict[field_name] = (i, "")
+                    if '%' in text or field_name == 'sharePcntAfterChg':
+                        field_col_dict[field_name] = (i, '%')
+                    if '万' in text:
+                        field_col_dict[field_name] = (i, '万')
+            # 逐行扫描这一列的取值，如果满足任意一个匹配字段的 row_skip_pattern 则丢弃整行 row
+            row_skip_patterns = self.table_header_matcher.row_skip_patterns([x[0] for x in column_fields])
+            if len(row_skip_patterns) > 0:
+                for j, text in col_cells:
+                    for row_skip_pattern in row_skip_patterns:
+                        if row_skip_pattern.search(text):
+                            skip_row_set.add(j)
+                            break
         # 没有扫描到有效的列
         if len(field_col_dict) <= 0:
             return rs
@@ -235,7 +280,7 @@ class ZengJianChiExtractor(object):
             record = ZengJianChiRecord(None, None, None, None, None, None, None)
             for (field_name, col_index) in field_col_dict.items():
                 try:
-                    text = table_dict[row_index][col_index[0]]
+                    text = grid.cell(row_index, col_index[0])
                     text += "" if col_index[1] in text else col_index[1]
                     if field_name == 'shareholderFullName':
                         record.shareholderFullName = self.table_dict_field_pattern_dict.get(field_name).convert(text)
@@ -261,20 +306,23 @@ class ZengJianChiExtractor(object):
         # 返回结果
         return rs
 
-    def extract_from_paragraph(self, paragraph):
+    def extract_from_paragraph(self, tag_res):
         """
         从一个段落中进行抽取
+        tag_res: ner_batch 得到的段落 NERTaggedText，打标签时股东简称词典为空
         """
-        tag_res = self.ner_tagger.ner(paragraph, self.com_abbr_ner_dict)
+        if len(self.com_abbr_ner_dict) > 0:
+            # 之前的段落中抽取到了股东简称，根据词典重新调整
+            tag_res = self.ner_tagger.retag(tag_res, self.com_abbr_ner_dict)
         tagged_str = tag_res.get_tagged_str()
         # 抽取公司简称以及简称
         new_size = self.extract_company_name(tagged_str)
         if new_size > 0:
-            tag_res = self.ner_tagger.ner(paragraph, self.com_abbr_ner_dict)
-            tagged_str = tag_res.get_tagged_str()
+            # 词典有更新时只重新进行词典调整，不再重复调用 pyltp
+            tag_res = self.ner_tagger.retag(tag_res, self.com_abbr_ner_dict)
         # 抽取变动记录，变动后记录
-        change_records = self.extract_change(tagged_str)
-        change_after_records = self.extract_change_after(tagged_str)
+        change_records = self.extract_change(tag_res)
+        change_after_records = self.extract_change_after(tag_res)
         return change_records, change_after_records
 
     def extract_company_name(self, paragraph):
@@ -283,9 +331,7 @@ class ZengJianChiExtractor(object):
         返回增加 com_abbr_ner_dict 中增加的条目数量
         extract_from_paragraph 子例程
         """
-        targets = re.finditer(
-            r'(股东|<org>){1,2}(?P<com>.{1,28}?)(</org>)?[(（].{0,5}?简称:?("|“|<org>)?(?P<com_abbr>.{2,20}?)("|”|</org>)?[)）]',
-            paragraph)
+        targets = self.patterns.CompanyAbbrPattern.finditer(paragraph)
         size_before = len(self.com_abbr_ner_dict)
         for target in targets:
             # 股东简称
@@ -319,57 +365,46 @@ class ZengJianChiExtractor(object):
                 new_name += ch
         return new_name
 
-    def extract_change(self, paragraph):
+    def extract_change(self, tagged_text):
         """
         用于抽取一个段落中的变动数量
+        tagged_text: 段落的 NERTaggedText
         extract_from_paragraph 子例程
         """
         records = []
-        targets = re.finditer(
-            r'(出售|减持|增持|买入)了?[^，。.,:：;!?？（）()“”"<>]*?(股票|股份|(<org>([^.。,，<>]*?)</org>))[^.。,，《》]{0,30}?<num>(?P<share_num>.{1,20}?)</num>股?',
-            paragraph)
-        pat_dates = [k for k in re.finditer(r'<date>(.*?)</date>', paragraph)]
+        paragraph = tagged_text.get_tagged_str()
+        targets = self.patterns.ChangePattern.finditer(paragraph)
         for target in targets:
             # 变动数量
             share_num = target.group("share_num")
             start_pos = target.start()
             end_pos = target.end()
-            # 查找公司
-            pat_com = re.compile(r'<org>(.*?)</org>')
-            m_com = pat_com.findall(paragraph, 0, start_pos)
+            # 查找变动数量之前最后一个公司，没有则查找最后一个人名
+            m_com = tagged_text.last_before('org', start_pos)
+            if m_com is None:
+                m_com = tagged_text.last_before('person', start_pos)
             shareholder = ""
-            if m_com is not None and len(m_com) > 0:
-                shareholder = m_com[-1]
-            else:
-                pat_person = re.compile(r'<person>(.*?)</person>')
-                m_person = pat_person.findall(paragraph, 0, start_pos)
-                if m_person is not None and len(m_person) > 0:
-                    shareholder = m_person[-1]
+            if m_com is not None:
+                shareholder = m_com[2]
             # 没有查找到股东名称
             if shareholder is None or len(shareholder) == 0:
                 continue
             # 归一化公司全称简称
             full_name, short_name = self.get_shareholder(shareholder)
             # 查找日期
-            period_find = re.compile(r'。|(后续)|(不[低高]于)')
-            last_date = None
+            period_find = self.patterns.ChangeDatePeriodPattern
             change_date = ""
-            for pat_date in pat_dates:
-                # 循环至变动数量之前的最后一个时间段名词
-                if pat_date.end() < start_pos:
-                    last_date = pat_date
-                else:
-                    break
+            # 变动数量之前的最后一个时间段名词 (end < start_pos)
+            last_date = tagged_text.last_before('date', start_pos - 1)
             if last_date is not None:
-                tmp_end = last_date.end()
+                tmp_end = last_date[1]
                 # 日期与变动数量之间
                 # 存在句号：说明日期与变动数量很可能没有联系
                 if len(period_find.findall(paragraph, tmp_end, end_pos)) <= 0:
-                    change_date = last_date.group().split('>')[1].split('<')[0]
+                    change_date = last_date[2]
             # 查找变动价格
-            pat_price = re.compile(r'(均价|(平均)?(增持|减持|成交)?(价格|股价))([:：为])?<num>(?P<share_price>.*?)</num>')
-            m_price = pat_price.search(paragraph, start_pos)
-            period_find = re.compile(r'。')
+            m_price = self.patterns.ChangePricePattern.search(paragraph, start_pos)
+            period_find = self.patterns.PeriodPattern
             share_price = ""
             if m_price is not None and len(period_find.findall(paragraph, start_pos, m_price.end())) <= 0:
                 share_price = m_price.group("share_price")
@@ -377,42 +412,37 @@ class ZengJianChiExtractor(object):
             records.append(ZengJianChiRecord(full_name, short_name, change_date, share_price, share_num, "", ""))
         return records
 
-    def extract_change_after(self, paragraph):
+    def extract_change_after(self, tagged_text):
         """
         用于抽取变动后持股数和变动后持股比例
+        tagged_text: 段落的 NERTaggedText
         extract_from_paragraph 子例程
         """
         records = []
-        targets = re.finditer(
-            r'(增持(计划实施)?后|减持(计划实施)?后|变动后)[^。;；]*?持有.{0,30}?<num>(?P<share_num_after>.*?)</num>(股|万股|百万股|亿股)?',
-            paragraph)
+        paragraph = tagged_text.get_tagged_str()
+        targets = self.patterns.ChangeAfterPattern.finditer(paragraph)
         for target in targets:
             share_num_after = target.group("share_num_after")
             start_pos = target.start()
             end_pos = target.end()
-            # 查找公司
-            pat_com = re.compile(r'<org>(.*?)</org>')
-            m_com = pat_com.findall(paragraph, 0, end_pos)
+            # 查找变动后持股数之前最后一个公司，没有则查找最后一个人名
+            m_com = tagged_text.last_before('org', end_pos)
+            if m_com is None:
+                m_com = tagged_text.last_before('person', end_pos)
             shareholder = ""
-            if m_com is not None and len(m_com) > 0:
-                shareholder = m_com[-1]
-            else:
-                pat_person = re.compile(r'<person>(.*?)</person>')
-                m_person = pat_person.findall(paragraph, 0, end_pos)
-                if m_person is not None and len(m_person) > 0:
-                    shareholder = m_person[-1]
+            if m_com is not None:
+                shareholder = m_com[2]
             # 没有查找到股东名称
             if shareholder is None or len(shareholder) == 0:
                 continue
             # 归一化公司全称简称
             full_name, short_name = self.get_shareholder(shareholder)
             # 查找变动后持股比例
-            pat_percent_after = re.compile(r'<percent>(?P<share_percent>.*?)</percent>')
-            m_percent_after = pat_percent_after.search(paragraph, start_pos)
-            period_find = re.compile(r'。')
+            m_percent_after = tagged_text.first_after('percent', start_pos)
+            period_find = self.patterns.PeriodPattern
             share_percent_after = ""
-            if m_percent_after is not None and len(period_find.findall(paragraph, start_pos, m_percent_after.end())) <= 0:
-                share_percent_after = m_percent_after.group("share_percent")
+            if m_percent_after is not None and len(period_find.findall(paragraph, start_pos, m_percent_after[1])) <= 0:
+                share_percent_after = m_percent_after[2]
             # 成功抽取变动后记录
             records.append(ZengJianChiRecord(full_name, short_name, "", "", "", share_num_after, share_percent_after))
         return records
@@ -431,10 +461,8 @@ class ZengJianChiExtractor(object):
 
     def trans(self, record, html_id):
         date = record.finishDate
-        pattern = re.compile(r'(\d\d\d\d)[-.年](\d{1,2})[-.月](\d{1,2})日?')
-        if date is not None and len(date) > 0 and pattern.search(date) is None:
-            pattern_2 = re.compile(r'(\d\d\d\d)[-.年](\d{1,2})[-.月]')
-            if pattern_2.search(date) is not None:
+        if date is not None and len(date) > 0 and self.patterns.FullDatePattern.search(date) is None:
+            if self.patterns.YearMonthPattern.search(date) is not None:
                 try:
                     record.finishDate = self.public_time[html_id.split('.')[0]]
                 except KeyError:
@@ -449,11 +477,20 @@ class ZengJianChiExtractor(object):
         change_records = []
         change_after_records = []
         record_list = []
-        # 对各个段落进行抽取
-        for para in paragraphs:
-            change_records_para, change_after_records_para = self.extract_from_paragraph(para)
-            change_records += change_records_para
-            change_after_records += change_after_records_para
+        # 跳过不含关键词的段落，其余段落保持原有顺序 (股东简称词典按段落顺序累积)
+        self.paragraph_count = len(paragraphs)
+        if self.paragraph_filter is not None:
+            paragraphs = [paragraph for paragraph in paragraphs if self.paragraph_filter.contains_any(paragraph)]
+        self.skipped_paragraph_count = self.paragraph_count - len(paragraphs)
+        Profiler.record('zjc.paragraph_skip', 0.0, self.skipped_paragraph_count)
+        # 批量打标签之后对各个段落进行抽取
+        with Profiler.stage('zjc.ner', len(paragraphs)):
+            tagged_paragraphs = self.ner_tagger.ner_batch(paragraphs, self.com_abbr_ner_dict, self.sentence_window)
+        with Profiler.stage('zjc.paragraph_rules', len(paragraphs)):
+            for tag_res in tagged_paragraphs:
+                change_records_para, change_after_records_para = self.extract_from_paragraph(tag_res)
+                change_records += change_records_para
+                change_after_records += change_after_records_para
         # 保持各条记录中的公司全称一致
         self.sort_and_modify(change_records, change_after_records)
         # 对截止日期相同的记录进行去重
@@ -475,7 +512,7 @@ class ZengJianChiExtractor(object):
     def clear_com_abbr_dict(self):
         self.com_abbr_dict = {}
         self.com_full_dict = {}
-        self.com_abbr_ner_dict = {}
+        self.com_abbr_ner_dict = EntityIndex()
 
     def sort_and_modify(self, records, change_records):
         """
@@ -538,20 +575,23 @@ class ZengJianChiExtractor(object):
     def extract(self, html_file_path, html_id):
         """
         对 html 文件进行解析
+        html_file_path: html 文件路径，或 HTMLParser.parse 得到的 ParsedDocument
         """
+        document = self.html_parser.ensure_document(html_file_path)
+        self.skipped_table_count = document.skipped_table_count
         # 1. 解析 Table Dict
         rs = []
-        paragraphs = self.html_parser.parse_content(html_file_path)
-        rs_paragraphs = self.extract_from_paragraphs(paragraphs, html_id)
-        for table_dict in self.html_parser.parse_table(html_file_path):
-            rs_table = self.extract_from_table_dict(table_dict)
-            if len(rs_table) > 0:
-                # 第二个有效表格一定是增减持之后的数量和占比
-                if len(rs) > 0:
-                    self.merge_record(rs, rs_table)
-                    break
-                else:
-                    rs.extend(rs_table)
+        rs_paragraphs = self.extract_from_paragraphs(document.paragraphs, html_id)
+        with Profiler.stage('zjc.table_rules', len(document.grids)):
+            for table_dict in document.grids:
+                rs_table = self.extract_from_table_dict(table_dict)
+                if len(rs_table) > 0:
+                    # 第二个有效表格一定是增减持之后的数量和占比
+                    if len(rs) > 0:
+                        self.merge_record(rs, rs_table)
+                        break
+                    else:
+                        rs.extend(rs_table)
         # 2. 如果没有 Table Dict 则解析文本部分
         if len(rs) <= 0:
             return rs_paragraphs
@@ -560,9 +600,8 @@ class ZengJianChiExtractor(object):
                 full_company_name, abbr_company_name = self.get_shareholder(record.shareholderFullName)
                 record.shareholderFullName = full_company_name
                 record.shareholderShortName = abbr_company_name
-                price_pattern = re.compile(r'[\d\\.]+')
                 if record.sharePrice is not None:
-                    m_price = price_pattern.findall(record.sharePrice)
+                    m_price = self.patterns.TablePricePattern.findall(record.sharePrice)
                     if m_price is not None:
                         record.sharePrice = '-'.join(m_price)[:-1]
                 self.trans(record, html_id)
@@ -646,7 +685,7 @@ class TableDictFieldPattern(object):
     def get_date_from_text(text):
         str_list = text.split("至")
         if len(str_list) < 2 and ("月" in text or "年" in text or "/" in text or "." in text):
-            str_list = re.split("[-—~]", text)
+            str_list = PatternCatalogue.DateRangeSplitPattern.split(text)
         return str_list[-1]
 
     @staticmethod
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+from utils.KeywordAutomaton import KeywordAutomaton
+
+
+class EntityIndex(object):
+    """
+    实体词典：实体 -> 实体标签
+    内部保存实体的 dict，同时维护一个 Aho-Corasick 自动机，
+    每次新增实体时插入自动机的 trie，供 NERTagger.ner_tag_by_dict 使用
+    自动机不支持删除，因此只提供新增、清空以及只读的访问方法，不提供 dict 的 update、pop、del 等方法
+    """
+
+    def __init__(self, entity_dict=None):
+        self.entities = {}
+        self.automaton = KeywordAutomaton()
+        if entity_dict is not None:
+            for entity, tag in entity_dict.items():
+                self[entity] = tag
+
+    def __len__(self):
+        return len(self.entities)
+
+    def __contains__(self, entity):
+        return entity in self.entities
+
+    def __getitem__(self, entity):
+        return self.entities[entity]
+
+    def __setitem__(self, entity, tag):
+        self.entities[entity] = tag
+        if len(entity) > 0:
+            self.automaton.add(entity)
+
+    def get(self, entity, default=None):
+        return self.entities.get(entity, default)
+
+    def values(self):
+        return self.entities.values()
+
+    def clear(self):
+        self.entities.clear()
+        self.automaton = KeywordAutomaton()
+
+    def split(self, long_entity):
+        """
+        从左到右切分出 long_entity 中包含的已知实体，每个位置取最长的实体
+        返回 [(文本, 标签), ...]，实体以外的部分标签为 'raw'
+        没有包含已知实体时返回 None
+        ner_tag_by_dict 子例程
+        """
+        longest = self.automaton.longest_match_by_start(long_entity)
+        if len(longest) == 0:
+            return None
+        rs = []
+        start, limit = 0, len(long_entity) - 1
+        for pos in sorted(longest):
+            # 与 ner_tag_by_dict 原有逐位置扫描保持一致：最后一个字符不作为实体的起点
+            if pos >= limit:
+                break
+            if pos < start:
+                continue
+            segment = long_entity[pos:pos + longest[pos]]
+            rs.append((long_entity[start:pos], 'raw'))
+            rs.append((segment, self[segment]))
+            start = pos + longest[pos]
+        if len(rs) == 0:
+            return None
+        rs.append((long_entity[start:], 'raw'))
+        return rs
+
+    def longest_token_run(self, entity_list, begin, max_count):
+        """
+        从 entity_list[begin] 开始最多合并 max_count 个相邻分词，
+        返回拼接后属于已知实体的最大分词个数，没有则返回 0
+        ner_tag_by_dict 子例程
+        """
+        automaton = self.automaton
+        state, rs = 0, 0
+        for count, entity in enumerate(entity_list[begin:begin + max_count], 1):
+            state = automaton.walk(state, entity[0])
+            if state is None:
+                break
+            if automaton.terminal[state]:
+                rs = count
+        return rs
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+import os
+import hashlib
+import sqlite3
+import struct
+
+# 模型文件名，模型目录指纹根据这些文件计算
+ModelFileNames = ('cws.model', 'pos.model', 'ner.model')
+# 编码 raw_tags 时各字段之间的分隔符
+FieldSeparator = '\x00'
+# 编码格式：分词个数以及三段文本各自的字节长度
+RawTagsHeader = struct.Struct('<IIII')
+
+
+def model_fingerprint(model_dir_path):
+    """
+    计算模型目录指纹：模型文件名、大小、修改时间的哈希
+    模型文件更新后缓存自动失效
+    """
+    sha = hashlib.sha1()
+    for file_name in ModelFileNames:
+        file_path = os.path.join(model_dir_path, file_name)
+        sha.update(file_name.encode('utf-8'))
+        if os.path.exists(file_path):
+            stat = os.stat(file_path)
+            sha.update(('%d:%d' % (stat.st_size, int(stat.st_mtime))).encode('utf-8'))
+    return sha.digest()
+
+
+def encode_raw_tags(raw_tags):
+    """
+    将 (words, post_tags, ner_tags) 编码为紧凑的二进制格式
+    头部为分词个数以及三段文本的字节长度，之后依次为三段以 \\x00 分隔的 utf-8 文本
+    """
+    words, post_tags, ner_tags = raw_tags
+    fields = [FieldSeparator.join(x).encode('utf-8') for x in (words, post_tags, ner_tags)]
+    return RawTagsHeader.pack(len(words), len(fields[0]), len(fields[1]), len(fields[2])) + b''.join(fields)
+
+
+def decode_raw_tags(data):
+    """
+    encode_raw_tags 的逆过程
+    """
+    count, words_len, post_tags_len, ner_tags_len = RawTagsHeader.unpack_from(data)
+    if count == 0:
+        return [], [], []
+    rs, start = [], RawTagsHeader.size
+    for length in (words_len, post_tags_len, ner_tags_len):
+        rs.append(bytes(data[start:start + length]).decode('utf-8').split(FieldSeparator))
+        start += length
+    return rs[0], rs[1], rs[2]
+
+
+class NERCache(object):
+    """
+    pyltp 分词、词性标注、命名实体识别结果的持久化缓存 (SQLite)
+    键：段落文本与模型目录指纹的哈希
+    值：encode_raw_tags 编码后的 (words, post_tags, ner_tags)
+    写入先缓存在内存中，每 flush_interval 条在一个短事务中批量提交，多个进程可以共用一个缓存文件
+    缓存总字节数超过 max_bytes 时按最近最少使用淘汰
+    """
+
+    def __init__(self, cache_path, fingerprint, max_bytes=1 << 30, flush_interval=1000):
+        self.cache_path = cache_path
+        self.fingerprint = fingerprint
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        # 命中、未命中、淘汰的次数
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # 尚未提交的新条目：key -> value，以及尚未提交的访问时间：key -> last_used
+        self.pending_values = {}
+        self.pending_touches = {}
+        self.conn = sqlite3.connect(cache_path, timeout=60)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS ner_cache '
+                              '(key BLOB PRIMARY KEY, value BLOB NOT NULL, last_used INTEGER NOT NULL)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS ner_cache_last_used ON ner_cache (last_used)')
+        # 当前缓存的总字节数 (估计值)，以及用于 LRU 的逻辑时钟
+        self.total_bytes, self.clock = self.conn.execute(
+            'SELECT COALESCE(SUM(LENGTH(value)), 0), COALESCE(MAX(last_used), 0) FROM ner_cache').fetchone()
+
+    def make_key(self, text):
+        return hashlib.sha1(self.fingerprint + text.encode('utf-8')).digest()
+
+    def get(self, text):
+        """
+        查询缓存，未命中时返回 None
+        """
+        key = self.make_key(text)
+        value = self.pending_values.get(key)
+        if value is None:
+            row = self.conn.execute('SELECT value FROM ner_cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value = row[0]
+            self.clock += 1
+            self.pending_touches[key] = self.clock
+            self.after_write()
+        self.hits += 1
+        return decode_raw_tags(value)
+
+    def put(self, text, raw_tags):
+        """
+        写入缓存
+        """
+        value = encode_raw_tags(raw_tags)
+        self.pending_values[self.make_key(text)] = value
+        self.total_bytes += len(value)
+        self.after_write()
+
+    def after_write(self):
+        if len(self.pending_values) + len(self.pending_touches) >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        在一个事务中提交内存中的新条目和访问时间，超过容量时进行淘汰
+        """
+        if len(self.pending_values) == 0 and len(self.pending_touches) == 0:
+            return
+        with self.conn:
+            self.clock += 1
+            self.conn.executemany('INSERT OR IGNORE INTO ner_cache (key, value, last_used) VALUES (?, ?, ?)',
+                                  [(key, value, self.clock) for key, value in self.pending_values.items()])
+            self.conn.executemany('UPDATE ner_cache SET last_used = ? WHERE key = ?',
+                                  [(last_used, key) for key, last_used in self.pending_touches.items()])
+            self.pending_values = {}
+            self.pending_touches = {}
+            if self.total_bytes > self.max_bytes:
+                self.evict(self.max_bytes * 9 // 10)
+
+    def evict(self, target_bytes):
+        """
+        按 last_used 从旧到新淘汰，直到总字节数不超过 target_bytes
+        flush 子例程，在 flush 的事务中执行
+        """
+        self.total_bytes = self.conn.execute('SELECT COALESCE(SUM(LENGTH(value)), 0) FROM ner_cache').fetchone()[0]
+        evicted_keys = []
+        cursor = self.conn.execute('SELECT key, LENGTH(value) FROM ner_cache ORDER BY last_used')
+        for key, size in cursor:
+            if self.total_bytes <= target_bytes:
+                break
+            evicted_keys.append((key,))
+            self.total_bytes -= size
+        cursor.close()
+        self.conn.executemany('DELETE FROM ner_cache WHERE key = ?', evicted_keys)
+        self.evictions += len(evicted_keys)
+
+    def stats(self):
+        """
+        返回缓存统计信息
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'bytes': self.total_bytes, 'max_bytes': self.max_bytes}
+
+    def close(self):
+        if self.conn is not None:
+            self.flush()
+            self.conn.close()
+            self.conn = None
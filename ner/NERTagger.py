@@ -3,23 +3,94 @@
 
 import os
 import re
-import pyltp
+import array
+import atexit
+import bisect
+import multiprocessing.util
+
+try:
+    import pyltp
+except ImportError:
+    # 没有安装 pyltp 时只能使用规则后端
+    pyltp = None
+
+from ner.EntityIndex import EntityIndex
+from ner.NERCache import NERCache, model_fingerprint
+from ner.RuleTagger import RuleModels
+from utils import Profiler
+
+# 可选的分词、词性标注、命名实体识别后端
+#   'ltp' -- pyltp 及其模型文件
+#   'rule' -- 基于规则和词典的快速后端 (见 RuleTagger)，不需要 pyltp 和模型文件
+TaggerBackends = ('ltp', 'rule')
+
+# 以数字开头的分词
+NumberWordPattern = re.compile("[0-9]+.*")
+# 百分数
+PercentWordPattern = re.compile("[0-9.]+%")
+# 批量进行词性标注、命名实体识别时，不同段落之间插入的分隔词
+BatchSentinelWord = '。'
+# 批量进行词性标注、命名实体识别时，每次调用的分词个数上限
+BatchWordLimit = 10000
+# 句子窗口模式中，窗口以外的文本作为一个分词保留，其词性与命名实体识别标签
+FillerPostTag = 'x'
+FillerNERTag = 'O'
 
 
 class NERTaggedText(object):
+    """
+    打标签之后的段落
+    分词与词性分别保存在两个等长的数组中，词性驻留为 TagNames 中的下标；
+    打标签之后的文本在第一次调用 get_tagged_str 时生成并缓存
+    """
 
-    def __init__(self, text, tagged_seg_list):
+    __slots__ = ('text', 'words', 'tag_ids', 'raw_tags', 'tagged_str', 'entity_spans', 'entity_starts', 'entity_ends')
+
+    # Nh -- person name 人名 实体
+    # Ni -- organization name 组织名 实体
+    # nt -- temporal noun 时间名词
+    # v -- verb 动词
+    # m -- number 数量
+    # q -- quantity 量词
+    valid_tag_set = frozenset(['Nh', 'Ni', 'nt', 'v', 'm', 'q'])
+    tag_entity_dict = {'Nh': 'person', 'Ni': 'org', 'nt': 'date', 'm': 'num', 'mp': 'percent'}
+    # 词性驻留表，所有实例共用：词性 -> 下标，下标 -> 词性，下标 -> 实体类型 (不是实体时为 None)
+    TagIds = {}
+    TagNames = []
+    TagEntityTypes = []
+
+    def __init__(self, text, tagged_seg_list, raw_tags=None):
         self.text = text
-        # 进行词性标注之后的分词列表 (word, tag)
-        self.tagged_seg_list = tagged_seg_list
-        # Nh -- person name 人名 实体
-        # Ni -- organization name 组织名 实体 
-        # nt -- temporal noun 时间名词
-        # v -- verb 动词
-        # m -- number 数量
-        # q -- quantity 量词
-        self.valid_tag_set = {'Nh', 'Ni', 'nt', 'v', 'm', 'q'}
-        self.tag_entity_dict = {'Nh': 'person', 'Ni': 'org', 'nt': 'date', 'm': 'num', 'mp': 'percent'}
+        # 进行词性标注之后的分词列表 (word, tag)，拆分为分词数组与词性下标数组
+        self.words = [word for word, _ in tagged_seg_list]
+        self.tag_ids = array.array('H', [self.intern_tag(tag) for _, tag in tagged_seg_list])
+        # pyltp 的原始输出 (words, post_tags, ner_tags)，供 NERTagger.retag 使用
+        self.raw_tags = raw_tags
+        # get_tagged_str 的结果，以及其中各类实体的位置索引
+        self.tagged_str = None
+        # 实体类型 -> [(start, end, word), ...]，start / end 为 <type>word</type> 在 tagged_str 中的起止位置
+        self.entity_spans = None
+        # 实体类型 -> 各实体的 start 列表 / end 列表，用于二分查找
+        self.entity_starts = None
+        self.entity_ends = None
+
+    @classmethod
+    def intern_tag(cls, tag):
+        """
+        返回词性在驻留表中的下标，新的词性追加到驻留表末尾
+        """
+        tag_id = cls.TagIds.get(tag)
+        if tag_id is None:
+            tag_id = len(cls.TagNames)
+            cls.TagIds[tag] = tag_id
+            cls.TagNames.append(tag)
+            cls.TagEntityTypes.append(cls.tag_entity_dict.get(tag))
+        return tag_id
+
+    @property
+    def tagged_seg_list(self):
+        tag_names = self.TagNames
+        return [(word, tag_names[tag_id]) for word, tag_id in zip(self.words, self.tag_ids)]
 
     def get_tagged_seg_list(self):
         return self.tagged_seg_list
@@ -28,65 +99,266 @@ class NERTaggedText(object):
         """
         筛选之后的具有词性标注的分词列表 (词性需要为 valid_tag_set 中的一种)
         """
+        tag_names = self.TagNames
         rs_list = []
-        for tagged_seg in self.tagged_seg_list:
-            if tagged_seg[1] in self.valid_tag_set:
-                rs_list.append(tagged_seg)
+        for word, tag_id in zip(self.words, self.tag_ids):
+            if tag_names[tag_id] in self.valid_tag_set:
+                rs_list.append((word, tag_names[tag_id]))
         return rs_list
 
     def get_tagged_str(self):
         """
         对于 tagged_seg_list，给词性在 tag_entity_dict 中的单词打上标签
-        然后拼接成文本
+        然后拼接成文本，同时记录各个实体在文本中的位置
         """
-        tagged_str = ""
-        for word, tag in self.tagged_seg_list:
-            if tag in self.tag_entity_dict:
-                tagged_str += "<%s>%s</%s>" % (self.tag_entity_dict[tag], word, self.tag_entity_dict[tag])
+        if self.tagged_str is not None:
+            return self.tagged_str
+        entity_types = self.TagEntityTypes
+        entity_spans = dict((entity_type, []) for entity_type in self.tag_entity_dict.values())
+        parts = []
+        pos = 0
+        for word, tag_id in zip(self.words, self.tag_ids):
+            entity_type = entity_types[tag_id]
+            if entity_type is None:
+                parts.append(word)
+                pos += len(word)
             else:
-                tagged_str += word
-        return tagged_str
+                part = "<%s>%s</%s>" % (entity_type, word, entity_type)
+                parts.append(part)
+                entity_spans[entity_type].append((pos, pos + len(part), word))
+                pos += len(part)
+        self.entity_spans = entity_spans
+        self.entity_starts = dict((entity_type, [span[0] for span in spans]) for entity_type, spans in entity_spans.items())
+        self.entity_ends = dict((entity_type, [span[1] for span in spans]) for entity_type, spans in entity_spans.items())
+        self.tagged_str = ''.join(parts)
+        return self.tagged_str
+
+    def last_before(self, entity_type, pos):
+        """
+        返回 tagged_str 中完全位于 pos 之前 (end <= pos) 的最后一个 entity_type 类型实体 (start, end, word)
+        没有则返回 None
+        """
+        self.get_tagged_str()
+        idx = bisect.bisect_right(self.entity_ends.get(entity_type, []), pos)
+        if idx == 0:
+            return None
+        return self.entity_spans[entity_type][idx - 1]
+
+    def first_after(self, entity_type, pos):
+        """
+        返回 tagged_str 中从 pos 之后开始 (start >= pos) 的第一个 entity_type 类型实体 (start, end, word)
+        没有则返回 None
+        """
+        self.get_tagged_str()
+        starts = self.entity_starts.get(entity_type, [])
+        idx = bisect.bisect_left(starts, pos)
+        if idx == len(starts):
+            return None
+        return self.entity_spans[entity_type][idx]
 
 
 class NERTagger(object):
 
-    def __init__(self, model_dir_path, blacklist_path):
+    def __init__(self, model_dir_path, blacklist_path, cache_path=None, backend='ltp'):
         """
-        model_dir_path: pyltp 模型文件路径
+        model_dir_path: pyltp 模型文件路径，backend 为 'rule' 时不使用
         blacklist_path: 黑名单文件路径
+        cache_path: pyltp 输出缓存文件路径，为 None 时不使用缓存
+        backend: 分词、词性标注、命名实体识别后端，见 TaggerBackends
         """
         # 初始化相关模型文件路径
         self.model_dir_path = model_dir_path
-        self.cws_model_path = os.path.join(self.model_dir_path, 'cws.model')  # 分词模型路径，模型名称为`cws.model`
-        self.pos_model_path = os.path.join(self.model_dir_path, 'pos.model')  # 词性标注模型路径，模型名称为`pos.model`
-        self.ner_model_path = os.path.join(self.model_dir_path, 'ner.model')  # 命名实体识别模型路径，模型名称为`pos.model`
+        # 同一进程内相同模型目录共用一份模型
+        models = get_models(model_dir_path, backend)
+        self.segmentor = models.segmentor
+        self.postagger = models.postagger
+        self.recognizer = models.recognizer
 
-        # 初始化分词模型
-        self.segmentor = pyltp.Segmentor()
-        self.segmentor.load(self.cws_model_path)
+        # 初始化公司名黑名单
+        self.com_blacklist = load_blacklist(blacklist_path)
 
-        # 初始化词性标注模型
-        self.postagger = pyltp.Postagger()
-        self.postagger.load(self.pos_model_path)
+        # 初始化 pyltp 输出缓存
+        self.cache = None
+        if cache_path is not None:
+            self.cache = get_cache(cache_path, model_dir_path, backend)
 
-        # 初始化NER模型
-        self.recognizer = pyltp.NamedEntityRecognizer()
-        self.recognizer.load(self.ner_model_path)
+    def ner(self, text, entity_dict, window=None):
+        """
+        对一个段落打标签
+        window: SentenceWindow，不为 None 时只对关键词附近的句子调用 pyltp，见 analyze_window
+        """
+        if window is not None:
+            return self.tag_by_dict(text, self.analyze_window(text, window), entity_dict)
+        return self.tag_by_dict(text, self.analyze(text), entity_dict)
 
-        # 初始化公司名黑名单
-        self.com_blacklist = set()
-        with open(blacklist_path, 'r', encoding='utf-8') as f_com_blacklist:
-            for line in f_com_blacklist:
-                if len(line.strip()) > 0:
-                    self.com_blacklist.add(line.strip())
+    def analyze(self, text):
+        """
+        调用 pyltp 进行分词、词性标注以及命名实体识别
+        返回 (words, post_tags, ner_tags)，启用缓存时优先从缓存中读取
+        """
+        if self.cache is not None:
+            raw_tags = self.cache.get(text)
+            if raw_tags is not None:
+                Profiler.record('ner.cache_hit', 0.0, len(text))
+                return raw_tags
+        with Profiler.stage('ltp.segment', len(text)):
+            words = list(self.segmentor.segment(text))  # 分词
+        with Profiler.stage('ltp.postag', len(words)):
+            post_tags = list(self.postagger.postag(words))  # 词性标注
+        with Profiler.stage('ltp.recognize', len(words)):
+            ner_tags = list(self.recognizer.recognize(words, post_tags))  # 命名实体识别
+        raw_tags = (words, post_tags, ner_tags)
+        if self.cache is not None:
+            self.cache.put(text, raw_tags)
+        return raw_tags
+
+    def ner_batch(self, texts, entity_dict, window=None, packed=False):
+        """
+        对多个段落 (可以来自不同文档) 打标签，返回 NERTaggedText 列表
+        window: 同 ner
+        packed: 是否将多个段落合并为少数几次词性标注和命名实体识别调用，见 analyze_batch
+            为 False (默认) 时结果与逐个调用 ner 完全相同
+        """
+        if window is not None:
+            raw_tags_list = self.analyze_window_batch(texts, window, packed)
+        else:
+            raw_tags_list = self.analyze_batch(texts, packed)
+        return [self.tag_by_dict(text, raw_tags, entity_dict) for text, raw_tags in zip(texts, raw_tags_list)]
+
+    def analyze_window(self, text, window):
+        """
+        句子窗口模式：只对 window 选中的片段调用 pyltp，其余片段各作为一个分词，
+        词性为 FillerPostTag，不构成实体
+        各分词拼接后仍与 text 相同，因此打标签之后的文本中各实体的位置与对整个段落打标签时的计算方式一致
+        ner 子例程
+        """
+        pieces = window.split(text)
+        return self.join_pieces(pieces, iter([self.analyze(piece) for piece, tagged in pieces if tagged]))
+
+    def analyze_window_batch(self, texts, window, packed=False):
+        """
+        analyze_window 的批量版本，所有段落中选中的片段一起调用 analyze_batch
+        ner_batch 子例程
+        """
+        pieces_list = [window.split(text) for text in texts]
+        analyzed = iter(self.analyze_batch([piece for pieces in pieces_list for piece, tagged in pieces if tagged],
+                                           packed))
+        return [self.join_pieces(pieces, analyzed) for pieces in pieces_list]
+
+    @staticmethod
+    def join_pieces(pieces, analyzed):
+        """
+        按顺序拼接各片段的 (words, post_tags, ner_tags)
+        pieces: SentenceWindow.split 的结果
+        analyzed: 依次给出打标签的片段的 pyltp 输出
+        analyze_window, analyze_window_batch 子例程
+        """
+        words, post_tags, ner_tags = [], [], []
+        for piece, tagged in pieces:
+            if tagged:
+                piece_words, piece_post_tags, piece_ner_tags = next(analyzed)
+                words += piece_words
+                post_tags += piece_post_tags
+                ner_tags += piece_ner_tags
+            else:
+                Profiler.record('ner.window_filler', 0.0, len(piece))
+                words.append(piece)
+                post_tags.append(FillerPostTag)
+                ner_tags.append(FillerNERTag)
+        return words, post_tags, ner_tags
+
+    def analyze_batch(self, texts, packed=False):
+        """
+        批量调用 pyltp，返回与 texts 一一对应的 (words, post_tags, ner_tags) 列表
+        packed 为 False 时逐个调用 analyze；
+        为 True 时每个段落单独分词，以保证分词结果与段落边界一致，之后将多个段落的分词以 BatchSentinelWord
+        分隔拼接起来，一次完成词性标注和命名实体识别，再按分词个数拆分
+        pyltp 的词性标注和命名实体识别会参考相邻的分词，因此合并调用的结果 (词性以及段落内部的实体)
+        可能与单独调用 analyze 不同，并且取决于同一批中的其他段落；这种结果不写入缓存
+        ner_batch 子例程
+        """
+        if not packed:
+            return [self.analyze(text) for text in texts]
+        rs = [None] * len(texts)
+        pending = []
+        for idx, text in enumerate(texts):
+            if self.cache is not None:
+                rs[idx] = self.cache.get(text)
+            if rs[idx] is None:
+                with Profiler.stage('ltp.segment', len(text)):
+                    pending.append((idx, list(self.segmentor.segment(text))))  # 分词
+            else:
+                Profiler.record('ner.cache_hit', 0.0, len(text))
+        start = 0
+        while start < len(pending):
+            # 每批的分词个数不超过 BatchWordLimit，至少包含一个段落
+            end, word_count = start + 1, len(pending[start][1])
+            while end < len(pending) and word_count + len(pending[end][1]) + 1 <= BatchWordLimit:
+                word_count += len(pending[end][1]) + 1
+                end += 1
+            self.analyze_packed(texts, pending[start:end], rs)
+            start = end
+        return rs
 
-    def ner(self, text, entity_dict):
-        words = self.segmentor.segment(text)  # 分词
-        post_tags = self.postagger.postag(words)  # 词性标注
-        ner_tags = self.recognizer.recognize(words, post_tags)  # 命名实体识别
-        entity_list = self.construct_entity_list(words, post_tags, ner_tags)
-        entity_list = self.ner_tag_by_dict(entity_dict, entity_list)
-        return NERTaggedText(text, entity_list)
+    def analyze_packed(self, texts, segmented, rs):
+        """
+        对一批已经分词的段落进行词性标注以及命名实体识别，结果写入 rs
+        实体跨越段落边界时，该段落退回单独调用 analyze；合并调用的结果依赖于同一批中的其他段落，不写入缓存
+        segmented: [(段落下标, words), ...]
+        analyze_batch 子例程
+        """
+        packed_words = []
+        for idx, words in segmented:
+            if len(packed_words) > 0:
+                packed_words.append(BatchSentinelWord)
+            packed_words += words
+        with Profiler.stage('ltp.postag', len(packed_words)):
+            packed_post_tags = list(self.postagger.postag(packed_words))  # 词性标注
+        with Profiler.stage('ltp.recognize', len(packed_words)):
+            packed_ner_tags = list(self.recognizer.recognize(packed_words, packed_post_tags))  # 命名实体识别
+        start = 0
+        for idx, words in segmented:
+            end = start + len(words)
+            post_tags = packed_post_tags[start:end]
+            ner_tags = packed_ner_tags[start:end]
+            if self.is_packed_boundary_safe(packed_ner_tags, start, end):
+                rs[idx] = (words, post_tags, ner_tags)
+            else:
+                rs[idx] = self.analyze(texts[idx])
+            start = end + 1
+
+    @staticmethod
+    def is_packed_boundary_safe(packed_ner_tags, start, end):
+        """
+        判断 [start, end) 范围内的命名实体是否完整，且两侧的分隔词不属于任何实体
+        analyze_packed 子例程
+        """
+        if start > 0 and packed_ner_tags[start - 1] != 'O':
+            return False
+        if end < len(packed_ner_tags) and packed_ner_tags[end] != 'O':
+            return False
+        if start < end and (packed_ner_tags[start][0] in 'IE' or packed_ner_tags[end - 1][0] in 'BI'):
+            return False
+        return True
+
+    def retag(self, tagged_text, entity_dict):
+        """
+        entity_dict 更新后重新打标签
+        复用 tagged_text 中保存的分词、词性标注以及命名实体识别结果，只重新进行词典调整，
+        结果与重新调用 ner 相同
+        """
+        return self.tag_by_dict(tagged_text.text, tagged_text.raw_tags, entity_dict)
+
+    def tag_by_dict(self, text, raw_tags, entity_dict):
+        """
+        根据 pyltp 的原始输出构造实体列表，并根据 entity_dict 进行调整
+        ner, retag 子例程
+        """
+        words, post_tags, ner_tags = raw_tags
+        with Profiler.stage('ner.tag_by_dict', len(text)):
+            entity_list = self.construct_entity_list(words, post_tags, ner_tags)
+            entity_list = self.ner_tag_by_dict(entity_dict, entity_list)
+        return NERTaggedText(text, entity_list, raw_tags)
 
     def construct_entity_list(self, words, post_tags, ner_tags):
         entity_list = []
@@ -125,91 +397,186 @@ class NERTagger(object):
                         entity_list.append((entity, 'nt'))
                         entity = ""
                     # 排除错误数字识别，例如“大宗”
-                    if post_tag == 'm' and not re.match("[0-9]+.*", word):
+                    if post_tag == 'm' and not NumberWordPattern.match(word):
                         post_tag = 'n'
                     # 识别数字中的百分数
-                    if post_tag == 'm' and re.match("[0-9.]+%", word):
+                    if post_tag == 'm' and PercentWordPattern.match(word):
                         post_tag = 'mp'
                     entity_list.append((word, post_tag))
         return entity_list
 
     def ner_tag_by_dict(self, entity_dict, entity_list):
+        """
+        根据 entity_dict 调整 entity_list 中的实体
+        entity_dict 为 EntityIndex 时直接使用其中的自动机，否则临时构建一个
+        """
+        if len(entity_dict) == 0:
+            return entity_list
+        if not isinstance(entity_dict, EntityIndex):
+            entity_dict = EntityIndex(entity_dict)
         # 检测单个分词标注中，是否包含多个已知的实体，有则提取出来
-        legal_tag = entity_dict.values()
+        legal_tag = set(entity_dict.values())
         j = 0
-        limit = len(entity_list)
-        while j < limit:
-            if entity_list[j][1] in legal_tag:
-                long_entity = entity_list[j][0]
-                if long_entity in entity_dict:
+        while j < len(entity_list):
+            long_entity, tag = entity_list[j]
+            if tag not in legal_tag or long_entity in entity_dict:
+                j += 1
+                continue
+            new_entity = entity_dict.split(long_entity)
+            if new_entity is None:
+                j += 1
+                continue
+            del entity_list[j]
+            for cut in new_entity:
+                if cut[1] in legal_tag:
+                    entity_list.insert(j, cut)
                     j += 1
-                    continue
-                else:
-                    k = 0
-                    new_entity = []
-                    while k < len(long_entity) - 1:
-                        has_entity = False
-                        for entity_len in range(len(long_entity) - k, 0, -1):
-                            segment = long_entity[k:k + entity_len]
-                            if segment in entity_dict:
-                                has_entity = True
-                                new_entity.append((long_entity[0:k], 'raw'))
-                                new_entity.append((segment, entity_dict[segment]))
-                                long_entity = long_entity[k + entity_len:]
-                                k = 0
-                                break
-                        if not has_entity:
-                            k += 1
-                    if len(new_entity) == 0:
+                elif len(cut[0]) > 0:
+                    words, post_tags, ner_tags = self.analyze(cut[0])
+                    for entity in self.construct_entity_list(words, post_tags, ner_tags):
+                        entity_list.insert(j, entity)
                         j += 1
-                        continue
-                    new_entity.append((long_entity, 'raw'))
-                    del entity_list[j]
-                    for cut in new_entity:
-                        if cut[1] in legal_tag:
-                            entity_list.insert(j, cut)
-                            j += 1
-                        else:
-                            words = self.segmentor.segment(cut[0])
-                            post_tags = self.postagger.postag(words)
-                            ner_tags = self.recognizer.recognize(words, post_tags)
-                            for entity in self.construct_entity_list(words, post_tags, ner_tags):
-                                entity_list.insert(j, entity)
-                                j += 1
-                    limit = len(entity_list)
-                    continue
-            j += 1
-
-        # 尝试将相邻的分词合并，检测是否在 entity_dict 中
+
+        # 尝试将 2 到 4 个相邻的分词合并，检测是否在 entity_dict 中
         i = 0
         while i < len(entity_list) - 1:
-            has_entity = False
-            for entity_len in range(4, 1, -1):
+            entity_len = entity_dict.longest_token_run(entity_list, i, 4)
+            if entity_len >= 2:
                 segment = "".join([x[0] for x in entity_list[i: i + entity_len]])
-                # 将 2 到 4 个相邻的分词合并
-                segment_uni = segment
-                if segment_uni in entity_dict:
-                    has_entity = True
-                    entity_list[i] = (segment, entity_dict[segment_uni])
-                    del entity_list[i + 1: i + entity_len]
-                    i = i + entity_len
-                    break
-            if not has_entity:
+                entity_list[i] = (segment, entity_dict[segment])
+                del entity_list[i + 1: i + entity_len]
+                i = i + entity_len
+            else:
                 i += 1
         return entity_list
 
-    def __del__(self):
+
+
+class LTPModels(object):
+    """
+    pyltp 的分词、词性标注、命名实体识别模型
+    通过 get_models 获取，同一进程内每个模型目录只加载一次
+    """
+
+    def __init__(self, model_dir_path):
+        if pyltp is None:
+            raise ImportError('pyltp is not installed, use the "rule" tagger backend instead')
+        self.model_dir_path = model_dir_path
+        self.cws_model_path = os.path.join(model_dir_path, 'cws.model')  # 分词模型路径，模型名称为`cws.model`
+        self.pos_model_path = os.path.join(model_dir_path, 'pos.model')  # 词性标注模型路径，模型名称为`pos.model`
+        self.ner_model_path = os.path.join(model_dir_path, 'ner.model')  # 命名实体识别模型路径，模型名称为`ner.model`
+
+        # 初始化分词模型
+        self.segmentor = pyltp.Segmentor()
+        self.segmentor.load(self.cws_model_path)
+
+        # 初始化词性标注模型
+        self.postagger = pyltp.Postagger()
+        self.postagger.load(self.pos_model_path)
+
+        # 初始化NER模型
+        self.recognizer = pyltp.NamedEntityRecognizer()
+        self.recognizer.load(self.ner_model_path)
+
+    def release(self):
         self.segmentor.release()
         self.postagger.release()
         self.recognizer.release()
 
 
+# 进程内共享的模型、黑名单、缓存以及 NERTagger
+# 键均为规范化之后的文件路径
+_models = {}
+_blacklists = {}
+_caches = {}
+_taggers = {}
+# 已经注册退出时释放资源的进程号
+_release_registered_pid = None
+
+
+def get_models(model_dir_path, backend='ltp'):
+    """
+    获取后端模型：'ltp' 返回模型目录对应的 LTPModels，第一次获取时加载模型；'rule' 返回共享的 RuleModels
+    """
+    if backend not in TaggerBackends:
+        raise ValueError('unknown tagger backend: %s' % backend)
+    key = (backend, None if backend == 'rule' else os.path.abspath(model_dir_path))
+    if key not in _models:
+        register_release()
+        _models[key] = RuleModels() if backend == 'rule' else LTPModels(model_dir_path)
+    return _models[key]
+
+
+def load_blacklist(blacklist_path):
+    """
+    读取公司名黑名单，同一个文件只读取一次
+    """
+    key = os.path.abspath(blacklist_path)
+    if key not in _blacklists:
+        com_blacklist = set()
+        with open(blacklist_path, 'r', encoding='utf-8') as f_com_blacklist:
+            for line in f_com_blacklist:
+                if len(line.strip()) > 0:
+                    com_blacklist.add(line.strip())
+        _blacklists[key] = frozenset(com_blacklist)
+    return _blacklists[key]
+
+
+def get_cache(cache_path, model_dir_path, backend='ltp'):
+    """
+    获取 pyltp 输出缓存，同一个缓存文件只打开一次
+    缓存以模型指纹区分后端与模型版本，指纹不同时原有缓存失效
+    """
+    key = os.path.abspath(cache_path)
+    if key not in _caches:
+        register_release()
+        fingerprint = RuleModels.fingerprint if backend == 'rule' else model_fingerprint(model_dir_path)
+        _caches[key] = NERCache(cache_path, fingerprint)
+    return _caches[key]
+
+
+def get_tagger(model_dir_path, blacklist_path, cache_path=None, backend='ltp'):
+    """
+    获取共享的 NERTagger
+    后端、模型目录、黑名单、缓存文件都相同时返回同一个对象
+    """
+    key = (backend, None if backend == 'rule' else os.path.abspath(model_dir_path), os.path.abspath(blacklist_path),
+           None if cache_path is None else os.path.abspath(cache_path))
+    if key not in _taggers:
+        _taggers[key] = NERTagger(model_dir_path, blacklist_path, cache_path, backend)
+    return _taggers[key]
+
+
+def release_all():
+    """
+    提交缓存并释放所有模型，进程退出时自动调用，可以重复调用
+    释放之后再获取 NERTagger 会重新加载模型
+    """
+    _taggers.clear()
+    while len(_caches) > 0:
+        _caches.popitem()[1].close()
+    while len(_models) > 0:
+        _models.popitem()[1].release()
+
+
+def register_release():
+    """
+    注册进程退出时调用 release_all
+    multiprocessing 的 worker 进程退出时不执行 atexit，因此同时注册 multiprocessing 的退出回调
+    """
+    global _release_registered_pid
+    if _release_registered_pid != os.getpid():
+        _release_registered_pid = os.getpid()
+        atexit.register(release_all)
+        multiprocessing.util.Finalize(None, release_all, exitpriority=10)
+
+
 if __name__ == "__main__":
     text = "2018年4月25日，公司收到证券公司的通知：证券公司已于2018年4 月25日处置了钟波先生质押标的证券，违约处置数量为90.3万股，成交金额779.4482万元，平均成交价8.632元/股。本次减持前，钟波先生持有公司股份1000万股，占公司总股本的2.77%。本次减持后，钟波先生持有公司股份909.7万股，占公司总股本的2.52%。"
     # text = "2018年4月25日，公司收到证券公司的通知：证券公司已于2018年4 月25日处置了钟波先生质押标的证券，违约处置数量为90.3万股，成交金额779.4482万元，平均成交价8.632元/股。本次减持前，钟波先生持有公司股份1000万股，占公司总股本的2.77%。本次减持后，钟波先生持有公司股份909.7万股，占公司总股本的2.52%。"
     # text = "2018年4月24日、4月25日，公司实际控制人之一黄盛秋先生因股票质押违约，被证券公司强行平仓247.65万股。2018年4月25日，公司实际控制人之一钟波先生因股票质押违约，被证券公司强行平仓90.3万股。上述二人合计被强行平仓337.95万股，占公司总股本的0.94%，根据相关规定，公司实际控制人以集中竞价方式减持公司股份在任意连续九十个自然日内，减持股份的总数不得超过公司股份总数的百分之一即361.43万股。"
     # text = '中华人民共和国中央人民政府于1949年10月1日在伟大首都北京成立了'
-    ner_tagger = NERTagger("../../ltp_data_v3.4.0", "../config/ner_com_blacklist.txt")
+    ner_tagger = get_tagger("../../ltp_data_v3.4.0", "../config/ner_com_blacklist.txt")
 
     res = ner_tagger.ner(text, {"券": "Ni"})
     for ent in res.get_tagged_seg_list():
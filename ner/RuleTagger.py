@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+import re
+
+# 规则后端的版本，规则变化时修改，使 pyltp 输出缓存中的旧结果失效
+RuleVersion = 1
+
+# 公司名后缀，可以连续出现，例如 "集团" + "有限公司"
+CompanySuffixes = ('股份有限公司', '有限责任公司', '有限公司', '集团公司', '集团', '（有限合伙）', '(有限合伙)', '合伙企业',
+                   '银行', '事务所')
+CompanySuffixPattern = re.compile('(?:%s)+' % '|'.join(re.escape(suffix) for suffix in
+                                                        sorted(CompanySuffixes, key=len, reverse=True)))
+CompanySuffixEndPattern = re.compile('(?:%s)$' % '|'.join(re.escape(suffix) for suffix in CompanySuffixes))
+# 公司名 (不含后缀) 最长字数
+CompanyNameMaxLength = 30
+# 公司名不会跨越的字符与词：标点、空白，以及常出现在公司名之前的词
+CompanyBoundaryPattern = re.compile(
+    r'[\s\S]*(?:[^一-鿿A-Za-z0-9（）()]|股东|对象|公司|收到|接到|持有|通知|与|和|及|向|由|经|为|的|于|在|是|被|将|对|从)')
+# 人名：常见姓氏 + 一到两个字，后面是称谓
+PersonSurnames = '王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈姚卢姜崔钟谭陆汪范金石廖贾夏韦付方白邹孟熊秦邱江尹薛闫段雷侯龙史陶黎贺顾毛郝龚邵万钱严覃武戴莫孔向汤'
+PersonPattern = re.compile('[%s][一-鿿]{1,2}(?=先生|女士|同志)' % PersonSurnames)
+# 其余文本的分词，每个命名分组对应一种词性
+TokenPattern = re.compile(
+    r'(?P<nt>\d{4}年\d{1,2}月\d{1,2}日|\d{4}年\d{1,2}月|\d{1,2}月\d{1,2}日|\d{4}年|\d{4}-\d{1,2}-\d{1,2})'
+    r'|(?P<m>\d+(?:\.\d+)?(?:%|％|万|亿)?)'
+    r'|(?P<ws>[A-Za-z]+)'
+    r'|(?P<n>[一-鿿])'
+    r'|(?P<wp>[\s\S])')
+
+
+def find_entities(text):
+    """
+    返回文本中的公司名、人名 [(start, end, 实体类型), ...]，按位置排序且互不重叠
+    公司名由后缀向前扩展到最近的边界
+    """
+    rs = []
+    last_end = 0
+    for match in CompanySuffixPattern.finditer(text):
+        lower = max(last_end, match.start() - CompanyNameMaxLength)
+        boundary = CompanyBoundaryPattern.match(text, lower, match.start())
+        start = lower if boundary is None else boundary.end()
+        if match.start() - start >= 2:
+            rs.append((start, match.end(), 'Ni'))
+            last_end = match.end()
+    persons = [(match.start(), match.end(), 'Nh') for match in PersonPattern.finditer(text)]
+    if len(persons) > 0:
+        for start, end, entity_type in persons:
+            if all(end <= org_start or start >= org_end for org_start, org_end, _ in rs):
+                rs.append((start, end, entity_type))
+        rs.sort()
+    return rs
+
+
+def tag_word(word):
+    """
+    返回 RuleSegmentor 分出的词的 (词性, 命名实体识别标签)
+    除公司名、人名以外的词都能被 TokenPattern 完整匹配，词性即匹配的分组名
+    """
+    match = TokenPattern.fullmatch(word)
+    if match is not None:
+        return match.lastgroup, 'O'
+    if CompanySuffixEndPattern.search(word) is not None:
+        return 'n', 'S-Ni'
+    return 'n', 'S-Nh'
+
+
+class RuleSegmentor(object):
+    """
+    基于规则的分词：公司名、人名、日期、数字各为一个词，其余汉字逐字切分
+    """
+
+    def segment(self, text):
+        words = []
+        pos = 0
+        for start, end, _ in find_entities(text):
+            words += [match.group() for match in TokenPattern.finditer(text, pos, start)]
+            words.append(text[start:end])
+            pos = end
+        words += [match.group() for match in TokenPattern.finditer(text, pos)]
+        return words
+
+    def release(self):
+        pass
+
+
+class RulePostagger(object):
+
+    def postag(self, words):
+        return [tag_word(word)[0] for word in words]
+
+    def release(self):
+        pass
+
+
+class RuleRecognizer(object):
+
+    def recognize(self, words, post_tags):
+        return [tag_word(word)[1] for word in words]
+
+    def release(self):
+        pass
+
+
+class RuleModels(object):
+    """
+    不依赖 pyltp 及模型文件的规则后端，接口与 NERTagger.LTPModels 相同
+    正则识别日期、数字、百分数，公司名后缀词典识别机构名 (Ni)，姓氏 + 称谓识别人名 (Nh)
+    结果是确定的，速度远快于 pyltp，但准确率较低，适用于不要求模型质量的场合
+    """
+
+    # 代替模型目录指纹，区分 pyltp 输出缓存
+    fingerprint = ('rule-tagger:%d' % RuleVersion).encode('utf-8')
+
+    def __init__(self):
+        self.segmentor = RuleSegmentor()
+        self.postagger = RulePostagger()
+        self.recognizer = RuleRecognizer()
+
+    def release(self):
+        self.segmentor.release()
+        self.postagger.release()
+        self.recognizer.release()
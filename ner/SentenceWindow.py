@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+import bisect
+import re
+
+try:
+    import pyltp
+except ImportError:
+    pyltp = None
+
+from utils.KeywordAutomaton import KeywordAutomaton
+
+# 没有 pyltp 时按句末标点分句：连续的句末标点以及其后的右引号、右括号属于前一句
+SentenceEndPattern = re.compile(r'[。！？!?；;]+[”’"）)]*')
+
+
+def split_sentences(text):
+    """
+    分句，返回的各句按顺序拼接后与 text 完全相同
+    优先使用 pyltp 的 SentenceSplitter，其结果不能还原 text 时 (例如丢弃了空白符) 按句末标点分句
+    """
+    if pyltp is not None:
+        sentences = list(pyltp.SentenceSplitter.split(text))
+        if ''.join(sentences) == text:
+            return sentences
+    rs = []
+    pos = 0
+    for match in SentenceEndPattern.finditer(text):
+        rs.append(text[pos:match.end()])
+        pos = match.end()
+    if pos < len(text):
+        rs.append(text[pos:])
+    return rs
+
+
+class SentenceWindow(object):
+    """
+    句子窗口：段落中含有关键词的句子及其前后 size 个句子需要打标签，其余句子不打标签
+    供 NERTagger.ner / ner_batch 使用，长段落只对关键词附近的句子调用 pyltp
+    """
+
+    def __init__(self, keywords, size=1):
+        """
+        keywords: 关键词列表，或已经构建好的 KeywordAutomaton
+        size: 关键词所在句子前后各打标签的句子数
+        """
+        if size < 0:
+            raise ValueError('sentence window size must not be negative: %d' % size)
+        self.automaton = keywords if isinstance(keywords, KeywordAutomaton) else KeywordAutomaton(keywords)
+        self.size = size
+
+    def split(self, text):
+        """
+        将 text 切分为 [(片段, 是否打标签), ...]
+        相邻的句子标记相同时合并为一个片段，各片段按顺序拼接后与 text 完全相同
+        """
+        sentences = split_sentences(text)
+        # 各句在 text 中的结束位置
+        ends = []
+        pos = 0
+        for sentence in sentences:
+            pos += len(sentence)
+            ends.append(pos)
+        selected = [False] * len(sentences)
+        for start, _ in self.automaton.iter_matches(text):
+            idx = bisect.bisect_right(ends, start)
+            for i in range(max(0, idx - self.size), min(len(sentences), idx + self.size + 1)):
+                selected[i] = True
+        rs = []
+        start = 0
+        for idx in range(len(sentences)):
+            if idx + 1 == len(sentences) or selected[idx + 1] != selected[idx]:
+                rs.append((text[start:ends[idx]], selected[idx]))
+                start = ends[idx]
+        return rs
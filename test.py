@@ -9,7 +9,7 @@ if __name__ == '__main__':
     
     ner_model_dir_path = 'E:/WorkBench/Courses/Big-Data/Proj2-Finance/ltp_data_v3.4.0'
     ner_blacklist_file_path = 'config/ner_com_blacklist.txt'
-    ner_tagger = NERTagger.NERTagger(ner_model_dir_path, ner_blacklist_file_path)
+    ner_tagger = NERTagger.get_tagger(ner_model_dir_path, ner_blacklist_file_path)
     
     paragraphs = html_parser.parse_content(html_file_path)
     for paragraph in paragraphs:
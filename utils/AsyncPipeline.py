@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import concurrent.futures
+import time
+
+# 流水线的各个阶段，依次为：读取文件、解析 html、抽取 (NER 及正则)、写入结果
+PipelineStages = ('read', 'parse', 'extract', 'write')
+# 输入结束的标记
+_end = object()
+
+
+def read_file(path):
+    """
+    读取文件的全部内容 (bytes)，read 阶段的默认实现
+    """
+    with open(path, 'rb') as fp:
+        return fp.read()
+
+
+def timed_call(function, doc_id, value):
+    """
+    在 executor 中执行 function(doc_id, value)，返回 (结果, 耗时)
+    """
+    start = time.perf_counter()
+    rs = function(doc_id, value)
+    return rs, time.perf_counter() - start
+
+
+class StageMetrics(object):
+    """
+    一个阶段的统计
+    items / seconds: 完成的文档数以及在 executor 中的耗时
+    队列深度为该阶段输出队列中等待下一阶段取走的文档数 (包括仍在 executor 中处理的文档)，
+    每次向队列中放入文档时采样；full_waits 为放入时队列已满、需要等待下一阶段的次数 (反压)
+    """
+
+    __slots__ = ('name', 'items', 'seconds', 'depth_samples', 'depth_total', 'depth_max', 'full_waits')
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.seconds = 0.0
+        self.depth_samples = 0
+        self.depth_total = 0
+        self.depth_max = 0
+        self.full_waits = 0
+
+    def sample_depth(self, depth):
+        self.depth_samples += 1
+        self.depth_total += depth
+        if depth > self.depth_max:
+            self.depth_max = depth
+
+    def to_dict(self):
+        return {
+            'items': self.items,
+            'seconds': self.seconds,
+            'queue_depth_mean': self.depth_total / self.depth_samples if self.depth_samples > 0 else 0.0,
+            'queue_depth_max': self.depth_max,
+            'full_waits': self.full_waits,
+        }
+
+
+class AsyncPipeline(object):
+    """
+    基于 asyncio 的文档流水线：read -> parse -> extract -> write
+    每个阶段是一个协程，阶段之间以有界队列 (asyncio.Queue) 连接，队列满时上一阶段等待，
+    内存中同时存在的文档数不超过各队列长度之和加上各 executor 中正在处理的文档数
+    各阶段的函数在 executor 中执行，事件循环只负责调度：文件读取与 html 解析可以和 NER 重叠
+    队列中传递的是上一阶段的 future，各阶段按输入顺序依次等待，因此文档的处理顺序、写入顺序与输入顺序相同
+    用于任意抽取器，例如：
+        AsyncPipeline(parse=lambda html_id, data: parser.parse(data),
+                      extract=lambda html_id, document: dz_ex.extract(document),
+                      write=lambda html_id, records: ...).run(html_paths)
+    """
+
+    def __init__(self, parse, extract, write, read=None, queue_size=8, read_executor=None, parse_executor=None,
+                 extract_executor=None, write_executor=None):
+        """
+        read: read(doc_id) -> 文件内容，为 None 时将 doc_id 作为文件路径读取
+        parse: parse(doc_id, 文件内容) -> 解析结果
+        extract: extract(doc_id, 解析结果) -> 抽取结果
+        write: write(doc_id, 抽取结果)，返回值被忽略
+        queue_size: 各阶段之间的队列长度
+        *_executor: 各阶段使用的 concurrent.futures.Executor，为 None 时使用单线程的 ThreadPoolExecutor
+            抽取器与结果文件都有状态，extract / write 阶段的 executor 只能有一个线程 (默认值)；
+            parse 阶段可以使用多个线程或 ProcessPoolExecutor (此时 parse 必须可以 pickle)
+        """
+        self.functions = {
+            'read': (lambda doc_id, _: read_file(doc_id)) if read is None else (lambda doc_id, _: read(doc_id)),
+            'parse': parse,
+            'extract': extract,
+            'write': write,
+        }
+        self.queue_size = queue_size
+        self.executors = {'read': read_executor, 'parse': parse_executor, 'extract': extract_executor,
+                          'write': write_executor}
+        self.metrics = dict((name, StageMetrics(name)) for name in PipelineStages)
+        self.seconds = 0.0
+
+    def run(self, doc_ids):
+        """
+        处理 doc_ids 中的所有文档，返回处理的文档数
+        任意阶段抛出异常时停止流水线，异常由 run 抛出
+        """
+        loop = asyncio.new_event_loop()
+        owned_executors = []
+        executors = dict(self.executors)
+        for name in PipelineStages:
+            if executors[name] is None:
+                executors[name] = concurrent.futures.ThreadPoolExecutor(1)
+                owned_executors.append(executors[name])
+        try:
+            return loop.run_until_complete(self.run_async(doc_ids, executors))
+        finally:
+            loop.close()
+            for executor in owned_executors:
+                executor.shutdown()
+
+    async def run_async(self, doc_ids, executors):
+        """
+        run 子例程
+        """
+        start = time.perf_counter()
+        queues = [asyncio.Queue(self.queue_size) for _ in range(len(PipelineStages) + 1)]
+        tasks = [asyncio.ensure_future(self.feed(doc_ids, queues[0]))]
+        for idx, name in enumerate(PipelineStages):
+            tasks.append(asyncio.ensure_future(self.run_stage(idx, executors[name], queues[idx], queues[idx + 1])))
+        sink = asyncio.ensure_future(self.drain(queues[-1]))
+        tasks.append(sink)
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            self.seconds += time.perf_counter() - start
+        return sink.result()
+
+    async def feed(self, doc_ids, queue):
+        """
+        将 doc_ids 放入第一个队列，read 阶段的输入为 doc_id 本身
+        """
+        for doc_id in doc_ids:
+            future = asyncio.get_event_loop().create_future()
+            future.set_result((None, 0.0))
+            await queue.put((doc_id, future))
+        await queue.put(_end)
+
+    async def put(self, metrics, queue, item):
+        if queue.full():
+            metrics.full_waits += 1
+        await queue.put(item)
+        metrics.sample_depth(queue.qsize())
+
+    async def run_stage(self, idx, executor, input_queue, output_queue):
+        """
+        第 idx 个阶段：依次取出上一阶段的 future，等待其完成后将本阶段的处理提交到 executor，
+        本阶段的 future 放入输出队列，不等待其完成
+        """
+        loop = asyncio.get_event_loop()
+        name = PipelineStages[idx]
+        function = self.functions[name]
+        # 上一阶段的统计在其 future 完成时累加
+        previous_metrics = self.metrics[PipelineStages[idx - 1]] if idx > 0 else None
+        metrics = self.metrics[name]
+        while True:
+            item = await input_queue.get()
+            if item is _end:
+                await output_queue.put(_end)
+                return
+            doc_id, future = item
+            value, seconds = await future
+            if previous_metrics is not None:
+                previous_metrics.items += 1
+                previous_metrics.seconds += seconds
+            await self.put(metrics, output_queue, (doc_id, loop.run_in_executor(executor, timed_call, function,
+                                                                                doc_id, value)))
+
+    async def drain(self, queue):
+        """
+        等待 write 阶段依次完成，返回处理的文档数
+        """
+        metrics = self.metrics['write']
+        count = 0
+        while True:
+            item = await queue.get()
+            if item is _end:
+                return count
+            _, seconds = await item[1]
+            metrics.items += 1
+            metrics.seconds += seconds
+            count += 1
+
+    def stats(self):
+        """
+        返回各阶段的统计 {阶段名: StageMetrics.to_dict()}
+        """
+        return dict((name, metrics.to_dict()) for name, metrics in self.metrics.items())
+
+    def summary(self):
+        """
+        返回统计结果的文本
+        """
+        lines = ['pipeline seconds: %.3f, queue size: %d' % (self.seconds, self.queue_size),
+                 '%-10s %8s %10s %12s %10s %10s' % ('stage', 'items', 'seconds', 'depth mean', 'depth max',
+                                                    'full waits')]
+        for name in PipelineStages:
+            stat = self.metrics[name].to_dict()
+            lines.append('%-10s %8d %10.3f %12.2f %10d %10d' % (name, stat['items'], stat['seconds'],
+                                                                stat['queue_depth_mean'], stat['queue_depth_max'],
+                                                                stat['full_waits']))
+        return '\n'.join(lines)
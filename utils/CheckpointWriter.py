@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+
+class CheckpointWriter(object):
+    """
+    支持断点续跑的结果文件写入
+    结果文件旁边维护一个 manifest 文件 (res_path + '.manifest')，
+    每行为 "html_id\\t结果文件字节数"，表示该 html 的记录已经写入并落盘
+    每 sync_interval 个 html 进行一次 fsync，先同步结果文件再追加 manifest，
+    续跑时将结果文件截断到 manifest 中最后记录的位置，并跳过其中已完成的 html
+    """
+
+    def __init__(self, res_path, head, resume=False, sync_interval=100):
+        self.res_path = res_path
+        self.manifest_path = res_path + '.manifest'
+        self.sync_interval = sync_interval
+        # 已经完成的 html id
+        self.done_ids = set()
+        # 已写入结果文件但尚未写入 manifest 的 (html_id, 结果文件字节数)
+        self.pending = []
+        committed_offset = None
+        if resume:
+            committed_offset = self.load_manifest()
+        if committed_offset is None:
+            self.done_ids = set()
+            with open(self.res_path, 'wb') as f:
+                f.write(head.encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+            open(self.manifest_path, 'wb').close()
+        else:
+            with open(self.res_path, 'r+b') as f:
+                f.truncate(committed_offset)
+        self.res_file = open(self.res_path, 'ab')
+        self.manifest_file = open(self.manifest_path, 'ab')
+
+    def load_manifest(self):
+        """
+        读取 manifest，返回最后一次提交时结果文件的字节数
+        manifest 或结果文件不存在、manifest 中没有有效记录时返回 None
+        末尾不完整的行会被截掉
+        """
+        if not os.path.exists(self.res_path) or not os.path.exists(self.manifest_path):
+            return None
+        committed_offset, valid_length = None, 0
+        with open(self.manifest_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                fields = line.decode('utf-8').rstrip('\n').split('\t')
+                if len(fields) != 2 or not fields[1].isdigit():
+                    break
+                self.done_ids.add(fields[0])
+                committed_offset = int(fields[1])
+                valid_length += len(line)
+        if committed_offset is None or committed_offset > os.path.getsize(self.res_path):
+            return None
+        with open(self.manifest_path, 'r+b') as f:
+            f.truncate(valid_length)
+        return committed_offset
+
+    def is_done(self, html_id):
+        return html_id in self.done_ids
+
+    def write(self, html_id, record_list):
+        """
+        写入一个 html 的所有记录
+        """
+        for record in record_list:
+            self.res_file.write((record + "\n").encode('utf-8'))
+        self.done_ids.add(html_id)
+        self.pending.append((html_id, self.res_file.tell()))
+        if len(self.pending) >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        """
+        结果文件落盘之后再将已完成的 html id 写入 manifest
+        """
+        if len(self.pending) == 0:
+            return
+        self.res_file.flush()
+        os.fsync(self.res_file.fileno())
+        for html_id, offset in self.pending:
+            self.manifest_file.write(("%s\t%d\n" % (html_id, offset)).encode('utf-8'))
+        self.manifest_file.flush()
+        os.fsync(self.manifest_file.fileno())
+        self.pending = []
+
+    def close(self):
+        self.sync()
+        self.res_file.close()
+        self.manifest_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+
+class KeywordAutomaton(object):
+    """
+    Aho-Corasick 多模式匹配自动机
+    一次扫描文本即可找出所有关键词的出现位置
+    新增关键词时只插入 trie；之后的第一次匹配前，build 按层次遍历重新计算整个 trie 的失配指针 (fail) 与输出，
+    不做增量更新。增减持、定增抽取器的简称词典每个文档只有几个到几十个关键词，完整重新计算的开销可以忽略
+    """
+
+    def __init__(self, keywords=None):
+        # 每个状态的转移表：字符 -> 状态
+        self.goto = [{}]
+        # 每个状态的失配指针
+        self.fail = [0]
+        # 该状态是否为某个关键词的结尾
+        self.terminal = [False]
+        # 该状态 (包括 fail 链上的状态) 可以匹配到的关键词长度，降序排列
+        self.output = [()]
+        # 每个状态对应的深度，即从根到该状态的字符数
+        self.depth = [0]
+        # 是否需要重新计算失配指针
+        self.stale = False
+        self.size = 0
+        if keywords is not None:
+            for keyword in keywords:
+                self.add(keyword)
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, keyword):
+        state = self.walk(0, keyword)
+        return state is not None and self.terminal[state]
+
+    def add(self, keyword):
+        """
+        插入一个关键词，已经存在时返回 False
+        """
+        state = 0
+        for ch in keyword:
+            next_state = self.goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.terminal.append(False)
+                self.output.append(())
+                self.depth.append(self.depth[state] + 1)
+                self.goto[state][ch] = next_state
+            state = next_state
+        if self.terminal[state]:
+            return False
+        self.terminal[state] = True
+        self.size += 1
+        self.stale = True
+        return True
+
+    def walk(self, state, text):
+        """
+        从 state 出发沿 trie 读入 text，不使用失配指针
+        无法继续时返回 None
+        """
+        for ch in text:
+            state = self.goto[state].get(ch)
+            if state is None:
+                return None
+        return state
+
+    def build(self):
+        """
+        按层次遍历重新计算所有状态的失配指针以及输出，自上次计算以来没有新增关键词时直接返回
+        """
+        if not self.stale:
+            return
+        queue = []
+        for state in self.goto[0].values():
+            self.fail[state] = 0
+            queue.append(state)
+        self.output[0] = ()
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            fail_output = self.output[self.fail[state]]
+            if self.terminal[state]:
+                self.output[state] = (self.depth[state],) + fail_output
+            else:
+                self.output[state] = fail_output
+            for ch, next_state in self.goto[state].items():
+                fail_state = self.fail[state]
+                while fail_state > 0 and ch not in self.goto[fail_state]:
+                    fail_state = self.fail[fail_state]
+                self.fail[next_state] = self.goto[fail_state].get(ch, 0)
+                queue.append(next_state)
+        self.stale = False
+
+    def iter_matches(self, text):
+        """
+        扫描 text，依次返回 (起始位置, 长度)
+        同一结束位置的多个匹配按长度降序返回
+        """
+        self.build()
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for pos, ch in enumerate(text):
+            while state > 0 and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length in output[state]:
+                yield pos - length + 1, length
+
+    def longest_match_by_start(self, text):
+        """
+        返回字典：起始位置 -> 从该位置开始的最长匹配长度
+        """
+        rs = {}
+        for start, length in self.iter_matches(text):
+            if length > rs.get(start, 0):
+                rs[start] = length
+        return rs
+
+    def contains_any(self, text):
+        """
+        检测 text 中是否出现任意一个关键词
+        """
+        for _ in self.iter_matches(text):
+            return True
+        return False
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+
+import importlib
+import json
+import os
+import threading
+import time
+
+
+class NullStage(object):
+    """
+    未启用时 stage 返回的空计时器，不做任何事情
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def add_size(self, size):
+        pass
+
+
+_null_stage = NullStage()
+
+
+class Stage(object):
+    """
+    一个阶段的计时器，退出时将耗时、调用次数以及处理量累加到 Profiler 中
+    """
+
+    __slots__ = ('profiler', 'name', 'size', 'start')
+
+    def __init__(self, profiler, name, size):
+        self.profiler = profiler
+        self.name = name
+        self.size = size
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.record(self.name, time.perf_counter() - self.start, self.size)
+        return False
+
+    def add_size(self, size):
+        self.size += size
+
+
+# 调用非常频繁的函数不在代码中插入计时，启用时将模块中的函数替换为计时包装，关闭时恢复
+# (模块名, 函数名, 阶段名)，处理量为第一个参数的长度
+HotFunctions = (
+    ('utils.TextUtils', 'clean_text', 'text.clean'),
+)
+
+
+class Profiler(object):
+    """
+    按阶段统计抽取流程的耗时 (秒)、调用次数以及处理量 (html 为字节数，文本为字符数)
+    每个文档的统计在 end_document 时得到一条记录，add_document 将其写入 JSON lines 文件并累加到汇总中
+    阶段可以嵌套，各阶段的耗时包含其中嵌套阶段的耗时
+    未启用时 stage 返回空计时器，开销只有一次函数调用
+    record 可以在多个线程中同时调用 (例如 AsyncPipeline 各阶段的 executor)，当前文档的统计由 lock 保护
+    """
+
+    def __init__(self):
+        self.enabled = False
+        # 保护 doc_stages 以及汇总
+        self.lock = threading.Lock()
+        # JSON lines 输出文件，为 None 时只汇总不输出
+        self.trace_file = None
+        # 当前文档 id 及其字节数
+        self.doc_id = None
+        self.doc_size = 0
+        self.doc_start = 0.0
+        # 当前文档中各阶段的统计：阶段名 -> [耗时, 调用次数, 处理量]
+        self.doc_stages = {}
+        # 所有文档的汇总：阶段名 -> [耗时, 调用次数, 处理量]
+        self.total_stages = {}
+        self.total_docs = 0
+        self.total_size = 0
+        self.total_seconds = 0.0
+        # 被替换的函数：(模块, 函数名, 原函数)
+        self.patched_functions = []
+
+    def enable(self, trace_path=None):
+        """
+        启用统计
+        trace_path: 每个文档一行的 JSON lines 输出文件路径，为 None 时不输出
+        """
+        if self.enabled:
+            return
+        self.enabled = True
+        if trace_path is not None:
+            self.trace_file = open(trace_path, 'w', encoding='utf-8')
+        for module_name, function_name, stage_name in HotFunctions:
+            module = importlib.import_module(module_name)
+            function = getattr(module, function_name)
+            self.patched_functions.append((module, function_name, function))
+            setattr(module, function_name, self.wrap(function, stage_name))
+
+    def disable(self):
+        """
+        关闭统计，恢复被替换的函数并关闭输出文件，已有的汇总保留
+        """
+        if not self.enabled:
+            return
+        self.enabled = False
+        while len(self.patched_functions) > 0:
+            module, function_name, function = self.patched_functions.pop()
+            setattr(module, function_name, function)
+        if self.trace_file is not None:
+            self.trace_file.close()
+            self.trace_file = None
+
+    def wrap(self, function, stage_name):
+        """
+        返回 function 的计时包装
+        enable 子例程
+        """
+        def timed_function(text, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(text, *args, **kwargs)
+            finally:
+                self.record(stage_name, time.perf_counter() - start, len(text))
+        return timed_function
+
+    def stage(self, name, size=0):
+        """
+        返回阶段计时器，用于 with 语句
+        """
+        if not self.enabled:
+            return _null_stage
+        return Stage(self, name, size)
+
+    def record(self, name, seconds, size=0, calls=1):
+        with self.lock:
+            stat = self.doc_stages.get(name)
+            if stat is None:
+                self.doc_stages[name] = [seconds, calls, size]
+            else:
+                stat[0] += seconds
+                stat[1] += calls
+                stat[2] += size
+
+    def reset_lock(self):
+        """
+        fork 得到的子进程中重新创建 lock，避免继承其他线程持有的锁
+        """
+        self.lock = threading.Lock()
+
+    def begin_document(self, doc_id, size=0):
+        """
+        开始统计一个文档
+        size: 文档字节数
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.doc_id = doc_id
+            self.doc_size = size
+            self.doc_stages = {}
+            self.doc_start = time.perf_counter()
+
+    def end_document(self, worker_entry=None):
+        """
+        结束当前文档的统计，返回该文档的记录，未启用时返回 None
+        记录可以在其他进程中通过 add_document 汇总
+        worker_entry: 同一文档在 worker 进程中得到的记录，不为 None 时与当前进程的统计合并
+        """
+        if not self.enabled:
+            return None
+        with self.lock:
+            entry = {
+                'doc': self.doc_id,
+                'bytes': self.doc_size,
+                'seconds': time.perf_counter() - self.doc_start,
+                'stages': dict((name, {'seconds': stat[0], 'calls': stat[1], 'size': stat[2]})
+                               for name, stat in self.doc_stages.items()),
+            }
+            self.doc_id = None
+            self.doc_stages = {}
+        if worker_entry is not None:
+            for name, stat in worker_entry['stages'].items():
+                merged = entry['stages'].setdefault(name, {'seconds': 0.0, 'calls': 0, 'size': 0})
+                for key in ('seconds', 'calls', 'size'):
+                    merged[key] += stat[key]
+            entry['bytes'] += worker_entry['bytes']
+            entry['seconds'] += worker_entry['seconds']
+        return entry
+
+    def add_document(self, entry):
+        """
+        将一个文档的记录写入输出文件并累加到汇总中
+        """
+        if entry is None:
+            return
+        with self.lock:
+            if self.trace_file is not None:
+                self.trace_file.write(json.dumps(entry, ensure_ascii=False, sort_keys=True) + '\n')
+            self.total_docs += 1
+            self.total_size += entry['bytes']
+            self.total_seconds += entry['seconds']
+            for name, stat in entry['stages'].items():
+                total = self.total_stages.setdefault(name, [0.0, 0, 0])
+                total[0] += stat['seconds']
+                total[1] += stat['calls']
+                total[2] += stat['size']
+
+    def summary(self):
+        """
+        返回汇总结果的文本，按耗时从大到小列出各阶段
+        """
+        lines = ['documents: %d, bytes: %d, seconds: %.3f' % (self.total_docs, self.total_size, self.total_seconds),
+                 '%-24s %10s %10s %8s %12s %10s' % ('stage', 'seconds', 'calls', 'share', 'size', 'ms/doc')]
+        for name, (seconds, calls, size) in sorted(self.total_stages.items(), key=lambda x: -x[1][0]):
+            lines.append('%-24s %10.3f %10d %7.1f%% %12d %10.3f' % (
+                name, seconds, calls, seconds * 100 / self.total_seconds if self.total_seconds > 0 else 0.0,
+                size, seconds * 1000 / self.total_docs if self.total_docs > 0 else 0.0))
+        return '\n'.join(lines)
+
+
+# 进程内共享的 Profiler
+_profiler = Profiler()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_profiler.reset_lock)
+
+
+def get_profiler():
+    return _profiler
+
+
+def stage(name, size=0):
+    """
+    在共享的 Profiler 中统计一个阶段：with Profiler.stage('html.parse'): ...
+    """
+    return _profiler.stage(name, size)
+
+
+def record(name, seconds, size=0, calls=1):
+    """
+    在共享的 Profiler 中直接累加一个阶段的统计 (不计时的阶段 seconds 传 0)
+    """
+    if _profiler.enabled:
+        _profiler.record(name, seconds, size, calls)
@@ -12,6 +12,16 @@ CommaCharInNumberSet = {',', '，'}
 NumberSet = {'0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '.'}
 # 匹配时间段
 PartDataPattern = re.compile(r'(?P<year>\d\d\d\d年)\d{1,2}月\d{1,2}日至\d{1,2}月\d{1,2}日')
+# 去除空格符，并将中文百分号符改为英文百分号符
+# 使用 str.replace 逐个替换：非 ASCII 文本上 str.translate 需要逐字符查表，反而更慢
+BlankCharReplacements = tuple((ch, '') for ch in sorted(BlankCharSet)) + (('％', '%'),)
+# 非数字
+NonNumberPattern = re.compile(r'[^0-9.]')
+# 一次扫描同时匹配逗号分隔的数字和时间段
+CleanPattern = re.compile(r'(?P<comma_number>\d{1,3}(?:[,，]\d\d\d)+)'
+                          r'|(?P<part_date>(?P<year>\d\d\d\d年)\d{1,2}月\d{1,2}日至\d{1,2}月\d{1,2}日)')
+# 逗号分隔的数字之后紧跟数字或者 "年" 时，去除逗号之后可能形成新的时间段
+CommaNumberFollowPattern = re.compile(r'\d|年')
 
 
 def clean_text(text):
@@ -19,19 +29,36 @@ def clean_text(text):
     1. 去除没有用处的空格符
     2. 去除带逗号的数字中的逗号
     3. 规范化时间段文本
+    去除空格符之后，逗号分隔的数字和时间段在同一次扫描中处理；
+    去除逗号可能形成新的时间段时 (例如 "1,234年5月4日至6月3日")，按原有顺序分两次处理
     """
-    return add_date(clean_number_in_text(remove_blank_chars(text)))
+    text = remove_blank_chars(text)
+    # 没有逗号也没有 "至" 时，既没有逗号分隔的数字也没有时间段
+    if ',' not in text and '，' not in text and '至' not in text:
+        return text
+    # 是否存在去除逗号之后可能形成新的时间段的数字
+    follow_flags = []
+
+    def replace(match):
+        if match.lastgroup == 'comma_number':
+            if CommaNumberFollowPattern.match(text, match.end()) is not None:
+                follow_flags.append(True)
+            return remove_comma_in_number(match.group())
+        part_date = match.group()
+        pos = part_date.index('至') + 1
+        return part_date[:pos] + match.group('year') + part_date[pos:]
+
+    rs = CleanPattern.sub(replace, text)
+    if len(follow_flags) > 0:
+        return add_date(clean_number_in_text(text))
+    return rs
 
 
 def extract_number(text):
     """
     提取文本中的数字
     """
-    new_text = []
-    for ch in text:
-        if ch in NumberSet:
-            new_text.append(ch)
-    return ''.join(new_text)
+    return NonNumberPattern.sub('', text)
 
 
 def add_date(text):
@@ -75,15 +102,11 @@ def remove_blank_chars(text):
     去除文本中的空格符，并将中文百分号符改为英文百分号符
     clean_text 子例程
     """
-    new_text = []
-    if text is not None:
-        for ch in text:
-            if ch not in BlankCharSet:
-                if ch == '％':
-                    new_text.append('%')
-                else:
-                    new_text.append(ch)
-    return ''.join(new_text)
+    if text is None:
+        return ''
+    for old, new in BlankCharReplacements:
+        text = text.replace(old, new)
+    return text
 
 
 def remove_comma_in_number(text):
@@ -91,12 +114,9 @@ def remove_comma_in_number(text):
     去除文本中的逗号
     主要用于去除数字中的逗号，clean_number_in_text 子例程
     """
-    new_text = []
-    if text is not None:
-        for ch in text:
-            if ch not in CommaCharInNumberSet:
-                new_text.append(ch)
-    return ''.join(new_text)
+    if text is None:
+        return ''
+    return text.replace(',', '').replace('，', '')
 
 
 if __name__ == "__main__":